@@ -0,0 +1,109 @@
+"""
+Synthetic identifier and document generator for the benchmark suite
+
+Generates valid and near-miss CUSIPs, ISINs, SEDOLs and ABA numbers, plus noisy documents that embed them.
+Near misses have one character substituted or two adjacent characters swapped, so most of them fail the checksum.
+"""
+from typing import *
+import random
+from fincheck.checksum import cusip_check_digit, isin_check_digit, sedol_check_digit
+
+ALPHANUMERIC = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+DIGITS = "0123456789"
+SEDOL_CHARS = "0123456789BCDFGHJKLMNPQRSTVWXYZ"
+COUNTRIES = ["US", "CA", "GB", "DE", "FR", "JP", "AU", "CH", "NL", "IE"]
+WORDS = [
+    "the", "company", "shares", "issued", "notes", "due", "fiscal", "quarter", "revenue", "net", "income",
+    "holders", "of", "record", "per", "share", "filing", "schedule", "13F", "common", "stock", "preferred",
+    "agreement", "dated", "principal", "amount", "interest", "rate", "maturity", "trustee", "account", "routing",
+    "wire", "to", "bank", "pursuant", "section", "2021", "Q3", "USD", "million", "in", "and", "or", "Inc.", "Corp."
+]
+PUNCTUATION = [" ", " ", " ", " ", ", ", ". ", "\n", "; ", " (", ") ", ": ", " - "]
+
+
+def random_cusip(rng: random.Random) -> str:
+    payload = "".join(rng.choice(ALPHANUMERIC) for _ in range(8))
+    return payload + str(cusip_check_digit(payload))
+
+def random_isin(rng: random.Random) -> str:
+    payload = rng.choice(COUNTRIES) + "".join(rng.choice(ALPHANUMERIC) for _ in range(9))
+    return payload + str(isin_check_digit(payload))
+
+def random_sedol(rng: random.Random) -> str:
+    payload = "".join(rng.choice(SEDOL_CHARS) for _ in range(6))
+    return payload + str(sedol_check_digit(payload))
+
+def random_aba(rng: random.Random) -> str:
+    #first two digits must be in the Federal Reserve ranges
+    prefix = rng.choice([f"{n:02d}" for n in list(range(0, 13)) + list(range(21, 33)) + list(range(61, 73)) + [80]])
+    payload = prefix + "".join(rng.choice(DIGITS) for _ in range(6))
+    sum_ = sum(w * int(d) for w, d in zip([3, 7, 1, 3, 7, 1, 3, 7], payload))
+    return payload + str((10 - (sum_ % 10)) % 10)
+
+GENERATORS = {
+    "CUSIP": (random_cusip, ALPHANUMERIC),
+    "ISIN": (random_isin, ALPHANUMERIC),
+    "SEDOL": (random_sedol, SEDOL_CHARS),
+    "ABA": (random_aba, DIGITS),
+}
+
+def near_miss(s: str, rng: random.Random, alphabet: str = ALPHANUMERIC) -> str:
+    """
+    Substitutes one character or swaps two adjacent characters
+    """
+    chars = list(s)
+    if rng.random() < 0.5:
+        i = rng.randrange(len(chars) - 1)
+        chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    else:
+        i = rng.randrange(len(chars))
+        choices = DIGITS if i == len(chars) - 1 else alphabet
+        chars[i] = rng.choice([c for c in choices if c != chars[i]])
+    return "".join(chars)
+
+def identifiers(kind: str, n: int, near_miss_rate: float = 0.5, seed: int = 0) -> List[str]:
+    """
+    Generates n identifiers of a type, a fraction of which are near misses
+    ------
+    PARAMS
+    ------
+        1. 'kind' -> CUSIP, ISIN, SEDOL or ABA
+        2. 'n' -> number of identifiers
+        3. 'near_miss_rate' -> fraction of identifiers with a substitution or transposition
+        4. 'seed' -> random seed
+    """
+    rng = random.Random(seed)
+    generate_fn, alphabet = GENERATORS[kind]
+    res = []
+    for _ in range(n):
+        x = generate_fn(rng)
+        if rng.random() < near_miss_rate:
+            x = near_miss(x, rng, alphabet)
+        res.append(x)
+    return res
+
+def document(n_words: int, identifier_rate: float = 0.02, near_miss_rate: float = 0.3, rng: random.Random = None) -> str:
+    """
+    Generates a noisy document of roughly n_words tokens, with identifiers of every type embedded at identifier_rate
+    """
+    rng = rng or random.Random(0)
+    kinds = list(GENERATORS)
+    parts = []
+    for _ in range(n_words):
+        if rng.random() < identifier_rate:
+            generate_fn, alphabet = GENERATORS[rng.choice(kinds)]
+            word = generate_fn(rng)
+            if rng.random() < near_miss_rate:
+                word = near_miss(word, rng, alphabet)
+        else:
+            word = rng.choice(WORDS)
+        parts.append(word)
+        parts.append(rng.choice(PUNCTUATION))
+    return "".join(parts)
+
+def documents(n_docs: int, n_words: int = 2000, identifier_rate: float = 0.02, seed: int = 0) -> List[str]:
+    """
+    Generates n_docs noisy documents of roughly n_words tokens each
+    """
+    rng = random.Random(seed)
+    return [document(n_words, identifier_rate=identifier_rate, rng=rng) for _ in range(n_docs)]
@@ -0,0 +1,168 @@
+"""
+Benchmark suite for fincheck
+
+Times checksum, validate, extract and data object construction on synthetic data (see generate.py) and writes
+machine-readable results so runs can be compared between versions.
+
+Usage (from this directory):
+    python run_benchmarks.py --size 100000 --output results.json
+    python run_benchmarks.py --size 100000 --compare results.json #prints the ratio to a previous run
+
+Each result reports:
+    > ops_per_second -- identifiers (or documents) processed per second
+    > p50_us / p99_us -- latency of one call in microseconds (one identifier, one document, or one batch)
+    > peak_bytes -- peak memory allocated while running the benchmark once, measured with tracemalloc
+"""
+from typing import *
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+from datetime import datetime, timezone
+import fincheck
+from fincheck import checksum, validate, extract, data
+import generate
+
+
+def percentile(latencies: List[float], p: float) -> float:
+    latencies = sorted(latencies)
+    return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+
+def time_per_item(fn: Callable, items: List) -> Tuple[float, List[float]]:
+    """
+    Calls fn once per item. Returns total seconds and per-call latencies.
+    """
+    clock = time.perf_counter
+    latencies = []
+    start = clock()
+    for x in items:
+        t = clock()
+        fn(x)
+        latencies.append(clock() - t)
+    return clock() - start, latencies
+
+def time_batches(fn: Callable, batches: List[List]) -> Tuple[float, List[float]]:
+    """
+    Calls fn once per batch. Returns total seconds and per-batch latencies.
+    """
+    clock = time.perf_counter
+    latencies = []
+    start = clock()
+    for batch in batches:
+        t = clock()
+        fn(batch)
+        latencies.append(clock() - t)
+    return clock() - start, latencies
+
+def peak_memory(fn: Callable, items: List, batched: bool) -> int:
+    tracemalloc.start()
+    try:
+        if batched:
+            for batch in items:
+                fn(batch)
+        else:
+            for x in items:
+                fn(x)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def run_benchmark(name: str, fn: Callable, items: List, batch_size: int = None) -> Dict:
+    """
+    Runs one benchmark. With batch_size, items are split into batches and fn receives a list per call.
+    """
+    if batch_size:
+        inputs = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+        seconds, latencies = time_batches(fn, inputs)
+    else:
+        inputs = items
+        seconds, latencies = time_per_item(fn, inputs)
+    res = {
+        "n": len(items),
+        "batch_size": batch_size,
+        "seconds": seconds,
+        "ops_per_second": len(items) / seconds if seconds else None,
+        "p50_us": percentile(latencies, 50) * 1e6,
+        "p99_us": percentile(latencies, 99) * 1e6,
+        "peak_bytes": peak_memory(fn, inputs, batched=bool(batch_size)),
+    }
+    print(f"{name:<40} {res['ops_per_second']:>14,.0f} ops/s   p50 {res['p50_us']:>10.2f}us   p99 {res['p99_us']:>10.2f}us")
+    return res
+
+def build_benchmarks(size: int, seed: int, batch_size: int, n_docs: int, doc_words: int) -> List[Tuple[str, Callable, List, int]]:
+    ids = {kind: generate.identifiers(kind, size, seed=seed) for kind in generate.GENERATORS}
+    payloads = {kind: [x[:-1] for x in ids[kind]] for kind in ["CUSIP", "ISIN", "SEDOL"]}
+    docs = generate.documents(n_docs, n_words=doc_words, seed=seed)
+    #half of the cusips are known securities so that lookups hit the reference data
+    known = [row[1] for row in data.load_cusip_refdata()[:size // 2]]
+    cusips = known + ids["CUSIP"][:size - len(known)]
+    isins = ["US" + c + str(checksum.isin_check_digit("US" + c)) for c in known] + ids["ISIN"][:size - len(known)]
+    return [
+        ("checksum.cusip_check_digit", checksum.cusip_check_digit, payloads["CUSIP"], None),
+        ("checksum.isin_check_digit", checksum.isin_check_digit, payloads["ISIN"], None),
+        ("checksum.sedol_check_digit", checksum.sedol_check_digit, payloads["SEDOL"], None),
+        ("checksum.luhn_check_digit", checksum.luhn_check_digit, [x[:-1] for x in ids["ABA"]], None),
+        ("checksum.cusip_check_digits", checksum.cusip_check_digits, payloads["CUSIP"], batch_size),
+        ("checksum.isin_check_digits", checksum.isin_check_digits, payloads["ISIN"], batch_size),
+        ("checksum.sedol_check_digits", checksum.sedol_check_digits, payloads["SEDOL"], batch_size),
+        ("validate.is_cusip", validate.is_cusip, ids["CUSIP"], None),
+        ("validate.is_isin", validate.is_isin, ids["ISIN"], None),
+        ("validate.is_sedol", validate.is_sedol, ids["SEDOL"], None),
+        ("validate.is_aba", validate.is_aba, ids["ABA"], None),
+        ("validate.is_cusip_many", validate.is_cusip_many, ids["CUSIP"], batch_size),
+        ("validate.is_isin_many", validate.is_isin_many, ids["ISIN"], batch_size),
+        ("validate.is_sedol_many", validate.is_sedol_many, ids["SEDOL"], batch_size),
+        ("validate.is_aba_many", validate.is_aba_many, ids["ABA"], batch_size),
+        ("extract.get_cusips", extract.get_cusips, docs, None),
+        ("extract.get_abas", extract.get_abas, docs, None),
+        ("extract.find_securities", extract.find_securities, docs, None),
+        ("extract.find_securities[all]", lambda s: extract.find_securities(s, include=["CUSIP", "ISIN", "SEDOL", "ABA"]), docs, None),
+        ("data.Cusip", data.Cusip, cusips, None),
+        ("data.Isin", data.Isin, isins, None),
+    ]
+
+def compare(results: Dict, baseline: Dict):
+    print(f"\n{'benchmark':<40} {'ops/s ratio':>12} {'p99 ratio':>10}")
+    for name, res in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base and base.get("ops_per_second") and res.get("ops_per_second"):
+            print(f"{name:<40} {res['ops_per_second'] / base['ops_per_second']:>12.2f} {res['p99_us'] / base['p99_us']:>10.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="fincheck benchmarks")
+    parser.add_argument("--size", type=int, default=20000, help="identifiers per benchmark")
+    parser.add_argument("--batch-size", type=int, default=10000, help="rows per call for batch APIs")
+    parser.add_argument("--docs", type=int, default=50, help="documents for extraction benchmarks")
+    parser.add_argument("--doc-words", type=int, default=5000, help="words per document")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this string")
+    parser.add_argument("--output", default=None, help="path of the json results file")
+    parser.add_argument("--compare", default=None, help="path of a previous json results file")
+    args = parser.parse_args()
+
+    data.get_refdata().load() #load reference data up front so it is not timed
+    results = {}
+    for name, fn, items, batch_size in build_benchmarks(args.size, args.seed, args.batch_size, args.docs, args.doc_words):
+        if args.filter in name:
+            results[name] = run_benchmark(name, fn, items, batch_size)
+
+    output = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "fincheck_path": fincheck.__file__,
+            "args": vars(args),
+        },
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(output, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+if __name__ == "__main__":
+    main()
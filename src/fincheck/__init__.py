@@ -96,11 +96,27 @@ ISIN Object Example Usage:
     >>> is_sedol(x.to_sedol())
     True
 
+Import Time:
+
+    Submodules are imported lazily on first attribute access (e.g. fincheck.validate), and reference data is only
+    located and read when a data object is first built. `import fincheck` must stay within IMPORT_TIME_BUDGET
+    seconds (checked by tests/run_tests.py::test_import_time).
+
 """
 
-from . import validate
-from . import checksum
-from . import extract
-from . import utils 
-from . import data
+import importlib
+
+IMPORT_TIME_BUDGET = 0.05 #seconds for `import fincheck` in a fresh interpreter
+
+_SUBMODULES = ["bloom", "cache", "checksum", "cli", "columns", "compiled", "corpus", "data", "extract", "known", "metrics", "packed", "server", "suggest", "utils", "validate"]
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        module = importlib.import_module(f".{name}", __name__)
+        globals()[name] = module #cache, so __getattr__ only runs on first access
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(set(globals()) | set(_SUBMODULES))
 
@@ -0,0 +1,238 @@
+"""
+Compact probabilistic membership for large security masters
+
+A BloomFilter answers "is this identifier in the master list?" with no false negatives and a configurable
+false-positive rate, using about 10 bits per identifier at 1% instead of a Python string in a set (~60+ bytes each).
+Positives can optionally be confirmed against an exact source (a set, the reference data, ...), so a filter can be
+used as a cheap pre-screen in front of a slower exact lookup.
+
+Example Usage:
+
+    >>> from fincheck.bloom import BloomFilter
+    >>> universe = BloomFilter.from_refdata(fp_rate=0.001)
+    >>> "98986X109" in universe
+    True
+    >>> universe.save("cusips.bloom")
+    >>> universe = BloomFilter.load("cusips.bloom") #memory-mapped, shared between processes
+    >>> from fincheck.validate import is_cusip_many
+    >>> is_cusip_many(["98986X109", "023135106"], universe=universe) #valid and in the universe
+    [True, False]
+
+The file layout is a fixed header (magic, version, bit count, hash count, item count, target false-positive rate)
+followed by the bit array, so load() maps the file and reads bits in place.
+"""
+from typing import *
+from hashlib import blake2b
+from math import ceil, exp, log
+import mmap
+import struct
+
+MAGIC = b"FCBF"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sIQIQd") #magic, version, n_bits, n_hashes, count, fp_rate
+
+
+def _positions(key: str, n_bits: int, n_hashes: int) -> Iterator[int]:
+    #double hashing (Kirsch-Mitzenmacher): k positions from two independent 64-bit hashes.
+    #blake2b is keyed by nothing process-specific, so filters are portable across processes and machines
+    digest = blake2b(key.encode("utf-8"), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    for i in range(n_hashes):
+        yield (h1 + i * h2) % n_bits
+
+
+class BloomFilter(object):
+    """
+    ----------------------------
+    Bloom filter over identifier strings
+    ----------------------------
+    Supports `in`, bulk membership (contains_many), and saving to / memory-mapping from disk.
+    If 'exact' is given, positives are confirmed against it, so membership is exact and the filter only
+    saves the cost of exact lookups for identifiers that are not in the universe.
+    ----------------------------
+    """
+    def __init__(self, capacity: int, fp_rate: float = 0.01, exact: Union[Container, Callable[[str], bool]] = None):
+        """
+        ------
+        PARAMS
+        ------
+            1. 'capacity' -> expected number of identifiers
+            2. 'fp_rate' -> target false-positive rate at capacity
+            3. 'exact' -> optional container or callable used to confirm positives
+        """
+        assert 0 < fp_rate < 1, "'fp_rate' must be between 0 and 1."
+        capacity = max(1, capacity)
+        self.n_bits = max(8, ceil(-capacity * log(fp_rate) / log(2) ** 2))
+        self.n_hashes = max(1, round(self.n_bits / capacity * log(2)))
+        self.fp_rate = fp_rate
+        self.count = 0
+        self.exact = exact
+        self._bits = bytearray((self.n_bits + 7) // 8)
+        self._mmap = None
+
+    @classmethod
+    def from_iterable(cls, ids: Iterable[str], fp_rate: float = 0.01, exact: Union[Container, Callable[[str], bool]] = None) -> "BloomFilter":
+        """
+        Builds a filter sized for the given identifiers
+        """
+        ids = ids if isinstance(ids, (list, tuple, set, frozenset, dict)) else list(ids)
+        bloom = cls(len(ids), fp_rate=fp_rate, exact=exact)
+        bloom.update(ids)
+        return bloom
+
+    @classmethod
+    def from_refdata(cls, refdata: "RefData" = None, fp_rate: float = 0.01, countries: List[str] = None, confirm: bool = False) -> "BloomFilter":
+        """
+        Builds a filter over the CUSIPs of the reference data, and optionally the ISINs derived from them
+        ------
+        PARAMS
+        ------
+            1. 'refdata' -> any registry (RefData, RefDataSnapshot, CompiledRefData, ...). Defaults to get_refdata()
+            2. 'fp_rate' -> target false-positive rate
+            3. 'countries' -> country codes of the ISINs to include, e.g. ["US", "CA"]
+            4. 'confirm' -> If true, positives are confirmed with exact lookups in the reference data
+        """
+        from .data import get_refdata
+        from .checksum import isin_check_digit, isin_check_digits
+        refdata = refdata or get_refdata()
+        countries = countries or []
+        cusips = list(refdata.iter_cusips())
+        ids = list(cusips)
+        valid = [c for c in cusips if len(c) == 9 and c.isascii() and c.isalnum() and c.upper() == c]
+        for country in countries:
+            ids.extend(f"{country}{c}{d}" for c, d in zip(valid, isin_check_digits(country + c for c in valid)))
+        exact = None
+        if confirm:
+            countries = set(countries)
+            def exact(x: str) -> bool:
+                if len(x) == 12:
+                    return x[:2] in countries and refdata.lookup_cusip(x[2:11]) is not None and x[11:] == str(isin_check_digit(x[:11]))
+                return refdata.lookup_cusip(x) is not None
+        return cls.from_iterable(ids, fp_rate=fp_rate, exact=exact)
+
+    def add(self, key: str):
+        bits = self._bits
+        for p in _positions(key, self.n_bits, self.n_hashes):
+            bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def update(self, keys: Iterable[str]):
+        for key in keys:
+            self.add(key)
+
+    def might_contain(self, key: str) -> bool:
+        """
+        Probabilistic membership: False means definitely absent, True means present with probability ~(1 - fp_rate)
+        """
+        bits = self._bits
+        for p in _positions(key, self.n_bits, self.n_hashes):
+            if not bits[p >> 3] >> (p & 7) & 1:
+                return False
+        return True
+
+    def __contains__(self, key: str) -> bool:
+        if not self.might_contain(key):
+            return False
+        exact = self.exact
+        if exact is None:
+            return True
+        return exact(key) if callable(exact) else key in exact
+
+    def contains_many(self, keys: Iterable[str]) -> List[bool]:
+        """
+        Bulk membership. Returns a boolean mask with one entry per key.
+        """
+        return [key in self for key in keys]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def to_bytes(self) -> bytes:
+        return _HEADER.pack(MAGIC, VERSION, self.n_bits, self.n_hashes, self.count, self.fp_rate) + bytes(self._bits)
+
+    @classmethod
+    def from_buffer(cls, buf: Union[bytes, bytearray, memoryview, mmap.mmap], exact: Union[Container, Callable[[str], bool]] = None) -> "BloomFilter":
+        """
+        Reads a serialized filter. The bits are used in place, without copying.
+        """
+        magic, version, n_bits, n_hashes, count, fp_rate = _HEADER.unpack_from(buf, 0)
+        assert magic == MAGIC, "Not a serialized fincheck bloom filter."
+        assert version == VERSION, f"Unsupported bloom filter version: {version}."
+        bloom = cls.__new__(cls)
+        bloom.n_bits = n_bits
+        bloom.n_hashes = n_hashes
+        bloom.count = count
+        bloom.fp_rate = fp_rate
+        bloom.exact = exact
+        bloom._bits = memoryview(buf)[_HEADER.size:_HEADER.size + (n_bits + 7) // 8]
+        bloom._mmap = None
+        return bloom
+
+    def save(self, path: str) -> str:
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+        return path
+
+    @classmethod
+    def load(cls, path: str, use_mmap: bool = True, exact: Union[Container, Callable[[str], bool]] = None) -> "BloomFilter":
+        """
+        Loads a saved filter
+        ------
+        PARAMS
+        ------
+            1. 'path' -> file written by save()
+            2. 'use_mmap' -> If true, the file is memory-mapped read-only (pages are shared between processes);
+                             else it is read into a private, writable buffer
+            3. 'exact' -> optional container or callable used to confirm positives
+        """
+        with open(path, "rb") as f:
+            if not use_mmap:
+                return cls.from_buffer(bytearray(f.read()), exact=exact)
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        bloom = cls.from_buffer(mm, exact=exact)
+        bloom._mmap = mm
+        return bloom
+
+    def close(self):
+        if self._mmap is not None:
+            self._bits.release()
+            self._mmap.close()
+            self._mmap = None
+
+    def stats(self) -> Dict:
+        """
+        Returns the size of the filter and its expected false-positive rate at the current count
+        """
+        expected = (1 - exp(-self.n_hashes * self.count / self.n_bits)) ** self.n_hashes
+        return {
+            "count": self.count,
+            "bits": self.n_bits,
+            "hashes": self.n_hashes,
+            "bytes": len(self._bits),
+            "target_fp_rate": self.fp_rate,
+            "expected_fp_rate": expected,
+            "exact": self.exact is not None,
+        }
+
+
+def filter_universe(values: Sequence[str], mask: List[bool], universe: Container) -> List[bool]:
+    """
+    Clears mask[i] for every value not in the universe. Only values still set in the mask are looked up.
+    ------
+    PARAMS
+    ------
+        1. 'values' -> identifiers, one per mask entry
+        2. 'mask' -> boolean mask, updated in place
+        3. 'universe' -> BloomFilter, set, KnownMatcher or any container of identifiers
+    """
+    idx = [i for i, ok in enumerate(mask) if ok]
+    keys = [values[i] for i in idx]
+    if hasattr(universe, "contains_many"):
+        found = universe.contains_many(keys)
+    else:
+        found = [k in universe for k in keys]
+    for i, ok in zip(idx, found):
+        mask[i] = ok
+    return mask
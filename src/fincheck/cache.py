@@ -0,0 +1,273 @@
+"""
+Bounded, thread-safe caches
+
+Example Usage:
+
+    >>> from fincheck.cache import ValidationCache
+    >>> cache = ValidationCache(maxsize=50_000)
+    >>> cache.is_cusip("037833100") #computed
+    True
+    >>> cache.is_cusip("037833100") #cached
+    True
+    >>> cache.is_cusip_many(["037833100", "037833101"]) #only misses are validated, in bulk
+    [True, False]
+    >>> cache.stats()["validation"]["hits"]
+    2
+"""
+from typing import *
+from collections import OrderedDict
+from threading import Lock
+from .validate import is_cusip, is_isin, is_sedol, is_aba, is_luhn
+from .validate import is_cusip_many, is_isin_many, is_sedol_many, is_aba_many, is_luhn_many
+from .checksum import cusip_check_digit, isin_check_digit, sedol_check_digit, luhn_check_digit
+
+_MISSING = object()
+
+
+class LRUCache(object):
+    """
+    ----------------------------
+    Thread-safe cache with a bounded size and least-recently-used eviction
+    ----------------------------
+    Keeps hit, miss and eviction counters (see stats()).
+    ----------------------------
+    """
+    def __init__(self, maxsize: int = 100_000):
+        assert maxsize > 0, "'maxsize' must be positive."
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_set(self, key: Hashable, factory: Callable[[Hashable], Any]) -> Any:
+        """
+        Returns the cached value for key, computing and storing factory(key) on a miss
+        """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory(key) #computed outside of the lock so slow factories do not block other threads
+            with self._lock:
+                value = self._data.setdefault(key, value) #another thread may have stored it first
+                self._data.move_to_end(key)
+                if len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def get_many(self, keys: Iterable[Hashable], default: Any = None) -> List[Any]:
+        """
+        Looks up many keys under a single lock acquisition
+        """
+        res = []
+        data = self._data
+        with self._lock:
+            for key in keys:
+                value = data.get(key, _MISSING)
+                if value is _MISSING:
+                    self.misses += 1
+                    res.append(default)
+                else:
+                    data.move_to_end(key)
+                    self.hits += 1
+                    res.append(value)
+        return res
+
+    def set_many(self, items: Iterable[Tuple[Hashable, Any]]):
+        """
+        Stores many (key, value) pairs under a single lock acquisition
+        """
+        data = self._data
+        with self._lock:
+            for key, value in items:
+                data[key] = value
+                data.move_to_end(key)
+            while len(data) > self.maxsize:
+                data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        """
+        Returns size, hit/miss/eviction counters and the hit rate
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+class ValidationCache(object):
+    """
+    ----------------------------
+    Opt-in memoization of validation, check digit and enrichment results
+    ----------------------------
+    Each kind of result has its own bounded LRUCache, so they can be sized and tuned separately (see stats()).
+    Use one instance per process, shared between threads, for streams that repeat the same identifiers.
+    Results are keyed on the input string as given.
+    ----------------------------
+    """
+    VALIDATORS = {
+        "CUSIP": (is_cusip, is_cusip_many),
+        "ISIN": (is_isin, is_isin_many),
+        "SEDOL": (is_sedol, is_sedol_many),
+        "ABA": (is_aba, is_aba_many),
+        "LUHN": (is_luhn, is_luhn_many),
+    }
+    CHECK_DIGITS = {
+        "CUSIP": cusip_check_digit,
+        "ISIN": isin_check_digit,
+        "SEDOL": sedol_check_digit,
+        "LUHN": luhn_check_digit,
+    }
+
+    def __init__(self, maxsize: int = 100_000, check_digit_maxsize: int = None, enrich_maxsize: int = None):
+        """
+        ------
+        PARAMS
+        ------
+            1. 'maxsize' -> maximum number of cached validation results
+            2. 'check_digit_maxsize' -> maximum number of cached check digits. Defaults to maxsize
+            3. 'enrich_maxsize' -> maximum number of cached enrichment rows. Defaults to maxsize
+        """
+        self.validation = LRUCache(maxsize)
+        self.check_digits = LRUCache(check_digit_maxsize or maxsize)
+        self.enrichment = LRUCache(enrich_maxsize or maxsize)
+
+    def is_valid(self, type_: str, s: str) -> bool:
+        """
+        Cached validation of one identifier of the given type (CUSIP, ISIN, SEDOL, ABA or LUHN)
+        """
+        key = (type_, s)
+        res = self.validation.get(key, _MISSING)
+        if res is _MISSING:
+            try:
+                res = self.VALIDATORS[type_][0](s)
+            except (ValueError, IndexError): #e.g. empty or non-numeric input to is_luhn
+                res = False
+            self.validation.set(key, res)
+        return res
+
+    def is_valid_many(self, type_: str, values: Iterable[str]) -> List[bool]:
+        """
+        Cached bulk validation. Repeated values are looked up once, and cache misses are validated together
+        with the bulk validator of the type.
+        """
+        values = values if isinstance(values, list) else list(values)
+        unique = list(dict.fromkeys(values))
+        keys = [(type_, v) for v in unique]
+        res = self.validation.get_many(keys, _MISSING)
+        missing = [i for i, x in enumerate(res) if x is _MISSING]
+        if missing:
+            computed = self.VALIDATORS[type_][1]([unique[i] for i in missing])
+            for i, x in zip(missing, computed):
+                res[i] = x
+            self.validation.set_many((keys[i], x) for i, x in zip(missing, computed))
+        table = dict(zip(unique, res))
+        return [table[v] for v in values]
+
+    def is_cusip(self, s: str) -> bool:
+        return self.is_valid("CUSIP", s)
+
+    def is_isin(self, s: str) -> bool:
+        return self.is_valid("ISIN", s)
+
+    def is_sedol(self, s: str) -> bool:
+        return self.is_valid("SEDOL", s)
+
+    def is_aba(self, s: str) -> bool:
+        return self.is_valid("ABA", s)
+
+    def is_luhn(self, s: str) -> bool:
+        return self.is_valid("LUHN", s)
+
+    def is_cusip_many(self, values: Iterable[str]) -> List[bool]:
+        return self.is_valid_many("CUSIP", values)
+
+    def is_isin_many(self, values: Iterable[str]) -> List[bool]:
+        return self.is_valid_many("ISIN", values)
+
+    def is_sedol_many(self, values: Iterable[str]) -> List[bool]:
+        return self.is_valid_many("SEDOL", values)
+
+    def is_aba_many(self, values: Iterable[str]) -> List[bool]:
+        return self.is_valid_many("ABA", values)
+
+    def is_luhn_many(self, values: Iterable[str]) -> List[bool]:
+        return self.is_valid_many("LUHN", values)
+
+    def check_digit(self, type_: str, payload: str) -> int:
+        """
+        Cached check digit of a payload of the given type (CUSIP, ISIN, SEDOL or LUHN).
+        Invalid payloads raise like the uncached functions and are not cached.
+        """
+        return self.check_digits.get_or_set((type_, payload), lambda key: self.CHECK_DIGITS[type_](payload))
+
+    def enrich(self, ids: Iterable[str], country: str = "US") -> Dict[str, List]:
+        """
+        Cached data.enrich. Rows are cached per (identifier, country); cache misses are enriched together in one call.
+        The cache is not invalidated when the reference data changes -- call clear() after set_refdata or reload_refdata.
+        """
+        from .data import enrich, ENRICH_COLUMNS
+        ids = ids if isinstance(ids, list) else list(ids)
+        unique = list(dict.fromkeys(ids))
+        keys = [(x, country) for x in unique]
+        rows = self.enrichment.get_many(keys, _MISSING)
+        missing = [i for i, x in enumerate(rows) if x is _MISSING]
+        if missing:
+            res = enrich([unique[i] for i in missing], country=country)
+            computed = list(zip(*(res[c] for c in ENRICH_COLUMNS)))
+            for i, row in zip(missing, computed):
+                rows[i] = row
+            self.enrichment.set_many((keys[i], row) for i, row in zip(missing, computed))
+        table = dict(zip(unique, rows))
+        rows = [table[x] for x in ids]
+        return {c: [row[j] for row in rows] for j, c in enumerate(ENRICH_COLUMNS)}
+
+    def clear(self):
+        self.validation.clear()
+        self.check_digits.clear()
+        self.enrichment.clear()
+
+    def stats(self) -> Dict[str, Dict]:
+        """
+        Returns size, hit/miss/eviction counters and hit rate of each cache
+        """
+        return {
+            "validation": self.validation.stats(),
+            "check_digits": self.check_digits.stats(),
+            "enrichment": self.enrichment.stats(),
+        }
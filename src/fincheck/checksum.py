@@ -1,5 +1,58 @@
 from typing import *
-from .utils import ensure_format, keep_numeric, convert_to_n
+from itertools import repeat
+from .utils import ensure_format, keep_numeric, ALPHANUMERIC, _CHAR_DIGITS
+
+#---------------------------------------------
+# Contribution tables
+#---------------------------------------------
+# 256-entry tables indexed by ASCII code. Each maps a character straight to its contribution to the checksum
+# (mod 10), so a check digit is one pass over the encoded input with no intermediate strings or lists.
+
+def _column_table(fn: Callable[[int], int]) -> bytes:
+    """
+    Builds a 256-entry translation table mapping each ASCII alphanumeric to fn(value) % 10
+    """
+    table = bytearray(256)
+    for value, c in enumerate(ALPHANUMERIC):
+        table[ord(c)] = fn(value) % 10
+    return bytes(table)
+
+def _digit_sum(n: int) -> int:
+    return n // 10 + n % 10
+
+_ASCII_ALPHANUMERIC = ALPHANUMERIC.encode("ascii")
+_ASCII_DIGITS = b"0123456789"
+_CUSIP_TABLES = [_column_table(lambda v, w=w: _digit_sum(v * w)) for w in [1, 2, 1, 2, 1, 2, 1, 2]]
+_SEDOL_TABLES = [_column_table(lambda v, w=w: v * w) for w in [1, 3, 1, 7, 3, 9]]
+_LUHN_PLAIN = bytes.maketrans(_ASCII_DIGITS, bytes(range(10)))
+_LUHN_DOUBLE = bytes.maketrans(_ASCII_DIGITS, bytes(_digit_sum(2 * d) for d in range(10)))
+_ISIN_DIGITS = _CHAR_DIGITS #letters expand to two digits
+_CHECK_DIGIT = bytes((10 - (n % 10)) % 10 for n in range(256))
+_ISIN_WIDTH = 22 #11 payload characters expand to at most 22 digits
+_ISIN_TABLES = [_LUHN_PLAIN, _LUHN_DOUBLE] * 11 #the rightmost digit is doubled
+
+def _encode(s: str) -> bytes:
+    """
+    Encodes a payload as ASCII, raising a ValueError for characters outside of 0-9 and A-Z
+    """
+    b = s.encode("ascii", errors="replace")
+    if b.translate(None, _ASCII_ALPHANUMERIC): #anything left after deleting valid characters is invalid
+        raise ValueError("Payloads must consist of the characters 0-9 and A-Z.")
+    return b
+
+def _luhn_sum(digits: bytes) -> int:
+    """
+    Luhn sum of a row of ASCII digits, doubling the rightmost digit
+    """
+    digits = digits[::-1]
+    return sum(digits[0::2].translate(_LUHN_DOUBLE)) + sum(digits[1::2].translate(_LUHN_PLAIN))
+
+
+def _normalize_numerals(s: str) -> str:
+    """
+    Keeps the numeric characters of a string, as ASCII digits (e.g. Arabic-Indic digits are converted)
+    """
+    return "".join(str(int(c)) for c in keep_numeric(s))
 
 def luhn_check_digit(s: str) -> int:
     """
@@ -11,18 +64,9 @@ def luhn_check_digit(s: str) -> int:
         1. 's' -> input string
     """
     s = ensure_format(s)
-    s = keep_numeric(s)
-    if len(s) % 2 == 1:
-        s = "0" + s #zero pad so length is even
-    sum_ = 0
-    for idx in range(len(s), 0, -1):
-        digit = int(s[idx-1])
-        if idx % 2 == 0:
-            digit *= 2
-            if digit > 9:
-                digit -= 9
-        sum_ += digit
-    
+    if not (s.isascii() and s.isdigit()):
+        s = _normalize_numerals(s)
+    sum_ = _luhn_sum(s.encode("ascii"))
     return (10 - (sum_ % 10)) % 10 #using mod operator twice asserts the check digit is < 10
 
 
@@ -39,8 +83,9 @@ def isin_check_digit(s: str) -> int:
         1. 's' -> input string
     """
     s = ensure_format(s, n_chars=11)
-    s = convert_to_n(s)
-    return luhn_check_digit(s)
+    _encode(s)
+    sum_ = _luhn_sum(s.translate(_ISIN_DIGITS).encode("ascii")) #letters expand to their two digit values
+    return (10 - (sum_ % 10)) % 10
 
 def cusip_check_digit(s: str) -> int:
     """
@@ -52,16 +97,9 @@ def cusip_check_digit(s: str) -> int:
     ------
         1. 's' -> input string
     """
-    s = ensure_format(s, n_chars=8)
-    s = convert_to_n(s, return_str=False) #returns a list of digits
-    sum_ = 0
-    for idx in range(len(s)):
-        digit = s[idx]
-        #algorithm isnt zero-indexed, so we want to consider idx+1 or simply flip the logic of the mod operation
-        if idx % 2 != 0:
-            digit *= 2
-        sum_ += int(digit / 10) + digit % 10
-    
+    s = _encode(ensure_format(s, n_chars=8))
+    #algorithm isnt zero-indexed, so every second character (odd idx) is doubled
+    sum_ = sum(s[0::2].translate(_CUSIP_TABLES[0])) + sum(s[1::2].translate(_CUSIP_TABLES[1]))
     return (10 - (sum_ % 10)) % 10 
 
 
@@ -76,13 +114,144 @@ def sedol_check_digit(s: str) -> int:
     ------
         1. 's' -> input string
     """
-    s = ensure_format(s, n_chars=6)
-    s = convert_to_n(s, return_str=False)
-    weights = [1, 3, 1, 7, 3, 9]
-    sum_ = 0
-    for w, v in list(zip(weights, s)):
-        sum_ += w * v
+    s = _encode(ensure_format(s, n_chars=6))
+    #weights are 1, 3, 1, 7, 3, 9 -- each table holds weight * value for its position
+    sum_ = sum(table[c] for table, c in zip(_SEDOL_TABLES, s))
     return (10 - (sum_ % 10)) % 10 
-    
 
 
+#---------------------------------------------
+# Batch check digits
+#---------------------------------------------
+# Payloads are encoded into one contiguous uint8 matrix (a bytes object, one row per payload).
+# Weighting and digit sums are applied a column at a time with the contribution tables above,
+# so the per-character work runs in C rather than in a Python loop.
+
+def _encode_payloads(payloads: Iterable[str], n_chars: int) -> Tuple[List[str], bytes]:
+    """
+    Cleans a batch of payloads and encodes them into one contiguous bytes matrix.
+    Raises the same errors as the single-payload functions: AssertionError for bad input, ValueError for bad characters.
+    """
+    payloads = list(payloads)
+    assert all(isinstance(p, str) for p in payloads), "Input must be a string."
+    blob = "".join(payloads)
+    if " " in blob:
+        payloads = [p.replace(" ", "") for p in payloads]
+        blob = "".join(payloads)
+    if payloads:
+        assert set(map(len, payloads)) == {n_chars}, f"Input must be a payload of {n_chars} characters."
+    return payloads, _encode(blob)
+
+def _add_columns(columns: List[bytes]) -> bytes:
+    """
+    Row-wise sum of a matrix's columns. Each column is read as one big integer (a byte per row), so adding the
+    integers adds every row at once -- exact as long as no row sums to more than 255.
+    """
+    n_rows = len(columns[0]) if columns else 0
+    return sum(int.from_bytes(col, "big") for col in columns).to_bytes(n_rows, "big")
+
+def _weighted_check_digits(columns: List[bytes], tables: List[bytes]) -> bytes:
+    """
+    Weighted column sums over the columns of a matrix -- returns one check digit per row
+    """
+    return _add_columns([col.translate(table) for col, table in zip(columns, tables)]).translate(_CHECK_DIGIT)
+
+def _fixed_width_check_digits(matrix: bytes, tables: List[bytes]) -> List[int]:
+    """
+    Weighted column sums over a matrix whose row width equals len(tables)
+    """
+    width = len(tables)
+    return list(_weighted_check_digits([matrix[i::width] for i in range(width)], tables))
+
+def _isin_check_digits(payloads: Iterable[str]) -> bytes:
+    """
+    Check digits for validated ISIN payloads. Letters expand to two digits, and each row is left padded with zeros
+    (which add nothing to a Luhn sum) to a fixed width, so the rows form a matrix.
+    """
+    digits = map(str.translate, payloads, repeat(_ISIN_DIGITS))
+    matrix = "".join(map(str.rjust, digits, repeat(_ISIN_WIDTH), repeat("0"))).encode("ascii")
+    return _weighted_check_digits([matrix[i::_ISIN_WIDTH] for i in range(_ISIN_WIDTH)], _ISIN_TABLES)
+
+def _luhn_check_digits(rows: Iterable[bytes]) -> List[int]:
+    """
+    Luhn check digits for rows of ASCII digits. The rightmost digit of each row is doubled.
+    """
+    return [(10 - (sum_ % 10)) % 10 for sum_ in map(_luhn_sum, rows)]
+
+def luhn_check_digits(payloads: Iterable[str]) -> List[int]:
+    """
+    Batch variant of luhn_check_digit. Returns a list of check digits, one per payload.
+    ------
+    PARAMS
+    ------
+        1. 'payloads' -> sequence, array or iterable of input strings
+    """
+    payloads = [ensure_format(p) for p in payloads]
+    blob = "".join(payloads)
+    if not (blob.isascii() and blob.isdigit()):
+        payloads = [_normalize_numerals(p) for p in payloads] #same normalization as luhn_check_digit
+    return _luhn_check_digits(p.encode("ascii") for p in payloads)
+
+def isin_check_digits(payloads: Iterable[str]) -> List[int]:
+    """
+    Batch variant of isin_check_digit. Returns a list of check digits, one per payload.
+    ------
+    PARAMS
+    ------
+        1. 'payloads' -> sequence, array or iterable of 11 character ISIN payloads
+    """
+    payloads, _ = _encode_payloads(payloads, n_chars=11)
+    return list(_isin_check_digits(payloads))
+
+def cusip_check_digits(payloads: Iterable[str]) -> List[int]:
+    """
+    Batch variant of cusip_check_digit. Returns a list of check digits, one per payload.
+    ------
+    PARAMS
+    ------
+        1. 'payloads' -> sequence, array or iterable of 8 character CUSIP payloads
+    """
+    _, matrix = _encode_payloads(payloads, n_chars=8)
+    return _fixed_width_check_digits(matrix, _CUSIP_TABLES)
+
+def sedol_check_digits(payloads: Iterable[str]) -> List[int]:
+    """
+    Batch variant of sedol_check_digit. Returns a list of check digits, one per payload.
+    ------
+    PARAMS
+    ------
+        1. 'payloads' -> sequence, array or iterable of 6 character SEDOL payloads
+    """
+    _, matrix = _encode_payloads(payloads, n_chars=6)
+    return _fixed_width_check_digits(matrix, _SEDOL_TABLES)
+
+
+#type -> (batch function, single-payload function), for callers that dispatch on an identifier type
+CHECK_DIGIT_FUNCTIONS = {
+    "CUSIP": (cusip_check_digits, cusip_check_digit),
+    "ISIN": (isin_check_digits, isin_check_digit),
+    "SEDOL": (sedol_check_digits, sedol_check_digit),
+    "LUHN": (luhn_check_digits, luhn_check_digit),
+}
+
+def check_digits_or_none(type_: str, payloads: List[str]) -> List[Optional[int]]:
+    """
+    Batch check digits that tolerate invalid payloads: returns None for each payload the single function rejects.
+    The batch function is tried first; only if it fails are the payloads computed one by one to find the bad ones.
+    ------
+    PARAMS
+    ------
+        1. 'type_' -> "CUSIP", "ISIN", "SEDOL" or "LUHN"
+        2. 'payloads' -> list of payloads
+    """
+    many_fn, single_fn = CHECK_DIGIT_FUNCTIONS[type_]
+    try:
+        return many_fn(payloads)
+    except (ValueError, AssertionError): #at least one invalid payload -- find which
+        digits = []
+        for x in payloads:
+            try:
+                digits.append(single_fn(x))
+            except (ValueError, AssertionError, IndexError):
+                digits.append(None)
+        return digits
@@ -0,0 +1,239 @@
+"""
+Command-line interface
+
+    python -m fincheck validate --type CUSIP ids.txt > results.csv
+    python -m fincheck check-digit --type ISIN payloads.txt --format jsonl
+    python -m fincheck extract --include CUSIP ISIN --workers 8 filings/*.txt -o found.csv
+    python -m fincheck enrich --country US ids.txt -o enriched.jsonl --format jsonl
+
+validate, check-digit and enrich read one value per line from the given files, or stdin if none (or "-") is given.
+Lines are read in chunks with large buffers and each chunk goes through the bulk functions (validate.is_*_many,
+checksum.*_check_digits, data.enrich); with --workers N the chunks are spread over N processes, in order.
+extract streams each file (or stdin) as one document, writing matches in chunks as they are found; with --workers N
+files are cut into segments between tokens, scanned by N processes and written back in order, with bounded memory.
+
+Results are written as CSV (default, with a header) or JSON lines, to stdout or --output.
+A summary with the number of rows and rows/sec is printed to stderr (--quiet to disable).
+"""
+from typing import *
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from .validate import BULK_VALIDATORS
+from .checksum import CHECK_DIGIT_FUNCTIONS, check_digits_or_none
+from .extract import IDENTIFIER_TYPES, get_extractor, iter_securities, _iter_segments
+
+BUFFER_SIZE = 1 << 20
+
+
+#---------------------------------------------
+# Chunk functions -- top level so they can run in worker processes.
+# Results are sent back without the input lines, which the parent still holds, to halve pickling costs.
+#---------------------------------------------
+def _validate_chunk(type_: str, lines: List[str]) -> List[bool]:
+    return BULK_VALIDATORS[type_](lines)
+
+def _enrich_chunk(country: str, lines: List[str]) -> List[Tuple]:
+    from .data import enrich, ENRICH_COLUMNS
+    res = enrich(lines, country=country)
+    return list(zip(*(res[c] for c in ENRICH_COLUMNS)))
+
+def _extract_chunk(include: Tuple[str, ...], segments: List[Tuple[str, int, str]]) -> List[Tuple]:
+    extractor = get_extractor(include)
+    return [
+        (path, t, value, offset + start, offset + end)
+        for path, offset, segment in segments for t, value, start, end in extractor.scan(segment)
+    ]
+
+
+#---------------------------------------------
+# I/O
+#---------------------------------------------
+def _iter_lines(paths: List[str]) -> Iterator[str]:
+    for path in paths or ["-"]:
+        f = sys.stdin if path == "-" else open(path, "r", encoding="utf-8", errors="replace", buffering=BUFFER_SIZE)
+        try:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield line
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+def _iter_extracted(paths: List[str], include: Tuple[str, ...]) -> Iterator[Tuple]:
+    """
+    Yields (source, type, value, start, end) for every identifier in each file (or stdin), streaming
+    """
+    for path in paths or ["-"]:
+        f = sys.stdin if path == "-" else open(path, "r", encoding="utf-8", errors="replace", buffering=BUFFER_SIZE)
+        try:
+            for x in iter_securities(f, include):
+                yield (path,) + x
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+def _iter_file_segments(paths: List[str]) -> Iterator[List[Tuple[str, int, str]]]:
+    """
+    Yields each file (or stdin) as [(source, offset, segment)] tasks of about BUFFER_SIZE characters, cut between tokens
+    """
+    for path in paths or ["-"]:
+        f = sys.stdin if path == "-" else open(path, "r", encoding="utf-8", errors="replace", buffering=BUFFER_SIZE)
+        try:
+            for offset, segment in _iter_segments(iter(lambda: f.read(BUFFER_SIZE), "")):
+                yield [(path, offset, segment)]
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+def _iter_chunks(items: Iterable, chunk_size: int) -> Iterator[List]:
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def _map_chunks(fn: Callable, arg: Any, chunks: Iterable[List], workers: int) -> Iterator[Tuple[List, List]]:
+    """
+    Yields (chunk, fn(arg, chunk)) for each chunk, in order. With several workers, at most workers * 2 chunks are in flight.
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield chunk, fn(arg, chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, pool.submit(fn, arg, chunk)))
+            if len(pending) >= workers * 2:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+        while pending:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+
+class _Writer(object):
+    """
+    Writes rows as CSV (with a header) or JSON lines
+    """
+    def __init__(self, f: IO, columns: List[str], format: str):
+        self.f = f
+        self.columns = columns
+        self.format = format
+        if format == "csv":
+            self._csv = csv.writer(f, lineterminator="\n")
+            self._csv.writerow(columns)
+
+    def write_rows(self, rows: List[Tuple]):
+        if self.format == "csv":
+            self._csv.writerows(rows)
+        else:
+            columns = self.columns
+            self.f.write("".join(json.dumps(dict(zip(columns, row))) + "\n" for row in rows))
+
+
+#---------------------------------------------
+# Commands
+#---------------------------------------------
+def _run(args: argparse.Namespace, out: IO) -> Dict:
+    """
+    Runs a subcommand, writing rows to out. Returns summary counters.
+    """
+    summary = {"rows": 0}
+    if args.command == "extract":
+        writer = _Writer(out, ["source", "type", "value", "start", "end"], args.format)
+        include = tuple(x.upper() for x in args.include)
+        if args.workers <= 1:
+            results = _iter_chunks(_iter_extracted(args.files, include), args.chunk_size)
+        else: #large files are cut into segments, spread over the workers and written back in order
+            results = (rows for _, rows in _map_chunks(_extract_chunk, include, _iter_file_segments(args.files), args.workers))
+        for rows in results:
+            writer.write_rows(rows)
+            summary["rows"] += len(rows)
+        summary["documents"] = len(args.files) or 1
+        return summary
+
+    if args.command == "validate":
+        fn, arg, columns = _validate_chunk, args.type.upper(), ["value", "is_valid"]
+    elif args.command == "check-digit":
+        fn, arg, columns = check_digits_or_none, args.type.upper(), ["payload", "check_digit", "id"]
+    else:
+        from .data import ENRICH_COLUMNS
+        fn, arg, columns = _enrich_chunk, args.country, ENRICH_COLUMNS
+    writer = _Writer(out, columns, args.format)
+    if args.command == "validate":
+        summary["valid"] = 0
+    for lines, res in _map_chunks(fn, arg, _iter_chunks(_iter_lines(args.files), args.chunk_size), args.workers):
+        summary["rows"] += len(lines)
+        if args.command == "validate":
+            summary["valid"] += sum(res)
+            rows = zip(lines, res)
+            if args.only_valid or args.only_invalid:
+                rows = [r for r in rows if r[1] == args.only_valid]
+        elif args.command == "check-digit":
+            rows = [(x, d, None if d is None else f"{x}{d}") for x, d in zip(lines, res)]
+        else:
+            rows = res
+        writer.write_rows(rows)
+    return summary
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="fincheck", description="Validate, compute check digits for, extract and enrich security identifiers.")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("files", nargs="*", help="input files. Reads stdin if none (or -) are given")
+    common.add_argument("-o", "--output", default=None, help="output file. Defaults to stdout")
+    common.add_argument("-f", "--format", choices=["csv", "jsonl"], default="csv")
+    common.add_argument("-w", "--workers", type=int, default=1, help="worker processes")
+    common.add_argument("--chunk-size", type=int, default=65536, help="lines per chunk sent to the bulk functions")
+    common.add_argument("-q", "--quiet", action="store_true", help="do not print the summary to stderr")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    validate = commands.add_parser("validate", parents=[common], help="validate one identifier per line")
+    validate.add_argument("-t", "--type", type=str.upper, choices=list(BULK_VALIDATORS), required=True)
+    only = validate.add_mutually_exclusive_group()
+    only.add_argument("--only-valid", action="store_true", help="only write valid identifiers")
+    only.add_argument("--only-invalid", action="store_true", help="only write invalid identifiers")
+
+    check_digit = commands.add_parser("check-digit", parents=[common], help="compute the check digit of one payload per line")
+    check_digit.add_argument("-t", "--type", type=str.upper, choices=list(CHECK_DIGIT_FUNCTIONS), required=True)
+
+    extract = commands.add_parser("extract", parents=[common], help="extract identifiers from documents")
+    extract.add_argument("-i", "--include", nargs="+", type=str.upper, choices=list(IDENTIFIER_TYPES), default=["CUSIP", "ISIN", "SEDOL"])
+
+    enrich = commands.add_parser("enrich", parents=[common], help="enrich one CUSIP or ISIN per line with reference data")
+    enrich.add_argument("-c", "--country", choices=["US", "CA"], default="US", help="country used to convert CUSIPs to ISINs")
+    return parser
+
+def main(argv: List[str] = None) -> int:
+    """
+    Entry point of `python -m fincheck`
+    """
+    args = build_parser().parse_args(argv)
+    start = time.perf_counter()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="", buffering=BUFFER_SIZE) as out:
+            summary = _run(args, out)
+    else:
+        try:
+            summary = _run(args, sys.stdout)
+            sys.stdout.flush()
+        except BrokenPipeError: #e.g. piped into head
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno()) #so the interpreter does not fail flushing at exit
+            return 1
+    seconds = time.perf_counter() - start
+    if not args.quiet:
+        details = "".join(f", {k}={v:,}" for k, v in summary.items() if k != "rows")
+        print(
+            f"fincheck {args.command}: {summary['rows']:,} rows in {seconds:.2f}s "
+            f"({summary['rows'] / seconds if seconds else 0:,.0f} rows/sec{details})",
+            file=sys.stderr
+        )
+    return 0
@@ -0,0 +1,209 @@
+"""
+pandas and Arrow column support
+
+Validation, check digits and extraction over a whole column at once, instead of Series.apply(is_cusip):
+    > a column is converted to a list of strings in one call (Series.tolist / Array.to_pylist, in C), with nulls as ""
+    > validation and check digits go through the bulk functions (validate.is_*_many, checksum.*_check_digits),
+      which screen and checksum the joined rows as one buffer
+    > extraction joins the column into one text and scans it once; matches are mapped back to their rows by offset
+    > results are returned as a column of the same kind: a pandas Series (same index and name), a pyarrow array,
+      or a list for any other sequence
+
+pandas and pyarrow are optional -- this module works with either, both, or neither installed.
+Importing it registers a `fincheck` accessor on pandas Series.
+
+Example Usage:
+
+    >>> import pandas as pd
+    >>> import fincheck.columns
+    >>> s = pd.Series(["037833100", "037833101", None])
+    >>> s.fincheck.is_cusip()
+    0     True
+    1    False
+    2    False
+    dtype: bool
+    >>> pd.Series(["03783310", "93114210"]).fincheck.check_digit("CUSIP")
+    0    0
+    1    3
+    dtype: Int64
+    >>> pd.Series(["buy 037833100", "no ids", "US0378331005 and 594918104"]).fincheck.extract(["CUSIP", "ISIN"])
+       row   type         value  start  end
+    0    0  CUSIP     037833100      4   13
+    1    2   ISIN  US0378331005      0   12
+    2    2  CUSIP     594918104     17   26
+"""
+from typing import *
+from bisect import bisect_right
+from itertools import accumulate
+from .validate import BULK_VALIDATORS
+from .checksum import CHECK_DIGIT_FUNCTIONS, check_digits_or_none
+from .extract import get_extractor
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = pc = None
+
+_PAYLOAD_LENGTHS = {"CUSIP": 8, "ISIN": 11, "SEDOL": 6}
+
+def _is_series(column: Any) -> bool:
+    return pd is not None and isinstance(column, pd.Series)
+
+def _is_arrow(column: Any) -> bool:
+    return pa is not None and isinstance(column, (pa.Array, pa.ChunkedArray))
+
+def _to_list(column: Union["pd.Series", "pa.Array", "pa.ChunkedArray", Sequence[str]]) -> List[str]:
+    """
+    Converts a column to a list of strings in one call, with nulls as empty strings
+    """
+    if _is_series(column):
+        return column.fillna("").astype(str).tolist()
+    if _is_arrow(column):
+        return pc.fill_null(column.cast(pa.string()), "").to_pylist()
+    return ["" if x is None else x for x in column]
+
+def _wrap(column: Any, values: List, dtype: str) -> Union["pd.Series", "pa.Array", List]:
+    """
+    Returns values as a column of the same kind as the input. dtype is "bool" or "int" (nullable, None for missing)
+    """
+    if _is_series(column):
+        return pd.Series(values, index=column.index, name=column.name, dtype="bool" if dtype == "bool" else "Int64")
+    if _is_arrow(column):
+        return pa.array(values, type=pa.bool_() if dtype == "bool" else pa.int8())
+    return values
+
+
+def validate_column(column: Union["pd.Series", "pa.Array", "pa.ChunkedArray", Sequence[str]], type_: str = "CUSIP", universe: Container = None) -> Union["pd.Series", "pa.Array", List[bool]]:
+    """
+    Validates a column of identifiers in bulk. Returns a boolean column (nulls are not valid).
+    ------
+    PARAMS
+    ------
+        1. 'column' -> pandas Series, pyarrow Array / ChunkedArray, or sequence of strings
+        2. 'type_' -> "CUSIP", "ISIN", "SEDOL", "ABA" or "LUHN"
+        3. 'universe' -> optional BloomFilter, set or other container. If given, valid identifiers must also be in it.
+    """
+    type_ = type_.upper()
+    assert type_ in BULK_VALIDATORS, f"'type_' must be one of {', '.join(BULK_VALIDATORS)}"
+    return _wrap(column, BULK_VALIDATORS[type_](_to_list(column), universe=universe), "bool")
+
+def check_digit_column(column: Union["pd.Series", "pa.Array", "pa.ChunkedArray", Sequence[str]], type_: str = "CUSIP") -> Union["pd.Series", "pa.Array", List[Optional[int]]]:
+    """
+    Computes the check digits of a column of payloads in bulk. Returns an integer column, null where a payload is invalid.
+    ------
+    PARAMS
+    ------
+        1. 'column' -> pandas Series, pyarrow Array / ChunkedArray, or sequence of payloads
+        2. 'type_' -> "CUSIP", "ISIN", "SEDOL" or "LUHN"
+    """
+    type_ = type_.upper()
+    assert type_ in CHECK_DIGIT_FUNCTIONS, f"'type_' must be one of {', '.join(CHECK_DIGIT_FUNCTIONS)}"
+    values = _to_list(column)
+    n_chars = _PAYLOAD_LENGTHS.get(type_)
+    #nulls and rows of the wrong length are left out, so they do not send the whole batch down the per-row fallback
+    idx = [i for i, v in enumerate(values) if v and (n_chars is None or len(v) == n_chars or " " in v)]
+    res = [None] * len(values)
+    for i, d in zip(idx, check_digits_or_none(type_, [values[i] for i in idx])):
+        res[i] = d
+    return _wrap(column, res, "int")
+
+def _extract(values: List[str], include: List[str], universe: Container) -> Tuple[List[int], List[Tuple[str, str, int, int]]]:
+    """
+    Scans all rows as one text (joined by newlines). Returns the row position and (type, value, start, end) of each match,
+    with start and end relative to the row.
+    """
+    offsets = list(accumulate(map((1).__add__, map(len, values)), initial=0)) #start of each row in the joined text
+    matches = get_extractor(include, universe).scan("\n".join(values))
+    rows = [bisect_right(offsets, m[2]) - 1 for m in matches]
+    return rows, [(t, value, start - offsets[row], end - offsets[row]) for row, (t, value, start, end) in zip(rows, matches)]
+
+def extract_column(column: Union["pd.Series", "pa.Array", "pa.ChunkedArray", Sequence[str]], include: List = ["CUSIP", "ISIN", "SEDOL"], universe: Container = None) -> Union["pd.DataFrame", "pa.Table", Dict[str, List]]:
+    """
+    Extracts identifiers from a column of text, scanning the whole column at once.
+    --------
+    Returns:
+        > one row per match, with the columns row, type, value, start and end -- as a pandas DataFrame (row holds
+          index labels), a pyarrow Table or a dict of lists (row holds positions)
+    --------
+    ------
+    PARAMS
+    ------
+        1. 'column' -> pandas Series, pyarrow Array / ChunkedArray, or sequence of strings
+        2. 'include' -> identifier types to extract
+        3. 'universe' -> optional BloomFilter, set or other container. If given, only identifiers in it are returned.
+    """
+    rows, matches = _extract(_to_list(column), include, universe)
+    types, values, starts, ends = map(list, zip(*matches)) if matches else ([], [], [], [])
+    if _is_series(column):
+        labels = column.index[rows] if rows else column.index[:0]
+        return pd.DataFrame({"row": labels, "type": types, "value": values, "start": starts, "end": ends})
+    res = {"row": rows, "type": types, "value": values, "start": starts, "end": ends}
+    if _is_arrow(column):
+        return pa.table(res)
+    return res
+
+def find_column(column: Union["pd.Series", "pa.Array", "pa.ChunkedArray", Sequence[str]], type_: str = "CUSIP", universe: Container = None) -> Union["pd.Series", "pa.Array", List[List[str]]]:
+    """
+    Finds the identifiers of one type in each row of a column of text, scanning the whole column at once.
+    Returns a list column: the valid identifiers of each row, in order of appearance.
+    ------
+    PARAMS
+    ------
+        1. 'column' -> pandas Series, pyarrow Array / ChunkedArray, or sequence of strings
+        2. 'type_' -> "CUSIP", "ISIN", "SEDOL" or "ABA"
+        3. 'universe' -> optional BloomFilter, set or other container. If given, only identifiers in it are returned.
+    """
+    values = _to_list(column)
+    rows, matches = _extract(values, [type_], universe)
+    res = [[] for _ in values]
+    for row, m in zip(rows, matches):
+        res[row].append(m[1])
+    if _is_series(column):
+        return pd.Series(res, index=column.index, name=column.name, dtype="object")
+    if _is_arrow(column):
+        return pa.array(res, type=pa.list_(pa.string()))
+    return res
+
+
+if pd is not None:
+    @pd.api.extensions.register_series_accessor("fincheck")
+    class FincheckAccessor(object):
+        """
+        ----------------------------
+        Series.fincheck accessor, registered when fincheck.columns is imported
+        ----------------------------
+        Bulk versions of the validation, check digit and extraction functions for a Series of strings.
+        ----------------------------
+        """
+        def __init__(self, series: "pd.Series"):
+            self._series = series
+
+        def is_valid(self, type_: str = "CUSIP", universe: Container = None) -> "pd.Series":
+            return validate_column(self._series, type_, universe)
+
+        def is_cusip(self, universe: Container = None) -> "pd.Series":
+            return validate_column(self._series, "CUSIP", universe)
+
+        def is_isin(self, universe: Container = None) -> "pd.Series":
+            return validate_column(self._series, "ISIN", universe)
+
+        def is_sedol(self, universe: Container = None) -> "pd.Series":
+            return validate_column(self._series, "SEDOL", universe)
+
+        def is_aba(self, universe: Container = None) -> "pd.Series":
+            return validate_column(self._series, "ABA", universe)
+
+        def check_digit(self, type_: str = "CUSIP") -> "pd.Series":
+            return check_digit_column(self._series, type_)
+
+        def extract(self, include: List = ["CUSIP", "ISIN", "SEDOL"], universe: Container = None) -> "pd.DataFrame":
+            return extract_column(self._series, include, universe)
+
+        def find(self, type_: str = "CUSIP", universe: Container = None) -> "pd.Series":
+            return find_column(self._series, type_, universe)
@@ -0,0 +1,423 @@
+"""
+Compact, memory-mapped reference data
+
+The build step compiles cusip_list.csv, cusip_ticker_map.csv and country_codes.csv into a single binary file:
+
+    python -m fincheck.compiled [output path]
+
+File layout (little endian):
+    1. Header: magic, version, number of sections, string table offset and length
+    2. Section table: name, key width, values per row, row count and rows offset of each section
+    3. Rows: fixed-width records sorted by key
+        > key (null padded ASCII) followed by an (offset, length) reference into the string table per value
+    4. String table: deduplicated UTF-8 strings
+
+CompiledRefData opens the file with mmap and finds keys by binary search, so no per-row Python objects are created
+and forked workers share the same pages.
+
+SharedRefData holds the same format in a multiprocessing.shared_memory segment instead of a file. A parent process
+compiles it once; workers attach by name (or receive the object pickled) and get the same lookup API:
+
+    >>> from fincheck.compiled import SharedRefData, attach_refdata
+    >>> shared = SharedRefData.create()              #parent: compile the refdata into shared memory once
+    >>> pool = ProcessPoolExecutor(initializer=attach_refdata, initargs=(shared.name,))
+    >>> ...                                           #workers: Cusip / Isin / enrich use the shared segment
+    >>> shared.close(); shared.unlink()               #parent: detach and free the segment
+"""
+from typing import *
+from multiprocessing import resource_tracker, shared_memory
+import mmap
+import os
+import struct
+import sys
+import time
+from .utils import resource_path
+from . import metrics
+
+MAGIC = b"FCRD"
+VERSION = 1
+DEFAULT_PATH = "refdata/refdata.bin"
+
+_HEADER = struct.Struct("<4sIIQQ") #magic, version, n_sections, strings_offset, strings_length
+_SECTION = struct.Struct("<16sIIIQ") #name, key_width, n_values, n_rows, rows_offset
+_REF = struct.Struct("<IH") #string table offset, length
+
+
+def _section_rows(index: Dict) -> List[Tuple[bytes, Tuple[str, ...]]]:
+    rows = []
+    for k, v in index.items():
+        if not isinstance(v, tuple):
+            v = (v,)
+        rows.append((k.encode("ascii"), v))
+    rows.sort(key=lambda x: x[0])
+    return rows
+
+def compile_refdata(refdata: "RefData" = None) -> bytes:
+    """
+    Compiles the reference data into the binary format described above and returns it
+    ------
+    PARAMS
+    ------
+        1. 'refdata' -> RefData registry to compile. Defaults to a fresh registry built from the bundled csv files
+    """
+    from .data import RefData
+    refdata = refdata or RefData()
+    sections = [
+        (b"cusips", _section_rows(refdata.cusips), 2),
+        (b"tickers", _section_rows(refdata.tickers), 1),
+        (b"countries", _section_rows(refdata.countries), 1),
+    ]
+    strings = bytearray()
+    string_refs = {}
+    def ref(s: str) -> Tuple[int, int]:
+        if s not in string_refs:
+            b = s.encode("utf-8")
+            string_refs[s] = (len(strings), len(b))
+            strings.extend(b)
+        return string_refs[s]
+
+    offset = _HEADER.size + _SECTION.size * len(sections)
+    section_headers = []
+    blobs = []
+    for name, rows, n_values in sections:
+        key_width = max((len(k) for k, _ in rows), default=1)
+        record = struct.Struct(f"<{key_width}s" + "IH" * n_values)
+        blob = bytearray()
+        for k, values in rows:
+            fields = []
+            for v in values:
+                fields.extend(ref(v))
+            blob.extend(record.pack(k, *fields))
+        section_headers.append(_SECTION.pack(name, key_width, n_values, len(rows), offset))
+        blobs.append(blob)
+        offset += len(blob)
+    return b"".join([_HEADER.pack(MAGIC, VERSION, len(sections), offset, len(strings))] + section_headers + blobs + [strings])
+
+def build_compiled_refdata(path: str = None, refdata: "RefData" = None) -> str:
+    """
+    Compiles the reference data into a sorted, fixed-width binary file and returns its path
+    ------
+    PARAMS
+    ------
+        1. 'path' -> output path. Defaults to refdata/refdata.bin inside the package
+        2. 'refdata' -> RefData registry to compile. Defaults to a fresh registry built from the bundled csv files
+    """
+    path = path or resource_path(DEFAULT_PATH)
+    blob = compile_refdata(refdata)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(blob)
+    os.replace(tmp, path) #atomic, so processes never map a half-written file
+    return path
+
+
+class _Section(object):
+    """
+    A sorted table of fixed-width records inside the mapped buffer
+    """
+    def __init__(self, buf, key_width: int, n_values: int, n_rows: int, rows_offset: int, strings_offset: int):
+        self.buf = buf
+        self.key_width = key_width
+        self.n_rows = n_rows
+        self.rows_offset = rows_offset
+        self.strings_offset = strings_offset
+        self.record_size = key_width + _REF.size * n_values
+        self.n_values = n_values
+
+    def find(self, key: str) -> Optional[Tuple[str, ...]]:
+        try:
+            key = key.encode("ascii")
+        except (UnicodeEncodeError, AttributeError):
+            return None
+        w = self.key_width
+        if len(key) > w:
+            return None
+        key = key.ljust(w, b"\0")
+        buf, base, size = self.buf, self.rows_offset, self.record_size
+        lo, hi = 0, self.n_rows
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = base + mid * size
+            k = bytes(buf[start:start + w])
+            if k < key:
+                lo = mid + 1
+            elif k > key:
+                hi = mid
+            else:
+                return self._values(start)
+        return None
+
+    def _values(self, start: int) -> Tuple[str, ...]:
+        buf = self.buf
+        values = []
+        pos = start + self.key_width
+        for _ in range(self.n_values):
+            off, n = _REF.unpack_from(buf, pos)
+            off += self.strings_offset
+            values.append(bytes(buf[off:off + n]).decode("utf-8"))
+            pos += _REF.size
+        return tuple(values)
+
+    def keys(self) -> Iterator[str]:
+        """
+        Yields every key, in sorted order
+        """
+        buf, w, size = self.buf, self.key_width, self.record_size
+        for start in range(self.rows_offset, self.rows_offset + self.n_rows * size, size):
+            yield bytes(buf[start:start + w]).rstrip(b"\0").decode("ascii")
+
+    def items(self) -> Iterator[Tuple[str, Tuple[str, ...]]]:
+        """
+        Yields (key, values) for every row, in sorted order
+        """
+        size = self.record_size
+        for i, key in enumerate(self.keys()):
+            yield key, self._values(self.rows_offset + i * size)
+
+
+class CompiledRefData(object):
+    """
+    ----------------------------
+    Reference data backed by a compiled, memory-mapped file
+    ----------------------------
+    Drop-in replacement for data.RefData -- exposes the same lookup_* methods.
+    Build the file first with build_compiled_refdata() or `python -m fincheck.compiled`.
+    ----------------------------
+    """
+    def __init__(self, path: str = None):
+        self.path = path or resource_path(DEFAULT_PATH)
+        self._file = None
+        self._buf = None
+        self._sections = None
+        self._open_seconds = None
+        self._lookups = 0
+        self._open()
+
+    def _map(self):
+        """
+        Returns a read-only buffer over the compiled data
+        """
+        self._file = open(self.path, "rb")
+        return mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _open(self):
+        start = time.perf_counter()
+        buf = self._map()
+        magic, version, n_sections, strings_offset, _ = _HEADER.unpack_from(buf, 0)
+        assert magic == MAGIC, f"{self.path} is not a compiled fincheck refdata file."
+        assert version == VERSION, f"Unsupported compiled refdata version: {version}. Rebuild with build_compiled_refdata()."
+        sections = {}
+        for i in range(n_sections):
+            name, key_width, n_values, n_rows, rows_offset = _SECTION.unpack_from(buf, _HEADER.size + i * _SECTION.size)
+            sections[name.rstrip(b"\0").decode("ascii")] = _Section(
+                buf, key_width, n_values, n_rows, rows_offset, strings_offset
+            )
+        self._buf = buf
+        self._sections = sections
+        self._open_seconds = time.perf_counter() - start
+        metrics.record_load("refdata.compiled", self._open_seconds)
+
+    def lookup_cusip(self, cusip: str) -> Optional[Tuple[str, str]]:
+        """
+        Returns a tuple of (name, asset type) for a cusip, or None if it is not in the reference data
+        """
+        self._lookups += 1
+        self._check_open()
+        return self._sections["cusips"].find(cusip)
+
+    def lookup_ticker(self, cusip: str) -> Optional[str]:
+        """
+        Returns the ticker for a cusip, or None if it is not in the reference data
+        """
+        self._lookups += 1
+        self._check_open()
+        data = self._sections["tickers"].find(cusip)
+        return data[0] if data else None
+
+    def lookup_country(self, code: str) -> Optional[str]:
+        """
+        Returns the country name for an ISO 3166-1-alpha-2 code, or None if it is not in the reference data
+        """
+        self._lookups += 1
+        self._check_open()
+        data = self._sections["countries"].find(code)
+        return data[0] if data else None
+
+    def iter_cusips(self) -> Iterator[str]:
+        """
+        Yields every cusip in the reference data, in sorted order
+        """
+        self._check_open()
+        return self._sections["cusips"].keys()
+
+    def iter_tickers(self) -> Iterator[Tuple[str, str]]:
+        """
+        Yields (cusip, ticker) for every ticker in the reference data, in sorted order
+        """
+        self._check_open()
+        return ((cusip, values[0]) for cusip, values in self._sections["tickers"].items())
+
+    def _check_open(self):
+        assert self._sections is not None, f"Reference data {self.path} is closed. Call reload() to reopen it."
+
+    def load(self) -> "CompiledRefData":
+        return self
+
+    def close(self):
+        self._sections = None
+        if self._buf is not None:
+            self._buf.close()
+            self._buf = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def reload(self) -> "CompiledRefData":
+        """
+        Re-maps the compiled file, picking up a rebuilt version
+        """
+        self.close()
+        self._open()
+        return self
+
+    def stats(self) -> Dict:
+        """
+        Returns row counts, mapped size (bytes) and time spent opening the file (seconds)
+        """
+        self._check_open()
+        return {
+            "lookups": self._lookups,
+            "path": self.path,
+            "bytes": len(self._buf),
+            "load_seconds": self._open_seconds,
+            "indexes": {
+                name: {"loaded": True, "rows": section.n_rows}
+                for name, section in self._sections.items()
+            }
+        }
+
+
+
+def _attach_untracked(name: str) -> shared_memory.SharedMemory:
+    """
+    Attaches to an existing segment without leaving it registered with the resource tracker.
+    Before python 3.13, attaching registers the segment for unlinking when the tracker shuts down, which would free it
+    under the other processes -- so the registration is undone right away.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False) #python >= 3.13
+    except TypeError:
+        pass
+    shm = shared_memory.SharedMemory(name=name)
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class SharedRefData(CompiledRefData):
+    """
+    ----------------------------
+    Compiled reference data in a shared memory segment
+    ----------------------------
+    Drop-in replacement for data.RefData, like CompiledRefData. Create it once with SharedRefData.create() in the
+    parent process; attach in workers with SharedRefData.attach(name) or attach_refdata(name).
+    Instances pickle as a reference to the segment, so they can also be passed to workers directly.
+    Only the creating process should unlink() the segment, after the workers have detached.
+    ----------------------------
+    """
+    def __init__(self, name: str, _shm: shared_memory.SharedMemory = None):
+        """
+        Attaches to an existing segment. Prefer SharedRefData.create / SharedRefData.attach.
+        """
+        self.name = name
+        self.owner = _shm is not None
+        self._shm = _shm
+        super().__init__(path=f"shm://{name}")
+
+    @classmethod
+    def create(cls, refdata: "RefData" = None, name: str = None) -> "SharedRefData":
+        """
+        Compiles the reference data into a new shared memory segment
+        ------
+        PARAMS
+        ------
+            1. 'refdata' -> RefData registry to compile. Defaults to a fresh registry built from the bundled csv files
+            2. 'name' -> segment name. Defaults to a random name (see .name)
+        """
+        blob = compile_refdata(refdata)
+        shm = shared_memory.SharedMemory(name=name, create=True, size=len(blob))
+        shm.buf[:len(blob)] = blob
+        return cls(shm.name, _shm=shm)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedRefData":
+        """
+        Attaches to a segment created by another process
+        """
+        return cls(name)
+
+    def _map(self):
+        if self._shm is None:
+            self._shm = _attach_untracked(self.name)
+        return self._shm.buf
+
+    def close(self):
+        """
+        Detaches from the segment. The segment itself remains until the owner calls unlink().
+        """
+        self._sections = None
+        self._buf = None
+        if self._shm is not None:
+            self._shm.close()
+            if not self.owner:
+                self._shm = None
+
+    def unlink(self):
+        """
+        Frees the segment. Call from the creating process once every worker has detached.
+        """
+        assert self.owner, "Only the process that created the segment can unlink it."
+        #workers started from this process share its resource tracker, so a worker attaching before python 3.13 has
+        #unregistered the segment there too -- register it again so unlink() does not unregister an unknown name
+        if sys.version_info < (3, 13):
+            resource_tracker.register(self._shm._name, "shared_memory")
+        self._shm.unlink()
+
+    def reload(self) -> "SharedRefData":
+        """
+        Re-attaches to the segment. Shared segments are immutable -- to update, create a new segment and swap it in.
+        """
+        self.close()
+        if self.owner:
+            self._shm = _attach_untracked(self.name)
+        self._open()
+        return self
+
+    def stats(self) -> Dict:
+        res = super().stats()
+        res.update({"shared_memory": self.name, "owner": self.owner})
+        return res
+
+    def __reduce__(self):
+        return (SharedRefData.attach, (self.name,))
+
+    def __enter__(self) -> "SharedRefData":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        if self.owner:
+            self.unlink()
+
+def attach_refdata(name: str) -> SharedRefData:
+    """
+    Attaches to a shared refdata segment and installs it as this process's reference data (see data.set_refdata).
+    Suitable as a ProcessPoolExecutor / multiprocessing.Pool initializer, or a gunicorn post_fork hook.
+    """
+    from .data import set_refdata
+    refdata = SharedRefData.attach(name)
+    set_refdata(refdata)
+    return refdata
+
+
+if __name__ == "__main__":
+    print(build_compiled_refdata(sys.argv[1] if len(sys.argv) > 1 else None))
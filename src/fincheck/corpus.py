@@ -0,0 +1,138 @@
+"""
+Corpus-level extraction across multiple processes
+
+Example Usage:
+
+    >>> from fincheck.corpus import extract_corpus
+    >>> stats = {}
+    >>> for doc_id, res in extract_corpus(["M0392N101 US9129091081", "2007849"], workers=2, stats=stats):
+    ...     print(doc_id, res)
+    0 {'CUSIP': ['M0392N101'], 'ISIN': ['US9129091081'], 'SEDOL': []}
+    1 {'CUSIP': [], 'ISIN': [], 'SEDOL': ['2007849']}
+    >>> stats["docs"]
+    2
+"""
+from typing import *
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait, as_completed, FIRST_COMPLETED
+import os
+import time
+from .extract import get_extractor
+
+Doc = Tuple[Hashable, Union[str, os.PathLike], bool] #document id, text or path, whether it is a path
+
+
+def _iter_docs(docs: Iterable, paths: bool) -> Iterator[Doc]:
+    """
+    Normalizes the input into (document id, text or path, is path) triples
+        > plain items are tagged by their position (texts) or their path (files)
+        > (id, text or path) tuples and dictionaries keep the caller's ids
+    """
+    if isinstance(docs, dict):
+        docs = docs.items()
+    for i, doc in enumerate(docs):
+        doc_id = None
+        if isinstance(doc, tuple):
+            doc_id, doc = doc
+        is_path = paths or isinstance(doc, os.PathLike)
+        if doc_id is None:
+            doc_id = os.fspath(doc) if is_path else i
+        yield doc_id, doc, is_path
+
+def _iter_batches(docs: Iterator[Doc], batch_size: int) -> Iterator[List[Doc]]:
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _extract_batch(batch: List[Doc], include: Tuple[str, ...]) -> Tuple[List[Tuple[Hashable, Dict]], int]:
+    """
+    Runs in the worker processes. The extractor is cached per process, so it is only compiled once per worker.
+    """
+    extractor = get_extractor(include)
+    res = []
+    n_chars = 0
+    for doc_id, doc, is_path in batch:
+        if is_path:
+            with open(doc, "r", encoding="utf-8", errors="replace") as f:
+                doc = f.read()
+        n_chars += len(doc)
+        res.append((doc_id, extractor.extract(doc)))
+    return res, n_chars
+
+def _update_stats(stats: Dict, n_docs: int, n_chars: int, start: float):
+    stats["docs"] += n_docs
+    stats["chars"] += n_chars
+    stats["batches"] += 1
+    stats["seconds"] = time.perf_counter() - start
+    stats["docs_per_second"] = stats["docs"] / stats["seconds"] if stats["seconds"] else 0.0
+    stats["chars_per_second"] = stats["chars"] / stats["seconds"] if stats["seconds"] else 0.0
+
+def extract_corpus(
+    docs: Iterable,
+    include: List = ["CUSIP", "ISIN", "SEDOL"],
+    workers: int = None,
+    batch_size: int = 64,
+    ordered: bool = True,
+    paths: bool = False,
+    stats: Dict = None
+    ) -> Iterator[Tuple[Hashable, Dict]]:
+    """
+    Extracts identifiers from many documents using a pool of worker processes.
+    Yields (document id, find_securities result) for each document.
+    ------
+    PARAMS
+    ------
+        1. 'docs' -> iterable of texts, file paths (os.PathLike), or (id, text or path) tuples; or a dict of id -> text or path
+        2. 'include' -> identifier types to search for. Any of CUSIP, ISIN, SEDOL and ABA
+        3. 'workers' -> number of processes. Defaults to os.cpu_count(). With 1, documents are processed in this process.
+        4. 'batch_size' -> documents sent to a worker per task. Larger batches amortize inter-process overhead.
+        5. 'ordered' -> If true, results are yielded in input order, else as soon as each batch completes
+        6. 'paths' -> If true, plain strings are treated as file paths rather than texts
+        7. 'stats' -> optional dictionary that is updated with throughput as batches complete
+                      (docs, chars, batches, seconds, docs_per_second, chars_per_second, workers)
+    """
+    #arguments are checked here, at call time; the work itself is done lazily by the returned generator
+    include = tuple(include)
+    get_extractor(include) #fail fast on invalid types
+    workers = workers or os.cpu_count() or 1
+    assert isinstance(workers, int) and workers >= 1, "'workers' must be a positive integer."
+    assert isinstance(batch_size, int) and batch_size >= 1, "'batch_size' must be a positive integer."
+    assert isinstance(docs, Iterable) and not isinstance(docs, (str, bytes)), "'docs' must be an iterable of documents or a dict, not a single text."
+    stats = stats if stats is not None else {}
+    stats.update({"docs": 0, "chars": 0, "batches": 0, "seconds": 0.0, "docs_per_second": 0.0, "chars_per_second": 0.0, "workers": workers})
+    return _extract_corpus(_iter_batches(_iter_docs(docs, paths), batch_size), include, workers, ordered, stats)
+
+def _extract_corpus(batches: Iterator[List[Doc]], include: Tuple[str, ...], workers: int, ordered: bool, stats: Dict) -> Iterator[Tuple[Hashable, Dict]]:
+    start = time.perf_counter()
+    if workers == 1:
+        for batch in batches:
+            res, n_chars = _extract_batch(batch, include)
+            _update_stats(stats, len(res), n_chars, start)
+            yield from res
+        return
+
+    max_pending = workers * 2 #bounds memory held by queued batches and results
+    with ProcessPoolExecutor(max_workers=workers, initializer=get_extractor, initargs=(include,)) as pool:
+        pending = deque()
+        for batch in batches:
+            pending.append(pool.submit(_extract_batch, batch, include))
+            while len(pending) >= max_pending:
+                if ordered:
+                    done = [pending.popleft()]
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        pending.remove(future)
+                for future in done:
+                    res, n_chars = future.result()
+                    _update_stats(stats, len(res), n_chars, start)
+                    yield from res
+        for future in (pending if ordered else as_completed(pending)):
+            res, n_chars = future.result()
+            _update_stats(stats, len(res), n_chars, start)
+            yield from res
@@ -1,7 +1,14 @@
 from typing import *
-from .checksum import isin_check_digit
-from .validate import is_cusip, is_isin
-from .utils import read_csv
+from threading import Lock
+import csv
+import os
+import sys
+import time
+from .checksum import isin_check_digit, isin_check_digits
+from .validate import is_cusip, is_isin, is_cusip_many, is_isin_many
+from .utils import read_csv, resource_path
+from .cache import LRUCache
+from . import metrics
 
 
 def load_cusip_refdata() -> List:
@@ -21,6 +28,477 @@ def load_isin_country_codes() -> List:
     data = read_csv("refdata/isin/country_codes.csv")
     return data
 
+
+class RefData(object):
+    """
+    ----------------------------
+    Process-wide reference data registry
+    ----------------------------
+    Each reference file is parsed once, on first use, into a hash index so that
+    metadata lookups for Cusip and Isin objects are O(1).
+        > cusips: cusip -> (name, asset type)
+        > tickers: cusip -> ticker
+        > countries: country code -> country name
+    When a key appears more than once in a file, the first row wins.
+    ----------------------------
+    """
+    def __init__(self):
+        self._lock = Lock()
+        self._cusips = None
+        self._tickers = None
+        self._countries = None
+        self._load_seconds = {}
+        self._lookups = 0
+
+    def _build_cusips(self) -> Dict[str, Tuple[str, str]]:
+        index = {}
+        for row in load_cusip_refdata():
+            if row[1] not in index:
+                index[row[1]] = (row[2], row[3])
+        return index
+
+    def _build_tickers(self) -> Dict[str, str]:
+        index = {}
+        for row in load_cusip_ticker_map():
+            if len(row) >= 2 and row[0] not in index:
+                index[row[0]] = row[1]
+        return index
+
+    def _build_countries(self) -> Dict[str, str]:
+        index = {}
+        for row in load_isin_country_codes():
+            if len(row) >= 2 and row[0] not in index:
+                index[row[0]] = row[1]
+        return index
+
+    def _load(self, attr: str, build_fn: Callable) -> Dict:
+        with self._lock:
+            index = getattr(self, attr)
+            if index is None: #another thread may have loaded it while we waited
+                start = time.perf_counter()
+                index = build_fn()
+                name = attr.strip("_")
+                self._load_seconds[name] = time.perf_counter() - start
+                metrics.record_load(f"refdata.{name}", self._load_seconds[name])
+                setattr(self, attr, index)
+        return index
+
+    @property
+    def cusips(self) -> Dict[str, Tuple[str, str]]:
+        index = self._cusips
+        if index is None:
+            index = self._load("_cusips", self._build_cusips)
+        return index
+
+    @property
+    def tickers(self) -> Dict[str, str]:
+        index = self._tickers
+        if index is None:
+            index = self._load("_tickers", self._build_tickers)
+        return index
+
+    @property
+    def countries(self) -> Dict[str, str]:
+        index = self._countries
+        if index is None:
+            index = self._load("_countries", self._build_countries)
+        return index
+
+    def lookup_cusip(self, cusip: str) -> Optional[Tuple[str, str]]:
+        """
+        Returns a tuple of (name, asset type) for a cusip, or None if it is not in the reference data
+        """
+        self._lookups += 1
+        return self.cusips.get(cusip)
+
+    def lookup_ticker(self, cusip: str) -> Optional[str]:
+        """
+        Returns the ticker for a cusip, or None if it is not in the reference data
+        """
+        self._lookups += 1
+        return self.tickers.get(cusip)
+
+    def lookup_country(self, code: str) -> Optional[str]:
+        """
+        Returns the country name for an ISO 3166-1-alpha-2 code, or None if it is not in the reference data
+        """
+        self._lookups += 1
+        return self.countries.get(code)
+
+    def iter_cusips(self) -> Iterator[str]:
+        """
+        Yields every cusip in the reference data. Implemented by every registry type (see also CompiledRefData).
+        """
+        return iter(self.cusips)
+
+    def iter_tickers(self) -> Iterator[Tuple[str, str]]:
+        """
+        Yields (cusip, ticker) for every ticker in the reference data
+        """
+        return iter(self.tickers.items())
+
+    def load(self) -> "RefData":
+        """
+        Eagerly builds every index. Useful before forking worker processes.
+        """
+        for name in ["cusips", "tickers", "countries"]:
+            getattr(self, name) #properties build the index on first access
+        return self
+
+    def reload(self) -> "RefData":
+        """
+        Drops every index and re-reads the reference files
+        """
+        with self._lock:
+            self._cusips = self._tickers = self._countries = None
+            self._load_seconds = {}
+        return self.load()
+
+    def stats(self) -> Dict:
+        """
+        Returns row counts, approximate memory footprint (bytes) and load latency (seconds) of each loaded index
+        """
+        stats = {"lookups": self._lookups, "indexes": {}}
+        for name in ["cusips", "tickers", "countries"]:
+            index = getattr(self, f"_{name}")
+            if index is None:
+                stats["indexes"][name] = {"loaded": False}
+                continue
+            stats["indexes"][name] = {
+                "loaded": True,
+                "rows": len(index),
+                "bytes": _sizeof_index(index),
+                "load_seconds": self._load_seconds.get(name)
+            }
+        return stats
+
+
+def _sizeof_index(index: Dict) -> int:
+    """
+    Approximates the memory held by an index: the hash table plus its keys and values
+    """
+    size = sys.getsizeof(index)
+    for k, v in index.items():
+        size += sys.getsizeof(k) + sys.getsizeof(v)
+        if isinstance(v, tuple):
+            size += sum(sys.getsizeof(x) for x in v)
+    return size
+
+
+def _read_snapshot_file(path: str, columns: List[str]) -> Iterator[List[str]]:
+    """
+    Reads an external reference file (e.g. a newer SEC list) with the csv module, so quoted names may contain commas.
+    Yields the given columns of each row, located by their (case-insensitive) header names.
+    """
+    with open(path, "r", encoding="utf-8-sig", errors="replace", newline="") as f:
+        reader = csv.reader(f)
+        header = [x.strip().lower() for x in next(reader, [])]
+        missing = [c for c in columns if c not in header]
+        assert not missing, f"{path} is missing the columns {missing}."
+        positions = [header.index(c) for c in columns]
+        width = max(positions) + 1
+        for row in reader:
+            if len(row) >= width:
+                yield [row[i].strip() for i in positions]
+
+
+class RefDataDelta(object):
+    """
+    ----------------------------
+    Ordered set of changes to the reference data indexes (cusips, tickers, countries)
+    ----------------------------
+    Operations, checked against the snapshot the delta is applied to:
+        > add: the key must not exist yet
+        > modify: the key must exist
+        > remove: the key must exist
+        > set: adds or replaces
+        > discard: removes the key if it exists
+    cusips values are (name, asset type) tuples; tickers and countries values are strings.
+    ----------------------------
+    """
+    INDEXES = ["cusips", "tickers", "countries"]
+    OPS = ["add", "modify", "remove", "set", "discard"]
+
+    def __init__(self):
+        self.ops = []
+
+    def _append(self, op: str, index: str, key: str, value: Any = None) -> "RefDataDelta":
+        assert index in self.INDEXES, f"'index' must be one of {self.INDEXES}."
+        self.ops.append((op, index, key, value))
+        return self
+
+    def add(self, index: str, key: str, value: Any) -> "RefDataDelta":
+        return self._append("add", index, key, value)
+
+    def modify(self, index: str, key: str, value: Any) -> "RefDataDelta":
+        return self._append("modify", index, key, value)
+
+    def remove(self, index: str, key: str) -> "RefDataDelta":
+        return self._append("remove", index, key)
+
+    def set(self, index: str, key: str, value: Any) -> "RefDataDelta":
+        return self._append("set", index, key, value)
+
+    def discard(self, index: str, key: str) -> "RefDataDelta":
+        return self._append("discard", index, key)
+
+    def add_cusip(self, cusip: str, name: str, type_: str, ticker: str = None) -> "RefDataDelta":
+        self.add("cusips", cusip, (name, type_))
+        if ticker:
+            self.set("tickers", cusip, ticker)
+        return self
+
+    def modify_cusip(self, cusip: str, name: str, type_: str, ticker: str = None) -> "RefDataDelta":
+        self.modify("cusips", cusip, (name, type_))
+        if ticker:
+            self.set("tickers", cusip, ticker)
+        return self
+
+    def remove_cusip(self, cusip: str) -> "RefDataDelta":
+        self.remove("cusips", cusip)
+        return self.discard("tickers", cusip)
+
+    @classmethod
+    def from_csv(cls, path: str) -> "RefDataDelta":
+        """
+        Reads a delta file with the columns op, cusip, name, type and (optionally) ticker.
+        op is add, modify or remove; for remove only the cusip is used.
+        """
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            has_ticker = "ticker" in f.readline().lower()
+        delta = cls()
+        columns = ["op", "cusip", "name", "type"] + (["ticker"] if has_ticker else [])
+        for row in _read_snapshot_file(path, columns):
+            op, cusip, name, type_ = row[:4]
+            ticker = row[4] if has_ticker else None
+            if op == "add":
+                delta.add_cusip(cusip, name, type_, ticker)
+            elif op == "modify":
+                delta.modify_cusip(cusip, name, type_, ticker)
+            elif op == "remove":
+                delta.remove_cusip(cusip)
+            else:
+                raise ValueError(f"Invalid delta operation {op!r} for {cusip}. Must be add, modify or remove.")
+        return delta
+
+    def __len__(self) -> int:
+        return len(self.ops)
+
+    def __repr__(self) -> str:
+        return f"RefDataDelta({len(self)} operations)"
+
+
+class RefDataSnapshot(RefData):
+    """
+    ----------------------------
+    Immutable, versioned reference data
+    ----------------------------
+    Built eagerly from the bundled files, or from external files with the same columns (e.g. a newer quarterly SEC list).
+    apply(delta) returns a new snapshot with version + 1 and leaves this one untouched: only the indexes the delta
+    changes are copied, the others are shared between versions.
+    Snapshots are never modified once built, so a reader holding one (or a lookup in flight) always sees a single,
+    consistent version while a newer one is swapped in with set_refdata. Lookups are plain dict reads, without locks.
+    ----------------------------
+    """
+    def __init__(self, cusip_list: str = None, ticker_map: str = None, country_codes: str = None, version: int = 1):
+        """
+        ------
+        PARAMS
+        ------
+            1. 'cusip_list' -> path to a csv with cusip, name and type columns. Defaults to the bundled SEC list
+            2. 'ticker_map' -> path to a csv with cusip and symbol columns. Defaults to the bundled ticker map
+            3. 'country_codes' -> path to a csv with code and name columns. Defaults to the bundled list
+            4. 'version' -> version number of the snapshot
+        """
+        super().__init__()
+        self.sources = {"cusips": cusip_list, "tickers": ticker_map, "countries": country_codes}
+        self.version = version
+        self.load() #eager, so no reader ever waits on a parse
+
+    def _build_cusips(self) -> Dict[str, Tuple[str, str]]:
+        path = self.sources["cusips"]
+        if path is None:
+            return super()._build_cusips()
+        index = {}
+        for cusip, name, type_ in _read_snapshot_file(path, ["cusip", "name", "type"]):
+            if cusip not in index:
+                index[cusip] = (name, type_)
+        return index
+
+    def _build_tickers(self) -> Dict[str, str]:
+        path = self.sources["tickers"]
+        if path is None:
+            return super()._build_tickers()
+        index = {}
+        for cusip, ticker in _read_snapshot_file(path, ["cusip", "symbol"]):
+            if cusip not in index:
+                index[cusip] = ticker
+        return index
+
+    def _build_countries(self) -> Dict[str, str]:
+        path = self.sources["countries"]
+        if path is None:
+            return super()._build_countries()
+        index = {}
+        for code, name in _read_snapshot_file(path, ["code", "name"]):
+            if code not in index:
+                index[code] = name
+        return index
+
+    @classmethod
+    def from_refdata(cls, refdata: RefData, version: int = 1) -> "RefDataSnapshot":
+        """
+        Takes a snapshot of a RefData registry. The indexes are shared, not copied (RefData.reload builds new ones).
+        """
+        refdata.load()
+        return cls._from_indexes(refdata.cusips, refdata.tickers, refdata.countries, version, {"cusips": None, "tickers": None, "countries": None})
+
+    @classmethod
+    def _from_indexes(cls, cusips: Dict, tickers: Dict, countries: Dict, version: int, sources: Dict) -> "RefDataSnapshot":
+        snapshot = cls.__new__(cls)
+        RefData.__init__(snapshot)
+        snapshot._cusips, snapshot._tickers, snapshot._countries = cusips, tickers, countries
+        snapshot.sources = sources
+        snapshot.version = version
+        return snapshot
+
+    def apply(self, delta: RefDataDelta) -> "RefDataSnapshot":
+        """
+        Returns a new snapshot with the delta applied (copy-on-write). Raises AssertionError, without changing anything,
+        if an operation does not fit this snapshot (e.g. adding a cusip that already exists).
+        ------
+        PARAMS
+        ------
+            1. 'delta' -> RefDataDelta to apply
+        """
+        start = time.perf_counter()
+        indexes = {"cusips": self.cusips, "tickers": self.tickers, "countries": self.countries}
+        copied = set()
+        for op, index, key, value in delta.ops:
+            if index not in copied:
+                indexes[index] = dict(indexes[index])
+                copied.add(index)
+            data = indexes[index]
+            if op == "add":
+                assert key not in data, f"Cannot add {key}: already in {index} (version {self.version})."
+                data[key] = value
+            elif op == "modify":
+                assert key in data, f"Cannot modify {key}: not in {index} (version {self.version})."
+                data[key] = value
+            elif op == "remove":
+                assert key in data, f"Cannot remove {key}: not in {index} (version {self.version})."
+                del data[key]
+            elif op == "set":
+                data[key] = value
+            elif op == "discard":
+                data.pop(key, None)
+            else:
+                raise ValueError(f"Invalid delta operation {op!r}. Must be one of {RefDataDelta.OPS}.")
+        snapshot = self._from_indexes(indexes["cusips"], indexes["tickers"], indexes["countries"], self.version + 1, self.sources)
+        snapshot._load_seconds = dict(self._load_seconds, **{name: time.perf_counter() - start for name in copied})
+        return snapshot
+
+    def reload(self) -> "RefDataSnapshot":
+        """
+        Returns a new snapshot (version + 1) re-read from the source files. Deltas applied since are dropped.
+        """
+        return RefDataSnapshot(self.sources["cusips"], self.sources["tickers"], self.sources["countries"], version=self.version + 1)
+
+    def stats(self) -> Dict:
+        return dict(super().stats(), version=self.version)
+
+    def __repr__(self) -> str:
+        return f"RefDataSnapshot(version {self.version})"
+
+
+_REFDATA = None
+_REFDATA_LOCK = Lock()
+_UPDATE_LOCK = Lock() #serializes writers, so two updates never start from the same version. Readers never take it.
+
+def _default_refdata():
+    """
+    Uses the compiled, memory-mapped reference data if it has been built (see fincheck.compiled), else the csv files
+    """
+    from .compiled import CompiledRefData, DEFAULT_PATH
+    if os.path.exists(resource_path(DEFAULT_PATH)):
+        return CompiledRefData()
+    return RefData()
+
+def get_refdata() -> Union[RefData, "CompiledRefData"]:
+    """
+    Returns the process-wide reference data registry
+    """
+    global _REFDATA
+    if _REFDATA is None:
+        with _REFDATA_LOCK:
+            if _REFDATA is None:
+                _REFDATA = _default_refdata()
+    return _REFDATA
+
+def set_refdata(refdata: Union[RefData, "CompiledRefData"]) -> Union[RefData, "CompiledRefData"]:
+    """
+    Replaces the process-wide reference data registry, returning the previous one.
+    Interned Cusip and Isin objects are dropped, as they hold metadata of the previous registry.
+    ------
+    PARAMS
+    ------
+        1. 'refdata' -> any object exposing lookup_cusip, lookup_ticker and lookup_country
+    """
+    global _REFDATA
+    with _REFDATA_LOCK:
+        previous, _REFDATA = _REFDATA, refdata
+    Cusip.intern_cache.clear()
+    Isin.intern_cache.clear()
+    return previous
+
+def reload_refdata() -> Union[RefData, "CompiledRefData"]:
+    """
+    Re-reads the reference data into the process-wide registry. A RefDataSnapshot is re-read into a new version and swapped in.
+    """
+    with _UPDATE_LOCK:
+        current = get_refdata()
+        refdata = current.reload()
+        set_refdata(refdata) #also when the registry was reloaded in place, to drop interned objects
+    return refdata
+
+def load_refdata_snapshot(cusip_list: str = None, ticker_map: str = None, country_codes: str = None) -> RefDataSnapshot:
+    """
+    Loads a reference data snapshot from files and atomically swaps it in as the process-wide registry.
+    The snapshot is built before the swap, so lookups keep using the previous version until it is ready.
+    ------
+    PARAMS
+    ------
+        1. 'cusip_list' -> path to a csv with cusip, name and type columns. Defaults to the bundled SEC list
+        2. 'ticker_map' -> path to a csv with cusip and symbol columns. Defaults to the bundled ticker map
+        3. 'country_codes' -> path to a csv with code and name columns. Defaults to the bundled list
+    """
+    with _UPDATE_LOCK:
+        current = get_refdata()
+        version = current.version + 1 if isinstance(current, RefDataSnapshot) else 1
+        snapshot = RefDataSnapshot(cusip_list, ticker_map, country_codes, version=version)
+        set_refdata(snapshot)
+    return snapshot
+
+def apply_refdata_delta(delta: Union[RefDataDelta, str]) -> RefDataSnapshot:
+    """
+    Applies a delta to the current reference data and atomically swaps in the resulting snapshot (version + 1).
+    If the registry is not a snapshot yet, the delta is applied to a snapshot of it (or of the bundled files, for compiled reference data).
+    ------
+    PARAMS
+    ------
+        1. 'delta' -> RefDataDelta, or path to a delta csv (see RefDataDelta.from_csv)
+    """
+    if isinstance(delta, str):
+        delta = RefDataDelta.from_csv(delta)
+    with _UPDATE_LOCK:
+        current = get_refdata()
+        if not isinstance(current, RefDataSnapshot):
+            current = RefDataSnapshot.from_refdata(current) if isinstance(current, RefData) else RefDataSnapshot()
+        snapshot = current.apply(delta)
+        set_refdata(snapshot)
+    return snapshot
+
+
 class Cusip(object):
     """
     ----------------------------
@@ -37,16 +515,65 @@ class Cusip(object):
             > If there is a letter, it is fixed income
         3. 9th and final digit is a check digit (self.check_digit_)
     ----------------------------
+    Validation (is_valid) and reference data lookups (name_, type_, ticker_) are computed on first access.
+    Use Cusip.interned(cusip) to share one instance per identifier through a bounded cache (Cusip.intern_cache).
+    ----------------------------
     """
+    __slots__ = ["id_", "_is_valid", "_metadata", "_ticker"]
+    intern_cache = LRUCache(maxsize=100_000)
+
     def __init__(self, cusip: str):
         self.id_ = cusip
-        self.is_valid = is_cusip(cusip)
-        self.issuer_ = cusip[:6] #first 6 digits is the issuer
-        self.issue_ = cusip[-3:-1] #7th and 8th digit is the issue type 
-        self.issue_type_ = "equity" if self.issue_.isnumeric() else "fixed income"
-        self.check_digit_ = cusip[-1] #last digit
-        self.name_, self.type_ = self.__build_metadata(cusip)
-        self.ticker_ = self.__get_ticker(cusip)
+        self._is_valid = None
+        self._metadata = None
+        self._ticker = None
+
+    @classmethod
+    def interned(cls, cusip: str) -> "Cusip":
+        """
+        Returns the cached instance for a cusip, creating it on first use
+        """
+        return cls.intern_cache.get_or_set(cusip, cls)
+
+    @property
+    def is_valid(self) -> bool:
+        if self._is_valid is None:
+            self._is_valid = is_cusip(self.id_)
+        return self._is_valid
+
+    @property
+    def issuer_(self) -> str:
+        return self.id_[:6] #first 6 digits is the issuer
+
+    @property
+    def issue_(self) -> str:
+        return self.id_[-3:-1] #7th and 8th digit is the issue type 
+
+    @property
+    def issue_type_(self) -> str:
+        return "equity" if self.issue_.isnumeric() else "fixed income"
+
+    @property
+    def check_digit_(self) -> str:
+        return self.id_[-1] #last digit
+
+    @property
+    def name_(self) -> str:
+        if self._metadata is None:
+            self._metadata = self.__build_metadata(self.id_)
+        return self._metadata[0]
+
+    @property
+    def type_(self) -> str:
+        if self._metadata is None:
+            self._metadata = self.__build_metadata(self.id_)
+        return self._metadata[1]
+
+    @property
+    def ticker_(self) -> str:
+        if self._ticker is None:
+            self._ticker = self.__get_ticker(self.id_)
+        return self._ticker
 
     def __build_metadata(self, cusip: str) -> Tuple:
         """
@@ -56,18 +583,15 @@ class Cusip(object):
             > Tuple of name, asset type
         --------
         """
-        refdata = load_cusip_refdata()
-        data = [x for x in refdata if len(x) > 3 and x[1] == cusip]
+        data = get_refdata().lookup_cusip(cusip)
         if data:
-            data = data[0]
-            return data[2], data[3] 
+            return data
         return "unk", "unk" #unknown -- not found in reference data
     
     def __get_ticker(self, cusip: str) -> str:
-        data = load_cusip_ticker_map()
-        data = [x for x in data if x[0] == cusip]
-        if data:
-            return data[0][1]
+        ticker = get_refdata().lookup_ticker(cusip)
+        if ticker is not None:
+            return ticker
         return "unk"
 
     def to_isin(self, country: str) -> str:
@@ -92,29 +616,67 @@ class Isin(object):
         2. Next 9 digits are the NSIN (National Securities Identifying Number)
         3. Last and final digit is a check digit
     -------------
+    Validation (is_valid) and reference data lookups (country_name_, ticker_) are computed on first access.
+    Use Isin.interned(isin) to share one instance per identifier through a bounded cache (Isin.intern_cache).
+    -------------
     """
+    __slots__ = ["id_", "_is_valid", "_country_name", "_ticker"]
+    intern_cache = LRUCache(maxsize=100_000)
+
     def __init__(self, isin: str):
         self.id_ = isin
-        self.is_valid = is_isin(isin)
-        self.nsin_ = isin[2:-1]
-        self.country_code_ = isin[:2].upper()
-        self.country_name_ = self.__get_country_name(self.country_code_)
-        self.check_digit_ = isin[-1]
-        self.ticker_ = self.__get_ticker()
+        self._is_valid = None
+        self._country_name = None
+        self._ticker = None
+
+    @classmethod
+    def interned(cls, isin: str) -> "Isin":
+        """
+        Returns the cached instance for an isin, creating it on first use
+        """
+        return cls.intern_cache.get_or_set(isin, cls)
+
+    @property
+    def is_valid(self) -> bool:
+        if self._is_valid is None:
+            self._is_valid = is_isin(self.id_)
+        return self._is_valid
+
+    @property
+    def nsin_(self) -> str:
+        return self.id_[2:-1]
+
+    @property
+    def country_code_(self) -> str:
+        return self.id_[:2].upper()
+
+    @property
+    def check_digit_(self) -> str:
+        return self.id_[-1]
+
+    @property
+    def country_name_(self) -> str:
+        if self._country_name is None:
+            self._country_name = self.__get_country_name(self.country_code_)
+        return self._country_name
+
+    @property
+    def ticker_(self) -> str:
+        if self._ticker is None:
+            self._ticker = self.__get_ticker()
+        return self._ticker
 
     def __get_ticker(self) -> str:
         if self.country_code_ in ["US", "CA"]: #can only get ticker based on cusip as of this version
-            data = load_cusip_ticker_map()
-            data = [x for x in data if x[0] == self.nsin_]
-            if data:
-                return data[0][1]
+            ticker = get_refdata().lookup_ticker(self.nsin_)
+            if ticker is not None:
+                return ticker
         return "unk"
 
     def __get_country_name(self, code: str):
-        data = load_isin_country_codes()
-        data = [x for x in data if x[0] == code]
-        if data:
-            return data[0][1]
+        name = get_refdata().lookup_country(code)
+        if name is not None:
+            return name
         return "unk"
 
     def to_nsin(self):
@@ -136,4 +698,65 @@ class Isin(object):
         if self.country_code_ == "GB":
             return self.to_nsin()[2:] #sedols will be zero padded to fit ISIN/NSIN format of 9 digits. Take last 7 digits
         return None
-    
\ No newline at end of file
+
+
+#columns returned by enrich, in order
+ENRICH_COLUMNS = [
+    "id", "id_type", "is_valid", "cusip", "isin", "sedol", "issuer", "name", "asset_type", "ticker", "country_code", "country_name", "found"
+]
+
+def enrich(ids: Iterable[str], country: str = "US") -> Dict[str, List]:
+    """
+    Columnar enrichment for a column of CUSIPs and/or ISINs (told apart by length: 9 or 12 characters).
+    Validates the whole column in bulk and joins each distinct cusip and country code against the reference data once.
+    --------
+    Returns:
+        > dictionary of equal-length lists:
+            - id, id_type ("CUSIP", "ISIN" or None), is_valid
+            - cusip, isin, sedol -- conversions, None where not applicable
+            - issuer, name, asset_type, ticker, country_code, country_name -- "unk" where not in the reference data
+            - found -- True if the security is in the reference data
+    --------
+    ------
+    PARAMS
+    ------
+        1. 'ids' -> list, array or iterable of CUSIPs and/or ISINs
+        2. 'country' -> country code ("US" or "CA") used to convert CUSIPs to ISINs
+    """
+    country = country.strip().replace(" ", "") #clean
+    assert country in ["US", "CA"], "'country' must be 'US' or 'CA', as cusips are only used in USA and Canada."
+    ids = list(ids)
+    cusip_valid = is_cusip_many(ids, clean=False)
+    isin_valid = is_isin_many(ids, clean=False)
+    id_types = ["CUSIP" if len(x) == 9 else "ISIN" if len(x) == 12 else None for x in ids]
+    country_codes = [x[:2].upper() if t == "ISIN" else country if t == "CUSIP" else None for x, t in zip(ids, id_types)]
+    cusips = [
+        x if t == "CUSIP" else x[2:-1] if t == "ISIN" and c in ["US", "CA"] else None
+        for x, t, c in zip(ids, id_types, country_codes)
+    ]
+    #cusip -> isin, computed in one batch for the valid cusips
+    valid_cusips = [x for x, ok in zip(ids, cusip_valid) if ok]
+    to_isin = {c: country + c + str(d) for c, d in zip(valid_cusips, isin_check_digits(country + c for c in valid_cusips))}
+    isins = [x if t == "ISIN" else to_isin.get(x) for x, t in zip(ids, id_types)]
+    sedols = [x[4:-1] if t == "ISIN" and c == "GB" else None for x, t, c in zip(ids, id_types, country_codes)]
+
+    refdata = get_refdata()
+    metadata = {c: refdata.lookup_cusip(c) for c in set(cusips) if c is not None}
+    tickers = {c: refdata.lookup_ticker(c) for c in metadata}
+    country_names = {c: refdata.lookup_country(c) for c in set(country_codes) if c is not None}
+    unknown = ("unk", "unk")
+    return {
+        "id": ids,
+        "id_type": id_types,
+        "is_valid": [a or b for a, b in zip(cusip_valid, isin_valid)],
+        "cusip": cusips,
+        "isin": isins,
+        "sedol": sedols,
+        "issuer": [c[:6] if c is not None else None for c in cusips],
+        "name": [(metadata.get(c) or unknown)[0] for c in cusips],
+        "asset_type": [(metadata.get(c) or unknown)[1] for c in cusips],
+        "ticker": [tickers.get(c) or "unk" for c in cusips],
+        "country_code": country_codes,
+        "country_name": [country_names.get(c) or "unk" for c in country_codes],
+        "found": [metadata.get(c) is not None for c in cusips],
+    }
@@ -1,8 +1,19 @@
 from .validate import is_cusip, is_isin, is_aba, is_sedol
+from .validate import is_cusip_many, is_isin_many, is_aba_many, is_sedol_many
 from .utils import find_and_validate
+from . import metrics
 from typing import *
+import mmap
+import re
+import time
 
-def get_cusips(s: str) -> List[str]:
+#each identifier is a whole token -- preceded and followed by a non-word character or the start/end of the text
+CUSIP_PATTERN = re.compile(r"((?<=[^\w])|(?<=^))([A-Za-z0-9]{8}[0-9])(?=[^\w]|$)") #ensure 9th is digit
+ISIN_PATTERN = re.compile(r"((?<=[^\w])|(?<=^))([A-Za-z]{2}[A-Za-z0-9]{9}[0-9])(?=[^\w]|$)")
+SEDOL_PATTERN = re.compile(r"((?<=[^\w])|(?<=^))([0-9BCDFGHJKLMNPQRSTVWXYZ]{6}[0-9])(?=[^\w]|$)")
+ABA_PATTERN = re.compile(r"((?<=[^\w])|(?<=^))([0-9]{9})(?=[^\w]|$)") #ASCII digits, like the single-pass Extractor
+
+def get_cusips(s: Union[str, bytes, bytearray, memoryview, mmap.mmap]) -> List[str]:
     """
     ---------------------------------
     Find and Extract CUSIPs from text
@@ -21,14 +32,14 @@ def get_cusips(s: str) -> List[str]:
     ------
     PARAMS
     ------
-        1. 's' -> input string
+        1. 's' -> input string, or bytes-like buffer (scanned without decoding it)
     """
-    #ensure 9th is digit
-    pattern = r"((?<=[^\w])|(?<=^))([A-Za-z0-9]{8}[0-9])(?=[^\w]|$)"
-    return find_and_validate(s, pattern, validation_fn=is_cusip)
+    if not isinstance(s, str):
+        return get_extractor(["CUSIP"]).extract(s)["CUSIP"]
+    return find_and_validate(s, CUSIP_PATTERN, validation_fn=is_cusip)
 
 
-def get_isins(s: str) -> List[str]:
+def get_isins(s: Union[str, bytes, bytearray, memoryview, mmap.mmap]) -> List[str]:
     """
     ---------------------------------
     Find and Extract ISINs from text
@@ -45,13 +56,14 @@ def get_isins(s: str) -> List[str]:
     ------
     PARAMS
     ------
-        1. 's' -> input string
+        1. 's' -> input string, or bytes-like buffer (scanned without decoding it)
     """
-    pattern = r"((?<=[^\w])|(?<=^))([A-Za-z]{2}[A-Za-z0-9]{9}[0-9])(?=[^\w]|$)"
-    return find_and_validate(s, pattern, validation_fn=is_isin)
+    if not isinstance(s, str):
+        return get_extractor(["ISIN"]).extract(s)["ISIN"]
+    return find_and_validate(s, ISIN_PATTERN, validation_fn=is_isin)
 
 
-def get_sedols(s: str) -> List[str]:
+def get_sedols(s: Union[str, bytes, bytearray, memoryview, mmap.mmap]) -> List[str]:
     """
     ---------------------------------
     Find and Extract SEDOLs from text
@@ -64,26 +76,25 @@ def get_sedols(s: str) -> List[str]:
     ------
     PARAMS
     ------
-        1. 's' -> input string
-    """
-    pattern = r"((?<=[^\w])|(?<=^))([0-9BCDFGHJKLMNPQRSTVWXYZ]{6}[0-9])(?=[^\w]|$)"
-    return find_and_validate(s, pattern, validation_fn=is_sedol)
-
-def find_securities(s: str, include: List = ["CUSIP", "ISIN", "SEDOL"]) -> Dict:
-    allowed_types = {
-        "CUSIP": get_cusips, 
-        "ISIN": get_isins, 
-        "SEDOL": get_sedols
-        }
-    include = [x.upper() for x in include] #ensure upper
-    include = [x for x in include if x in allowed_types] #ensure types are valid
-    assert len(include) > 0, "Must include at least one of the following: CUSIP, ISIN, or SEDOL"
-    res = {}
-    for t in include:
-        res[t] = allowed_types[t](s)
-    return res
+        1. 's' -> input string, or bytes-like buffer (scanned without decoding it)
+    """
+    if not isinstance(s, str):
+        return get_extractor(["SEDOL"]).extract(s)["SEDOL"]
+    return find_and_validate(s, SEDOL_PATTERN, validation_fn=is_sedol)
+
+def find_securities(s: Union[str, bytes, bytearray, memoryview, mmap.mmap], include: List = ["CUSIP", "ISIN", "SEDOL"], universe: Container = None) -> Dict:
+    """
+    Finds every requested identifier type in a single pass over the text (see Extractor)
+    ------
+    PARAMS
+    ------
+        1. 's' -> input string, or bytes-like buffer (scanned without decoding it)
+        2. 'include' -> identifier types to search for. Any of CUSIP, ISIN, SEDOL and ABA
+        3. 'universe' -> optional BloomFilter, set or other container. If given, only identifiers in it are returned.
+    """
+    return get_extractor(include, universe).extract(s)
 
-def get_abas(s: str) -> List[str]:
+def get_abas(s: Union[str, bytes, bytearray, memoryview, mmap.mmap]) -> List[str]:
     """
     --------------------------------------
     Find and Extract ABA Numbers from text
@@ -104,9 +115,401 @@ def get_abas(s: str) -> List[str]:
     ------
     PARAMS
     ------
-        1. 's' -> input string
+        1. 's' -> input string, or bytes-like buffer (scanned without decoding it)
+    """
+    if not isinstance(s, str):
+        return get_extractor(["ABA"]).extract(s)["ABA"]
+    return find_and_validate(s, ABA_PATTERN, validation_fn=is_aba)
+
+
+#---------------------------------------------
+# Single-pass extraction
+#---------------------------------------------
+#every candidate is a 7-12 character alphanumeric token ending in a digit (the check digit of every type),
+#so one scan finds the candidates for every type -- and skips ordinary words without leaving the regex engine.
+#ASCII only (in unicode mode \d also matches e.g. Arabic-Indic digits); a non-ASCII neighbor is checked with _is_word,
+#exactly like BYTES_TOKEN_PATTERN below, so scanning text and its UTF-8 encoding give the same identifiers
+TOKEN_PATTERN = re.compile(r"\b[A-Za-z0-9]{6,11}[0-9]\b", re.ASCII)
+
+_MAX_TOKEN_LENGTH = 12
+_WORD_RUN = re.compile(r"\w*")
+
+def _is_word(c: str) -> bool:
+    return c.isalnum() or c == "_" #same definition as \w in re
+
+#byte-level candidates for bytes-like buffers. In bytes patterns \b only considers ASCII word characters;
+#a non-ASCII neighbor is decoded as UTF-8 and checked with _is_word, so results match scanning the decoded text
+BYTES_TOKEN_PATTERN = re.compile(rb"\b[A-Za-z0-9]{6,11}[0-9]\b")
+
+def _word_before(buf, i: int) -> bool:
+    """
+    Whether the UTF-8 character ending at buf[i - 1] is a word character
+    """
+    j = i - 1
+    while j > 0 and i - j < 4 and 0x80 <= buf[j] < 0xC0: #walk back over continuation bytes to the lead byte
+        j -= 1
+    c = bytes(buf[j:i]).decode("utf-8", errors="replace")
+    return _is_word(c[-1])
+
+def _word_after(buf, i: int) -> bool:
+    """
+    Whether the UTF-8 character starting at buf[i] is a word character
+    """
+    c = bytes(buf[i:i + 4]).decode("utf-8", errors="replace")
+    return _is_word(c[0])
+
+def _iter_tokens(s: str) -> Iterator[Tuple[str, int, int]]:
+    """
+    Yields (token, start, end) for every TOKEN_PATTERN candidate not adjacent to a (non-ASCII) word character
+    """
+    n = len(s)
+    for m in TOKEN_PATTERN.finditer(s):
+        start, end = m.span()
+        if start and s[start - 1] >= "\x80" and _is_word(s[start - 1]):
+            continue
+        if end < n and s[end] >= "\x80" and _is_word(s[end]):
+            continue
+        yield m.group(), start, end
+
+#type -> (token length, character class check, bulk validator)
+IDENTIFIER_TYPES = {
+    "CUSIP": (9, re.compile(r"[A-Za-z0-9]{8}[0-9]").fullmatch, is_cusip_many),
+    "ISIN": (12, re.compile(r"[A-Za-z]{2}[A-Za-z0-9]{9}[0-9]").fullmatch, is_isin_many),
+    "SEDOL": (7, re.compile(r"[0-9BCDFGHJKLMNPQRSTVWXYZ]{6}[0-9]").fullmatch, is_sedol_many),
+    "ABA": (9, re.compile(r"[0-9]{9}").fullmatch, is_aba_many),
+}
+
+#---------------------------------------------
+# Match records and ambiguity resolution
+#---------------------------------------------
+class Match(NamedTuple):
+    type: str
+    value: str
+    start: int
+    end: int
+    confidence: float #1.0 unless the token is valid as more than one type
+    ambiguous: bool #True if the token is valid as more than one type
+
+class MatchGroup(NamedTuple):
+    type: str
+    value: str
+    count: int
+    spans: List[Tuple[int, int]]
+    confidence: float #highest confidence among the occurrences
+
+#a valid ABA number starts with a Federal Reserve routing symbol in 00-12, 21-32, 61-72 or 80
+_ABA_PREFIXES = frozenset(f"{n:02d}" for n in list(range(0, 13)) + list(range(21, 33)) + list(range(61, 73)) + [80])
+
+#words near a token that make one reading more likely than another
+_CONTEXT_PATTERNS = {
+    "CUSIP": re.compile(r"\b(cusips?|isins?|sedols?|shares?|securit(y|ies)|stocks?|bonds?|notes?|equity|issuer|13f)\b"),
+    "ISIN": re.compile(r"\b(isins?|securit(y|ies))\b"),
+    "SEDOL": re.compile(r"\b(sedols?|lse|london)\b"),
+    "ABA": re.compile(r"\b(aba|routing|rtn|transit|wire|bank|banks|account|ach|fedwire)\b"),
+}
+_CONTEXT_BEFORE = 48 #characters (or bytes) of context searched before and after an ambiguous token
+_CONTEXT_AFTER = 24
+
+def _context(s: Union[str, bytes, bytearray, memoryview, mmap.mmap], start: int, end: int) -> Tuple[str, str]:
+    before, after = s[max(0, start - _CONTEXT_BEFORE):start], s[end:end + _CONTEXT_AFTER]
+    if not isinstance(s, str):
+        before = bytes(before).decode("utf-8", errors="replace")
+        after = bytes(after).decode("utf-8", errors="replace")
+    return before.lower(), after.lower()
+
+def _nearest_keyword(types: List[str], before: str, after: str) -> Set[str]:
+    """
+    Returns the types whose keywords appear closest to the token (empty if none appear).
+    Labels usually precede values, so the text after the token is only used if there are no keywords before it.
+    """
+    for context, reverse in [(before, True), (after, False)]:
+        distances = {}
+        for t in types:
+            for m in _CONTEXT_PATTERNS[t].finditer(context):
+                d = len(context) - m.end() if reverse else m.start()
+                distances[t] = min(distances.get(t, d), d)
+        if distances:
+            nearest = min(distances.values())
+            return {t for t, d in distances.items() if d == nearest}
+    return set()
+
+def _resolve(s: Union[str, bytes, bytearray, memoryview, mmap.mmap], readings: List[Tuple[str, str, int, int]], resolve: str) -> List[Match]:
+    """
+    Turns the readings of one token into Match records, scoring the readings of an ambiguous token
+    """
+    if len(readings) == 1:
+        return [Match(*readings[0], 1.0, False)]
+    _, value, start, end = readings[0]
+    types = [t for t, _, _, _ in readings]
+    nearest = _nearest_keyword(types, *_context(s, start, end))
+    scores = []
+    for t in types:
+        score = 1.0
+        if t == "ABA" and value[:2] not in _ABA_PREFIXES:
+            score *= 0.1 #passes the checksum, but no bank has this routing symbol
+        if t in nearest:
+            score *= 4.0
+        scores.append(score)
+    total = sum(scores)
+    res = [Match(t, value, start, end, round(score / total, 3), True) for t, score in zip(types, scores)]
+    if resolve == "best":
+        return [max(res, key=lambda m: m.confidence)] #first of equals, i.e. in the order of 'include'
+    return res
+
+def collapse_matches(matches: Iterable[Match]) -> List[MatchGroup]:
+    """
+    Collapses repeated identifiers into one MatchGroup per (type, value), with a count and every span, in order of first appearance
+    ------
+    PARAMS
+    ------
+        1. 'matches' -> Match records, e.g. from find_matches
+    """
+    groups = {}
+    for m in matches:
+        key = (m.type, m.value)
+        if key not in groups:
+            groups[key] = [0, [], 0.0]
+        group = groups[key]
+        group[0] += 1
+        group[1].append((m.start, m.end))
+        group[2] = max(group[2], m.confidence)
+    return [MatchGroup(t, value, *group) for (t, value), group in groups.items()]
+
+
+class Extractor(object):
+    """
+    ----------------------------
+    Reusable, precompiled multi-type extractor
+    ----------------------------
+    Scans each token once, classifies it by length and character class, and validates the candidates of each
+    type in bulk -- so extracting several identifier types costs about the same as extracting one.
+    Results match get_cusips, get_isins, get_sedols and get_abas.
+    If a universe (BloomFilter, set, ...) is given, only identifiers in it are returned.
+    ----------------------------
+    """
+    def __init__(self, include: List = ["CUSIP", "ISIN", "SEDOL"], universe: Container = None):
+        include = [x.upper() for x in include] #ensure upper
+        include = [x for x in include if x in IDENTIFIER_TYPES] #ensure types are valid
+        assert len(include) > 0, f"Must include at least one of the following: {', '.join(IDENTIFIER_TYPES)}"
+        self.include = include
+        self.universe = universe
+        self._by_length = {}
+        for t in include:
+            n_chars, check_fn, _ = IDENTIFIER_TYPES[t]
+            self._by_length.setdefault(n_chars, []).append((t, check_fn))
+
+    def scan(self, s: Union[str, bytes, bytearray, memoryview, mmap.mmap]) -> List[Tuple[str, str, int, int]]:
+        """
+        Returns (type, value, start, end) for every valid identifier in the text, in order of appearance.
+        A token valid as more than one type (e.g. a CUSIP that is also an ABA number) is returned once per type.
+        Bytes-like input is scanned without decoding it (see scan_bytes).
+        """
+        if not isinstance(s, str):
+            return self.scan_bytes(s)
+        if metrics.ENABLED:
+            start = time.perf_counter()
+            res = self._validate(list(_iter_tokens(s)))
+            metrics.record_call("Extractor.scan", time.perf_counter() - start)
+            return res
+        return self._validate(_iter_tokens(s))
+
+    def scan_bytes(self, buf: Union[bytes, bytearray, memoryview, mmap.mmap]) -> List[Tuple[str, str, int, int]]:
+        """
+        Scans a UTF-8 (or ASCII) buffer in place. Only the matched tokens are decoded.
+        Returns (type, value, start, end) like scan, with start and end as byte offsets into the buffer.
+        ------
+        PARAMS
+        ------
+            1. 'buf' -> bytes, bytearray, memoryview or mmap (e.g. of a whole file)
+        """
+        if metrics.ENABLED:
+            started = time.perf_counter() #not 'start', which is a token offset below
+        n = len(buf)
+        tokens = []
+        for m in BYTES_TOKEN_PATTERN.finditer(buf):
+            start, end = m.span()
+            if start and buf[start - 1] >= 0x80 and _word_before(buf, start):
+                continue
+            if end < n and buf[end] >= 0x80 and _word_after(buf, end):
+                continue
+            tokens.append((m.group().decode("ascii"), start, end))
+        if metrics.ENABLED:
+            res = self._validate(tokens)
+            metrics.record_call("Extractor.scan_bytes", time.perf_counter() - started)
+            return res
+        return self._validate(tokens)
+
+    def _validate(self, tokens: Iterable[Tuple[str, int, int]]) -> List[Tuple[str, str, int, int]]:
+        """
+        Classifies (token, start, end) candidates by length and character class, then validates each type in bulk
+        """
+        candidates = {t: [] for t in self.include}
+        by_length = self._by_length
+        for token in tokens:
+            for t, check_fn in by_length.get(len(token[0]), ()):
+                if check_fn(token[0]):
+                    candidates[t].append(token)
+        res = []
+        for t, tokens in candidates.items():
+            mask = IDENTIFIER_TYPES[t][2]([x[0] for x in tokens], clean=False, universe=self.universe)
+            res.extend((t,) + x for x, ok in zip(tokens, mask) if ok)
+            if metrics.ENABLED:
+                metrics.record_identifiers(t, len(tokens), sum(mask))
+        res.sort(key=lambda x: x[2]) #stable, so types sharing a token keep the order of self.include
+        return res
+
+    def scan_stream(self, chunks: Iterable[str]) -> Iterator[Tuple[str, str, int, int]]:
+        """
+        Streaming variant of scan. Yields (type, value, start, end) with absolute offsets as each chunk is processed.
+        Identifiers straddling chunk boundaries are found; memory is bounded by the chunk size.
+        ------
+        PARAMS
+        ------
+            1. 'chunks' -> iterable of strings
+        """
+        for offset, segment in _iter_segments(chunks):
+            for t, value, start, end in self.scan(segment):
+                yield t, value, offset + start, offset + end
+
+    def extract(self, s: Union[str, bytes, bytearray, memoryview, mmap.mmap]) -> Dict[str, List[str]]:
+        """
+        Returns a dictionary of type -> list of identifiers found in the text (or bytes-like buffer)
+        """
+        res = {t: [] for t in self.include}
+        for t, value, _, _ in self.scan(s):
+            res[t].append(value)
+        return res
+
+    def matches(self, s: Union[str, bytes, bytearray, memoryview, mmap.mmap], resolve: str = "flag") -> List[Match]:
+        """
+        Returns a Match record (type, value, start, end, confidence, ambiguous) for every identifier, from one scan.
+        A token valid as more than one type (e.g. a 9 digit CUSIP that is also an ABA number) is scored using the
+        ABA routing symbol ranges and keywords around it ("routing", "cusip", ...).
+        ------
+        PARAMS
+        ------
+            1. 's' -> input string or bytes-like buffer
+            2. 'resolve' -> "flag" to return every reading of an ambiguous token, each flagged and with its confidence,
+                            or "best" to keep only the most likely reading (still flagged as ambiguous)
+        """
+        assert resolve in ("flag", "best"), "'resolve' must be 'flag' or 'best'."
+        res = []
+        readings = []
+        for x in self.scan(s): #sorted by start, so readings of the same token are adjacent
+            if readings and x[2] != readings[0][2]:
+                res.extend(_resolve(s, readings, resolve))
+                readings = []
+            readings.append(x)
+        if readings:
+            res.extend(_resolve(s, readings, resolve))
+        return res
+
+_EXTRACTORS = {}
+
+def get_extractor(include: List = ["CUSIP", "ISIN", "SEDOL"], universe: Container = None) -> Extractor:
+    """
+    Returns a cached Extractor for the given identifier types. Extractors with a universe are not cached.
+    """
+    if universe is not None:
+        return Extractor(include, universe)
+    key = tuple(include)
+    if key not in _EXTRACTORS:
+        _EXTRACTORS[key] = Extractor(include)
+    return _EXTRACTORS[key]
+
+def _iter_chunks(source: Union[str, IO, Iterable[str]], chunk_size: int) -> Iterator[str]:
+    if isinstance(source, str):
+        for i in range(0, len(source), chunk_size):
+            yield source[i:i + chunk_size]
+    elif hasattr(source, "read"):
+        for chunk in iter(lambda: source.read(chunk_size), ""):
+            yield chunk
+    else:
+        yield from source
+
+def _iter_segments(chunks: Iterable[str]) -> Iterator[Tuple[int, str]]:
+    """
+    Re-cuts a stream of text chunks between tokens. Yields (absolute offset, segment) such that scanning each segment
+    on its own finds exactly the identifiers of the whole text -- including those straddling chunk boundaries.
+    """
+    offset = 0 #absolute offset of buf[0]
+    carry = "" #trailing word characters of the previous chunk -- possibly the start of an identifier
+    skipping = False #True while inside a run of word characters too long to be an identifier
+    for chunk in chunks:
+        buf = carry + chunk
+        if skipping:
+            n = _WORD_RUN.match(buf).end()
+            offset += n
+            buf = buf[n:]
+            if not buf: #the whole chunk is part of the long run
+                continue
+            skipping = False
+        #hold back the trailing word run, as the next chunk may continue it
+        i = len(buf)
+        limit = max(0, i - _MAX_TOKEN_LENGTH - 1)
+        while i > limit and _is_word(buf[i - 1]):
+            i -= 1
+        if i > limit or i == 0:
+            segment, carry = buf[:i], buf[i:]
+        else: #trailing run is longer than any identifier, so it cannot produce a candidate
+            segment, carry, skipping = buf, "", True
+        if segment:
+            yield offset, segment
+        offset += len(segment)
+    if carry:
+        yield offset, carry
+
+def iter_securities(source: Union[str, IO, Iterable[str]], include: List = ["CUSIP", "ISIN", "SEDOL"], chunk_size: int = 1 << 20, universe: Container = None) -> Iterator[Tuple[str, str, int, int]]:
+    """
+    Generator-based extraction over very large texts.
+    Yields (type, value, start, end) for every valid identifier, with offsets into the whole text, using bounded memory.
+    ------
+    PARAMS
+    ------
+        1. 'source' -> text file object, iterable of string chunks, or a string
+        2. 'include' -> identifier types to search for. Any of CUSIP, ISIN, SEDOL and ABA
+        3. 'chunk_size' -> number of characters read at a time from file objects and strings
+        4. 'universe' -> optional BloomFilter, set or other container. If given, only identifiers in it are returned.
     """
-    pattern = r"((?<=[^\w])|(?<=^))(\d{9})(?=[^\w]|$)"
-    return find_and_validate(s, pattern, validation_fn=is_aba)
+    return get_extractor(include, universe).scan_stream(_iter_chunks(source, chunk_size))
 
+def find_matches(
+    s: Union[str, bytes, bytearray, memoryview, mmap.mmap],
+    include: List = ["CUSIP", "ISIN", "SEDOL", "ABA"],
+    resolve: str = "flag",
+    collapse: bool = False,
+    universe: Container = None
+    ) -> Union[List[Match], List[MatchGroup]]:
+    """
+    Finds every requested identifier type in one scan and returns span-aware match records (see Extractor.matches)
+    ------
+    PARAMS
+    ------
+        1. 's' -> input string or bytes-like buffer
+        2. 'include' -> identifier types to search for. Any of CUSIP, ISIN, SEDOL and ABA
+        3. 'resolve' -> "flag" to return every reading of ambiguous tokens, or "best" to keep the most likely one
+        4. 'collapse' -> If true, repeated identifiers are collapsed into MatchGroups with counts (see collapse_matches)
+        5. 'universe' -> optional BloomFilter, set or other container. If given, only identifiers in it are returned.
+    """
+    matches = get_extractor(include, universe).matches(s, resolve=resolve)
+    return collapse_matches(matches) if collapse else matches
 
+def scan_file(path: str, include: List = ["CUSIP", "ISIN", "SEDOL"], universe: Container = None) -> List[Tuple[str, str, int, int]]:
+    """
+    Memory-maps a (UTF-8 or ASCII) file and scans it in place, without reading or decoding it.
+    Returns (type, value, start, end) for every valid identifier, with byte offsets into the file.
+    ------
+    PARAMS
+    ------
+        1. 'path' -> file path
+        2. 'include' -> identifier types to search for. Any of CUSIP, ISIN, SEDOL and ABA
+        3. 'universe' -> optional BloomFilter, set or other container. If given, only identifiers in it are returned.
+    """
+    extractor = get_extractor(include, universe)
+    with open(path, "rb") as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: #empty files cannot be mapped
+            return []
+        with buf:
+            return extractor.scan_bytes(buf)
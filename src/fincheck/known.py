@@ -0,0 +1,258 @@
+"""
+Known-universe extraction with an Aho-Corasick automaton
+
+Regex and checksum extraction (fincheck.extract) cannot tell a real CUSIP from a random string that happens to pass
+the check digit. KnownMatcher only finds identifiers from a given universe -- the bundled reference data or a
+user-supplied list -- in one linear pass over the text.
+
+Example Usage:
+
+    >>> from fincheck.known import KnownMatcher, find_known_securities
+    >>> find_known_securities("Bought 98986X109 and 123456789 today")
+    [('98986X109', ('CUSIP', '98986X109'), 7, 16)]
+    >>> matcher = KnownMatcher({"AAPL": "037833100", "MSFT": "594918104"})
+    >>> matcher.findall("AAPL rallied while MSFT fell")
+    ['AAPL', 'MSFT']
+
+To keep memory practical for universes of millions of identifiers, the automaton is stored in flat arrays rather
+than one dictionary per node: states are numbered in breadth-first order, so the children of a state are contiguous
+and a transition is a single bytes.find over the child labels of the current state. Keys are kept as offsets into
+one buffer.
+
+The build is pure Python: roughly a minute or more per million CUSIPs. For large universes, build once and reuse the
+matcher -- it is made of arrays and bytes, so it pickles to a compact file that loads in a fraction of the build time.
+"""
+from typing import *
+from array import array
+from bisect import bisect_left
+from collections import deque
+from itertools import accumulate
+import sys
+import time
+from .extract import _is_word
+from .data import get_refdata
+from .checksum import isin_check_digits
+
+
+class KnownMatcher(object):
+    """
+    ----------------------------
+    Aho-Corasick matcher over a universe of identifiers
+    ----------------------------
+    Yields (key, value, start, end) for every occurrence of a key in a text, in one pass.
+    With whole_words=True (default), only occurrences bounded by non-word characters are reported,
+    matching how fincheck.extract tokenizes identifiers.
+    ----------------------------
+    """
+    def __init__(self, universe: Union[Iterable[str], Dict[str, Any]], ignore_case: bool = False, whole_words: bool = True):
+        """
+        ------
+        PARAMS
+        ------
+            1. 'universe' -> iterable of ASCII keys, or a dict of key -> value reported with each match (defaults to the key)
+            2. 'ignore_case' -> If true, keys and text are compared case-insensitively
+            3. 'whole_words' -> If true, only report matches that are whole tokens
+        """
+        start = time.perf_counter()
+        self.ignore_case = ignore_case
+        self.whole_words = whole_words
+        has_values = isinstance(universe, dict) or ignore_case #else the value is the matched text itself
+        if not isinstance(universe, dict):
+            universe = {k: k for k in universe}
+        values = {}
+        for k, v in universe.items():
+            assert k and k.isascii() and "?" not in k, f"Keys must be non-empty ASCII strings without '?': {k!r}"
+            b = k.encode("ascii")
+            if ignore_case:
+                b = b.upper()
+            values.setdefault(b, v) #first key wins when keys collide after case folding
+        keys = sorted(values)
+        self._values = [values[k] for k in keys] if has_values else None
+        del values, universe
+        #keys are stored once, as offsets into a single buffer, instead of one bytes object each
+        self._key_data = b"".join(keys)
+        self._key_offsets = array("Q", accumulate(map(len, keys), initial=0))
+        self._build(keys)
+        self._build_seconds = time.perf_counter() - start
+
+    def _key(self, i: int) -> bytes:
+        offsets = self._key_offsets
+        return self._key_data[offsets[i]:offsets[i + 1]]
+
+    def _build(self, keys: List[bytes]):
+        labels = bytearray(b"\0") #labels[s] is the character leading into state s
+        first_child = array("I", [0])
+        n_children = array("H", [0])
+        out = array("i", [-1]) #key index for terminal states, else -1
+        #breadth-first over ranges of the sorted keys that share a prefix
+        queue = deque([(0, 0, len(keys), 0)]) #state, lo, hi, depth
+        next_state = 1
+        while queue:
+            s, lo, hi, d = queue.popleft()
+            if lo < hi and len(keys[lo]) == d: #a key that is a prefix sorts first
+                out[s] = lo
+                lo += 1
+            first_child[s] = next_state
+            i = lo
+            while i < hi:
+                c = keys[i][d]
+                end = hi if c == 255 else bisect_left(keys, keys[i][:d] + bytes([c + 1]), i, hi)
+                labels.append(c)
+                first_child.append(0)
+                n_children.append(0)
+                out.append(-1)
+                queue.append((next_state, i, end, d + 1))
+                next_state += 1
+                i = end
+            n_children[s] = next_state - first_child[s]
+
+        #failure links and dictionary suffix links, in breadth-first order
+        fail = array("I", bytes(4 * next_state))
+        dict_link = array("I", bytes(4 * next_state)) #nearest terminal state on the failure chain, 0 if none
+        for s in range(next_state):
+            lo = first_child[s]
+            for t in range(lo, lo + n_children[s]):
+                f = 0
+                if s:
+                    c = labels[t]
+                    f = fail[s]
+                    while True:
+                        g = labels.find(c, first_child[f], first_child[f] + n_children[f])
+                        if g >= 0:
+                            f = g
+                            break
+                        if f == 0:
+                            break
+                        f = fail[f]
+                fail[t] = f
+                dict_link[t] = f if out[f] >= 0 else dict_link[f]
+
+        self._labels = bytes(labels)
+        self._first_child = first_child
+        self._n_children = n_children
+        self._out = out
+        self._fail = fail
+        self._dict_link = dict_link
+
+    def finditer(self, s: str) -> Iterator[Tuple[str, Any, int, int]]:
+        """
+        Yields (key, value, start, end) for every match, in order of where the match ends
+        ------
+        PARAMS
+        ------
+            1. 's' -> input string
+        """
+        data = s.encode("ascii", errors="replace") #one byte per character, so offsets are preserved
+        if self.ignore_case:
+            data = data.upper()
+        labels, first_child, n_children = self._labels, self._first_child, self._n_children
+        out, fail, dict_link, offsets, values = self._out, self._fail, self._dict_link, self._key_offsets, self._values
+        whole_words = self.whole_words
+        n = len(s)
+        state = 0
+        for pos, c in enumerate(data):
+            while True:
+                lo = first_child[state]
+                nxt = labels.find(c, lo, lo + n_children[state])
+                if nxt >= 0:
+                    state = nxt
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+            t = state if out[state] >= 0 else dict_link[state]
+            while t:
+                k = out[t]
+                end = pos + 1
+                start = end - (offsets[k + 1] - offsets[k])
+                if not whole_words or ((start == 0 or not _is_word(s[start - 1])) and (end == n or not _is_word(s[end]))):
+                    key = s[start:end]
+                    yield key, key if values is None else values[k], start, end
+                t = dict_link[t]
+
+    def findall(self, s: str) -> List[str]:
+        """
+        Returns every matched key in the text
+        """
+        return [key for key, _, _, _ in self.finditer(s)]
+
+    def __contains__(self, key: str) -> bool:
+        b = key.encode("ascii", errors="replace")
+        if self.ignore_case:
+            b = b.upper()
+        lo, hi = 0, len(self)
+        while lo < hi: #binary search over the sorted keys in the buffer
+            mid = (lo + hi) // 2
+            if self._key(mid) < b:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo < len(self) and self._key(lo) == b
+
+    def __len__(self) -> int:
+        return len(self._key_offsets) - 1
+
+    def stats(self) -> Dict:
+        """
+        Returns the number of keys and states, approximate memory footprint (bytes) and build time (seconds)
+        """
+        arrays = [self._first_child, self._n_children, self._out, self._fail, self._dict_link, self._key_offsets]
+        n_bytes = len(self._labels) + len(self._key_data) + sum(a.itemsize * len(a) for a in arrays)
+        if self._values is not None:
+            n_bytes += sys.getsizeof(self._values) + sum(sys.getsizeof(v) for v in self._values)
+        return {"keys": len(self), "states": len(self._labels), "bytes": n_bytes, "build_seconds": self._build_seconds}
+
+    @classmethod
+    def from_refdata(cls, refdata: "RefData" = None, cusips: bool = True, isins: bool = False, tickers: bool = False, country: str = "US") -> "KnownMatcher":
+        """
+        Builds a matcher over the reference data. Each match's value is a tuple of (key type, cusip).
+        ------
+        PARAMS
+        ------
+            1. 'refdata' -> any registry (RefData, RefDataSnapshot, CompiledRefData, ...). Defaults to get_refdata()
+            2. 'cusips' -> include the CUSIPs of the reference data
+            3. 'isins' -> include ISINs derived from those CUSIPs (with the given country code)
+            4. 'tickers' -> include tickers from the cusip/ticker map. Short tickers are also common words, so this is off by default.
+            5. 'country' -> country code for derived ISINs ("US" or "CA")
+        """
+        refdata = refdata or get_refdata()
+        cusip_list = list(refdata.iter_cusips())
+        universe = {}
+        if cusips:
+            for c in cusip_list:
+                universe.setdefault(c, ("CUSIP", c))
+        if isins:
+            valid = [c for c in cusip_list if c.isalnum() and c.isascii() and c.upper() == c and len(c) == 9]
+            for c, d in zip(valid, isin_check_digits(country + c for c in valid)):
+                universe.setdefault(f"{country}{c}{d}", ("ISIN", c))
+        if tickers:
+            for cusip, ticker in refdata.iter_tickers():
+                if ticker:
+                    universe.setdefault(ticker, ("TICKER", cusip))
+        return cls(universe)
+
+
+_MATCHER = None #(refdata it was built from, matcher)
+
+def get_matcher() -> KnownMatcher:
+    """
+    Returns the default matcher over the CUSIPs of the process-wide reference data.
+    Built on first use, and rebuilt after set_refdata or a snapshot swap replaces the registry.
+    """
+    global _MATCHER
+    refdata = get_refdata()
+    if _MATCHER is None or _MATCHER[0] is not refdata:
+        _MATCHER = (refdata, KnownMatcher.from_refdata(refdata))
+    return _MATCHER[1]
+
+def find_known_securities(s: str, matcher: KnownMatcher = None) -> List[Tuple[str, Any, int, int]]:
+    """
+    Finds only known securities in a text. Returns (key, value, start, end) for each match.
+    ------
+    PARAMS
+    ------
+        1. 's' -> input string
+        2. 'matcher' -> KnownMatcher to use. Defaults to the reference data CUSIPs (see get_matcher)
+    """
+    matcher = matcher or get_matcher()
+    return list(matcher.finditer(s))
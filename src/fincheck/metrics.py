@@ -0,0 +1,176 @@
+"""
+Optional instrumentation of the extraction, validation and reference data hot paths
+
+Metrics are off by default. While off, each instrumented function only checks the module-level ENABLED flag.
+While on, the following are collected (process-wide, thread-safe):
+    > calls: call count, cumulative and max seconds per function (find_and_validate per type, Extractor.scan,
+      Extractor.scan_bytes, the is_*_many bulk validators)
+    > identifiers: regex candidates, and how many were accepted or rejected by checksum validation, per type
+    > loads: reference data load times (recorded even while metrics are off, as loads happen once, usually at startup)
+
+Example Usage:
+
+    >>> from fincheck import metrics
+    >>> from fincheck.extract import get_cusips
+    >>> metrics.enable()
+    >>> get_cusips("M0392N101 M0392N100")
+    ['M0392N101']
+    >>> metrics.snapshot()["identifiers"]["CUSIP"]
+    {'candidates': 2, 'accepted': 1, 'rejected': 1}
+    >>> metrics.add_callback(lambda kind, name, seconds, data: print(kind, name)) #e.g. forward to a profiler
+    >>> metrics.to_json() #for logs and dashboards
+"""
+from typing import *
+from contextlib import contextmanager
+from functools import wraps
+from threading import Lock
+import json
+import time
+
+ENABLED = False
+
+_LOCK = Lock()
+_calls = {} #name -> [count, seconds, max seconds]
+_identifiers = {} #type -> [candidates, accepted]
+_loads = {} #name -> [count, seconds, last seconds]
+_callbacks = []
+
+
+def enable():
+    global ENABLED
+    ENABLED = True
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+def is_enabled() -> bool:
+    return ENABLED
+
+@contextmanager
+def enabled() -> Iterator[None]:
+    """
+    Collects metrics inside a with block, restoring the previous state on exit
+    """
+    global ENABLED
+    previous, ENABLED = ENABLED, True
+    try:
+        yield
+    finally:
+        ENABLED = previous
+
+def reset():
+    """
+    Clears every counter and timing (callbacks are kept)
+    """
+    with _LOCK:
+        _calls.clear()
+        _identifiers.clear()
+        _loads.clear()
+
+def add_callback(fn: Callable[[str, str, float, Dict], None]):
+    """
+    Registers a callback called as fn(kind, name, seconds, data) for every recorded event while metrics are enabled
+    ------
+    PARAMS
+    ------
+        1. 'fn' -> callable. kind is "call" or "load"; data holds extra fields (e.g. candidates and accepted counts)
+    """
+    _callbacks.append(fn)
+
+def remove_callback(fn: Callable[[str, str, float, Dict], None]):
+    _callbacks.remove(fn)
+
+def _notify(kind: str, name: str, seconds: float, data: Dict):
+    for fn in list(_callbacks):
+        fn(kind, name, seconds, data)
+
+def record_call(name: str, seconds: float, **data):
+    """
+    Records one call of an instrumented function
+    """
+    with _LOCK:
+        entry = _calls.get(name)
+        if entry is None:
+            entry = _calls[name] = [0, 0.0, 0.0]
+        entry[0] += 1
+        entry[1] += seconds
+        if seconds > entry[2]:
+            entry[2] = seconds
+    if _callbacks:
+        _notify("call", name, seconds, data)
+
+def record_identifiers(type_: str, candidates: int, accepted: int):
+    """
+    Records how many candidates of an identifier type were found and how many passed validation
+    """
+    with _LOCK:
+        entry = _identifiers.get(type_)
+        if entry is None:
+            entry = _identifiers[type_] = [0, 0]
+        entry[0] += candidates
+        entry[1] += accepted
+
+def record_load(name: str, seconds: float):
+    """
+    Records a reference data load. Always recorded; callbacks only run while metrics are enabled.
+    """
+    with _LOCK:
+        entry = _loads.get(name)
+        if entry is None:
+            entry = _loads[name] = [0, 0.0, 0.0]
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = seconds
+    if ENABLED and _callbacks:
+        _notify("load", name, seconds, {})
+
+def timed(name: str = None) -> Callable:
+    """
+    Decorator recording call counts and timings of a function while metrics are enabled.
+    Meant for functions called once per batch -- the wrapper adds a function call even while metrics are off.
+    ------
+    PARAMS
+    ------
+        1. 'name' -> name to record calls under. Defaults to the function's name
+    """
+    def decorator(fn: Callable) -> Callable:
+        label = name or fn.__name__
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record_call(label, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def snapshot() -> Dict:
+    """
+    Returns a copy of every metric as plain dicts (JSON serializable)
+    """
+    with _LOCK:
+        return {
+            "enabled": ENABLED,
+            "calls": {
+                name: {"count": count, "seconds": seconds, "max_seconds": max_seconds}
+                for name, (count, seconds, max_seconds) in sorted(_calls.items())
+            },
+            "identifiers": {
+                type_: {"candidates": candidates, "accepted": accepted, "rejected": candidates - accepted}
+                for type_, (candidates, accepted) in sorted(_identifiers.items())
+            },
+            "loads": {
+                name: {"count": count, "seconds": seconds, "last_seconds": last}
+                for name, (count, seconds, last) in sorted(_loads.items())
+            },
+        }
+
+def to_json(**kwargs) -> str:
+    """
+    Returns snapshot() as a JSON string. Keyword arguments are passed to json.dumps (e.g. indent=2)
+    """
+    return json.dumps(snapshot(), **kwargs)
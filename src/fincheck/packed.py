@@ -0,0 +1,325 @@
+"""
+Integer-packed identifiers and compact, array-backed identifier sets
+
+CUSIPs, SEDOLs and ISINs are at most 12 characters from the 36-symbol alphabet of utils.ALPHANUMERIC, so each one
+packs into a signed 64-bit integer:
+
+    > every character is encoded as its value + 1 (1-36), and the string is read as a base-37 number
+    > 0 never appears as a digit, so the length is implicit and "0001" and "001" pack to different integers
+    > 37 ** 12 < 2 ** 63, so every identifier of up to 12 characters fits in an int64
+    > identifiers of the same length sort the same way packed as they do as strings
+
+IdentifierSet and IdentifierMap keep the packed integers in a sorted array('q') -- 8 bytes per identifier instead of
+a ~60 byte Python string plus its set or dict slot -- and find keys by binary search.
+
+Example Usage:
+
+    >>> from fincheck.packed import encode, decode, IdentifierSet, IdentifierMap
+    >>> encode("037833100")
+    3913364571370
+    >>> decode(3913364571370)
+    '037833100'
+    >>> today = IdentifierSet(["037833100", "98986X109", "594918104"])
+    >>> yesterday = IdentifierSet(["037833100", "931142103"])
+    >>> list(today - yesterday) #added since yesterday
+    ['594918104', '98986X109']
+    >>> names = IdentifierMap({"037833100": "APPLE INC", "98986X109": "ZYNERBA PHARMACEUTICALS INC"})
+    >>> list(names.join(IdentifierMap({"037833100": "AAPL"})))
+    [('037833100', 'APPLE INC', 'AAPL')]
+"""
+from typing import *
+from array import array
+from bisect import bisect_left
+from .utils import ALPHANUMERIC
+
+MAX_LENGTH = 12
+_BASE = len(ALPHANUMERIC) + 1
+_MISSING = object()
+
+#ASCII code -> character value + 1, or 0 for characters outside of 0-9 and A-Z
+_PACK_VALUES = bytes(ALPHANUMERIC.index(chr(i)) + 1 if chr(i) in ALPHANUMERIC else 0 for i in range(256))
+
+
+def encode(s: str) -> int:
+    """
+    Packs an identifier of up to 12 characters (0-9, A-Z) into a 64-bit integer
+    ------
+    PARAMS
+    ------
+        1. 's' -> input string
+    """
+    try:
+        values = s.encode("ascii").translate(_PACK_VALUES)
+    except (UnicodeEncodeError, AttributeError):
+        raise ValueError(f"Invalid identifier {s!r}. Characters must be 0-9 or A-Z.")
+    if len(values) > MAX_LENGTH or 0 in values:
+        raise ValueError(f"Invalid identifier {s!r}. Must be at most {MAX_LENGTH} characters of 0-9 or A-Z.")
+    n = 0
+    for v in values:
+        n = n * _BASE + v
+    return n
+
+def decode(n: int) -> str:
+    """
+    Unpacks an integer produced by encode back into the identifier
+    ------
+    PARAMS
+    ------
+        1. 'n' -> packed identifier
+    """
+    chars = []
+    while n:
+        n, v = divmod(n, _BASE)
+        assert v, "Not a packed identifier."
+        chars.append(ALPHANUMERIC[v - 1])
+    return "".join(reversed(chars))
+
+def encode_many(values: Iterable[str]) -> array:
+    """
+    Packs many identifiers into an array('q'). Raises ValueError on the first invalid identifier.
+    """
+    return array("q", map(encode, values))
+
+def decode_many(packed: Iterable[int]) -> List[str]:
+    """
+    Unpacks many integers produced by encode
+    """
+    return list(map(decode, packed))
+
+def _sorted_unique(packed: Iterable[int]) -> array:
+    return array("q", sorted(set(packed)))
+
+def _find(keys: array, n: int) -> int:
+    """
+    Returns the position of n in the sorted array, or -1
+    """
+    i = bisect_left(keys, n)
+    return i if i < len(keys) and keys[i] == n else -1
+
+def _merge(a: array, b: array, keep_common: bool) -> array:
+    """
+    Linear merge of two sorted, duplicate-free arrays. Keys in both are kept once if keep_common (union), else dropped
+    (symmetric difference).
+    """
+    res = array("q")
+    append = res.append
+    i = j = 0
+    n_a, n_b = len(a), len(b)
+    while i < n_a and j < n_b:
+        x, y = a[i], b[j]
+        if x == y:
+            if keep_common:
+                append(x)
+            i += 1
+            j += 1
+        elif x < y:
+            append(x)
+            i += 1
+        else:
+            append(y)
+            j += 1
+    res.extend(a[i:])
+    res.extend(b[j:])
+    return res
+
+
+class IdentifierSet(object):
+    """
+    ----------------------------
+    Sorted, array-backed set of packed identifiers
+    ----------------------------
+    Supports `in`, iteration (in packed order), len, and the set operators | & - ^ (plus <= and ==).
+    Identifiers are validated on the way in: only 0-9 and A-Z, at most 12 characters.
+    ----------------------------
+    """
+    def __init__(self, ids: Iterable[str] = ()):
+        """
+        ------
+        PARAMS
+        ------
+            1. 'ids' -> iterable of identifier strings
+        """
+        self._keys = _sorted_unique(map(encode, ids))
+
+    @classmethod
+    def from_packed(cls, packed: Iterable[int], is_sorted: bool = False) -> "IdentifierSet":
+        """
+        Builds a set from packed integers. Pass is_sorted=True for an already sorted, duplicate-free array to skip sorting.
+        """
+        s = cls.__new__(cls)
+        s._keys = packed if is_sorted and isinstance(packed, array) else _sorted_unique(packed)
+        return s
+
+    @property
+    def packed(self) -> array:
+        """
+        The sorted array('q') of packed identifiers
+        """
+        return self._keys
+
+    def __contains__(self, s: str) -> bool:
+        try:
+            return _find(self._keys, encode(s)) >= 0
+        except ValueError: #cannot be in the set
+            return False
+
+    def contains_many(self, values: Iterable[str]) -> List[bool]:
+        """
+        Bulk membership. Returns a boolean mask with one entry per value, so sets can be used as a 'universe' in validate and extract.
+        """
+        return [v in self for v in values]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[str]:
+        return map(decode, self._keys)
+
+    def __eq__(self, other: "IdentifierSet") -> bool:
+        return isinstance(other, IdentifierSet) and self._keys == other._keys
+
+    def __le__(self, other: "IdentifierSet") -> bool:
+        return len(self - other) == 0
+
+    def __or__(self, other: "IdentifierSet") -> "IdentifierSet":
+        return IdentifierSet.from_packed(_merge(self._keys, other._keys, keep_common=True), is_sorted=True)
+
+    def __and__(self, other: "IdentifierSet") -> "IdentifierSet":
+        small, large = (self, other) if len(self) <= len(other) else (other, self)
+        keys = large._keys
+        return IdentifierSet.from_packed(array("q", [n for n in small._keys if _find(keys, n) >= 0]), is_sorted=True)
+
+    def __sub__(self, other: "IdentifierSet") -> "IdentifierSet":
+        keys = other._keys
+        return IdentifierSet.from_packed(array("q", [n for n in self._keys if _find(keys, n) < 0]), is_sorted=True)
+
+    def __xor__(self, other: "IdentifierSet") -> "IdentifierSet":
+        return IdentifierSet.from_packed(_merge(self._keys, other._keys, keep_common=False), is_sorted=True)
+
+    union = __or__
+    intersection = __and__
+    difference = __sub__
+    symmetric_difference = __xor__
+    issubset = __le__
+
+    def nbytes(self) -> int:
+        return self._keys.itemsize * len(self._keys)
+
+    def to_bytes(self) -> bytes:
+        return self._keys.tobytes()
+
+    @classmethod
+    def from_bytes(cls, b: bytes) -> "IdentifierSet":
+        keys = array("q")
+        keys.frombytes(b)
+        return cls.from_packed(keys, is_sorted=True)
+
+    def __repr__(self) -> str:
+        return f"IdentifierSet({len(self)} identifiers)"
+
+
+class IdentifierMap(object):
+    """
+    ----------------------------
+    Sorted, array-backed mapping of packed identifiers to values
+    ----------------------------
+    Keys are stored as in IdentifierSet; values in a parallel list. For duplicate keys, the first value wins.
+    Supports get, [], `in`, len, iteration over keys, items(), and sorted merge joins with another map.
+    ----------------------------
+    """
+    def __init__(self, items: Union[Dict[str, Any], Iterable[Tuple[str, Any]]] = ()):
+        """
+        ------
+        PARAMS
+        ------
+            1. 'items' -> dict of identifier -> value, or iterable of (identifier, value) pairs
+        """
+        if isinstance(items, dict):
+            items = items.items()
+        packed = {}
+        for k, v in items:
+            packed.setdefault(encode(k), v)
+        keys = sorted(packed)
+        self._keys = array("q", keys)
+        self._values = [packed[k] for k in keys]
+
+    @property
+    def packed(self) -> array:
+        return self._keys
+
+    def keys(self) -> IdentifierSet:
+        return IdentifierSet.from_packed(self._keys, is_sorted=True)
+
+    def values(self) -> List:
+        return self._values
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        return zip(map(decode, self._keys), self._values)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            i = _find(self._keys, encode(key))
+        except ValueError:
+            return default
+        return self._values[i] if i >= 0 else default
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def contains_many(self, values: Iterable[str]) -> List[bool]:
+        return [v in self for v in values]
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[str]:
+        return map(decode, self._keys)
+
+    def join(self, other: "IdentifierMap", how: str = "inner") -> Iterator[Tuple[str, Any, Any]]:
+        """
+        Merge join on the packed keys. Yields (identifier, this value, other value) in key order.
+        ------
+        PARAMS
+        ------
+            1. 'other' -> IdentifierMap to join with
+            2. 'how' -> "inner" (keys in both), "left" (keys of this map) or "outer" (keys of either).
+                        Missing values are None.
+        """
+        assert how in ("inner", "left", "outer"), "'how' must be one of inner, left or outer."
+        a, b = self._keys, other._keys
+        av, bv = self._values, other._values
+        i = j = 0
+        while i < len(a) and j < len(b):
+            if a[i] == b[j]:
+                yield decode(a[i]), av[i], bv[j]
+                i += 1
+                j += 1
+            elif a[i] < b[j]:
+                if how != "inner":
+                    yield decode(a[i]), av[i], None
+                i += 1
+            else:
+                if how == "outer":
+                    yield decode(b[j]), None, bv[j]
+                j += 1
+        if how != "inner":
+            for i in range(i, len(a)):
+                yield decode(a[i]), av[i], None
+        if how == "outer":
+            for j in range(j, len(b)):
+                yield decode(b[j]), None, bv[j]
+
+    def nbytes(self) -> int:
+        """
+        Bytes used by the key array (values are not counted)
+        """
+        return self._keys.itemsize * len(self._keys)
+
+    def __repr__(self) -> str:
+        return f"IdentifierMap({len(self)} identifiers)"
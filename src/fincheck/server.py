@@ -0,0 +1,411 @@
+"""
+Asyncio JSON-lines server for validation, check digits and extraction
+
+Every request is one JSON object per line; every response is one JSON object per line, in the order the requests
+were received on that connection. Requests are only parsed and queued per line -- the work is done in micro-batches:
+requests arriving within 'max_delay' seconds of each other (from any connection) are coalesced and sent through the
+bulk functions (validate.is_*_many, checksum.*_check_digits, one Extractor scan over all documents). Bulk calls run
+in the event loop's default executor, so connections keep being read and answered while a batch is processed.
+
+    python -m fincheck.server --port 8765          #TCP
+    python -m fincheck.server --unix /tmp/fc.sock  #Unix socket
+    python -m fincheck.server --stdio              #stdin / stdout
+
+Requests:
+    {"id": 1, "op": "validate", "type": "CUSIP", "value": "037833100"}          -> {"id": 1, "result": true}
+    {"id": 2, "op": "validate", "type": "ISIN", "values": ["US0378331005", "x"]} -> {"id": 2, "result": [true, false]}
+    {"id": 3, "op": "check_digit", "type": "SEDOL", "value": "B7TL82"}          -> {"id": 3, "result": 0}
+    {"id": 4, "op": "extract", "text": "...", "include": ["CUSIP", "ABA"]}      -> {"id": 4, "result": {"CUSIP": [...], "ABA": [...]}}
+    {"id": 5, "op": "stats"}                                                     -> {"id": 5, "result": {...counters...}}
+
+Failed requests get {"id": ..., "error": "..."}; the "id" field is optional and echoed back as-is.
+
+Backpressure: pending work is held in a bounded queue. When it is full, connections stop reading until the
+batcher catches up, so a fast client is slowed down by TCP flow control instead of growing memory without bound.
+"""
+from typing import *
+from bisect import bisect_right
+from collections import deque
+import argparse
+import asyncio
+import json
+import sys
+import time
+from .validate import BULK_VALIDATORS
+from .checksum import CHECK_DIGIT_FUNCTIONS
+from .extract import get_extractor
+
+_DOC_SEPARATOR = "\n" #not a word character, so no identifier spans two documents
+
+
+def _extract_many(include: Tuple[str, ...], docs: List[str]) -> List[Dict[str, List[str]]]:
+    """
+    Extracts from many documents with a single scan, so candidates of every document are validated in one bulk call
+    """
+    extractor = get_extractor(include)
+    starts = []
+    pos = 0
+    for doc in docs:
+        starts.append(pos)
+        pos += len(doc) + len(_DOC_SEPARATOR)
+    res = [{t: [] for t in extractor.include} for _ in docs]
+    for t, value, start, _ in extractor.scan(_DOC_SEPARATOR.join(docs)):
+        res[bisect_right(starts, start) - 1][t].append(value)
+    return res
+
+def _batch_fn(key: Tuple) -> Callable[[List], List]:
+    op, arg = key
+    if op == "validate":
+        return BULK_VALIDATORS[arg]
+    if op == "check_digit":
+        return CHECK_DIGIT_FUNCTIONS[arg][0]
+    return lambda docs: _extract_many(arg, docs)
+
+
+class Server(object):
+    """
+    ----------------------------
+    Micro-batching JSON-lines server
+    ----------------------------
+    Use start_tcp / start_unix / serve_stdio from a running event loop, or serve() to run until cancelled.
+    stats() returns request, batch, error and latency counters.
+    ----------------------------
+    """
+    def __init__(self, max_batch: int = 1024, max_delay: float = 0.002, max_pending: int = 10_000):
+        """
+        ------
+        PARAMS
+        ------
+            1. 'max_batch' -> maximum number of values processed in one bulk call
+            2. 'max_delay' -> seconds to wait for more requests before running a partial batch
+            3. 'max_pending' -> maximum number of queued requests before connections stop reading (backpressure)
+        """
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self._queue = None
+        self._batcher = None
+        self._servers = []
+        self._connections = {} #handler task -> writer of each open socket connection
+        self._started = time.perf_counter()
+        self._latencies = deque(maxlen=10_000) #recent request latencies (seconds)
+        self.counters = {"connections": 0, "requests": 0, "errors": 0, "batches": 0, "batched_values": 0, "queue_full": 0}
+
+    #---------------------------------------------
+    # Batching
+    #---------------------------------------------
+    def _ensure_batcher(self):
+        if self._batcher is None:
+            self._queue = asyncio.Queue(self.max_pending)
+            self._batcher = asyncio.ensure_future(self._run_batches())
+
+    async def _run_batches(self):
+        queue = self._queue
+        while True:
+            items = [await queue.get()]
+            n_values = len(items[0][1])
+            if n_values < self.max_batch and queue.empty():
+                await asyncio.sleep(self.max_delay) #let concurrent requests join the batch
+            while n_values < self.max_batch and not queue.empty():
+                item = queue.get_nowait()
+                items.append(item)
+                n_values += len(item[1])
+            groups = {}
+            for item in items:
+                groups.setdefault(item[0], []).append(item)
+            for key, group in groups.items():
+                await self._run_group(key, group)
+
+    async def _run_group(self, key: Tuple, group: List):
+        #bulk calls run in the default executor, so the event loop keeps reading and answering other connections
+        loop = asyncio.get_running_loop()
+        try:
+            fn = _batch_fn(key)
+            values = [v for _, vs, _ in group for v in vs]
+            self.counters["batches"] += 1
+            self.counters["batched_values"] += len(values)
+            try:
+                results = await loop.run_in_executor(None, fn, values)
+            except Exception: #isolate the failing request(s)
+                for _, vs, future in group:
+                    try:
+                        res = await loop.run_in_executor(None, fn, vs)
+                    except Exception as e:
+                        if not future.done():
+                            future.set_exception(e)
+                    else:
+                        if not future.done():
+                            future.set_result(res)
+                return
+            i = 0
+            for _, vs, future in group:
+                if not future.done():
+                    future.set_result(results[i:i + len(vs)])
+                i += len(vs)
+        except Exception as e: #never leave a request waiting, and keep the batcher running
+            for _, _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def _submit(self, key: Tuple, values: List) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        if self._queue.full():
+            self.counters["queue_full"] += 1
+        await self._queue.put((key, values, future)) #blocks while the queue is full
+        return future
+
+    #---------------------------------------------
+    # Requests
+    #---------------------------------------------
+    async def submit(self, request: Dict) -> Awaitable:
+        """
+        Queues a request and returns an awaitable for its result. Waits while the pending queue is full.
+        """
+        self._ensure_batcher()
+        op = request.get("op")
+        if op == "stats":
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(self.stats())
+            return future
+        if op in ("validate", "check_digit"):
+            type_ = str(request.get("type", "")).upper()
+            table = BULK_VALIDATORS if op == "validate" else CHECK_DIGIT_FUNCTIONS
+            assert type_ in table, f"'type' must be one of {', '.join(table)} for {op}."
+            single = "values" not in request
+            values = [request["value"]] if single else list(request["values"])
+            assert all(isinstance(v, str) for v in values), "Values must be strings."
+            future = await self._submit((op, type_), values)
+        elif op == "extract":
+            include = tuple(x.upper() for x in request.get("include", ["CUSIP", "ISIN", "SEDOL"]))
+            get_extractor(include) #fail fast on invalid types
+            assert isinstance(request.get("text"), str), "'text' must be a string."
+            single = True
+            future = await self._submit(("extract", include), [request["text"]])
+        else:
+            raise ValueError(f"Unknown op: {op!r}. Must be one of validate, check_digit, extract or stats.")
+        return self._unwrap(future, single)
+
+    async def _unwrap(self, future: asyncio.Future, single: bool) -> Any:
+        res = await future
+        return res[0] if single else res
+
+    async def handle(self, request: Dict) -> Any:
+        """
+        Processes one request and returns its result
+        """
+        return await (await self.submit(request))
+
+    async def _respond(self, request_id: Any, pending: Awaitable, start: float) -> bytes:
+        res = {} if request_id is None else {"id": request_id}
+        try:
+            res["result"] = await pending
+        except Exception as e:
+            self.counters["errors"] += 1
+            res["error"] = f"{type(e).__name__}: {e}"
+        self._latencies.append(time.perf_counter() - start)
+        return (json.dumps(res) + "\n").encode("utf-8")
+
+    async def _raise(self, e: Exception) -> Any:
+        raise e
+
+    async def _serve_connection(self, reader, writer):
+        self._ensure_batcher()
+        self.counters["connections"] += 1
+        if hasattr(writer, "close"):
+            self._connections[asyncio.current_task()] = writer
+        responses = asyncio.Queue(self.max_pending) #bounded, so a client that does not read its responses stalls its own reads
+        async def write_responses():
+            while True:
+                task = await responses.get()
+                if task is None:
+                    break
+                writer.write(await task)
+                await writer.drain() #raises once the client has disconnected
+        writer_task = asyncio.ensure_future(write_responses())
+        async def put(item: Optional[asyncio.Future]) -> bool:
+            #waits for room in the queue, unless the writer stops (e.g. the client went away) in the meantime
+            if not responses.full():
+                responses.put_nowait(item)
+                return True
+            put_task = asyncio.ensure_future(responses.put(item))
+            await asyncio.wait([put_task, writer_task], return_when=asyncio.FIRST_COMPLETED)
+            if put_task.done():
+                return True
+            put_task.cancel()
+            return False
+        try:
+            while not writer_task.done():
+                try:
+                    line = await reader.readline()
+                except ConnectionError:
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                start = time.perf_counter()
+                self.counters["requests"] += 1
+                request_id = None
+                try:
+                    request = json.loads(line)
+                    assert isinstance(request, dict), "Request must be a JSON object."
+                    request_id = request.get("id")
+                    pending = await self.submit(request)
+                except Exception as e:
+                    pending = self._raise(e)
+                task = asyncio.ensure_future(self._respond(request_id, pending, start))
+                if not await put(task):
+                    task.cancel()
+                    break
+        finally:
+            await put(None) #if it fails, the writer has already stopped
+            try:
+                await writer_task
+            except ConnectionError: #client disconnected before reading every response
+                pass
+            while not responses.empty(): #responses nobody will read
+                task = responses.get_nowait()
+                if task is not None:
+                    task.cancel()
+            if hasattr(writer, "close"):
+                writer.close()
+                try:
+                    await writer.wait_closed()
+                except ConnectionError:
+                    pass
+                self._connections.pop(asyncio.current_task(), None)
+
+    #---------------------------------------------
+    # Transports
+    #---------------------------------------------
+    async def start_tcp(self, host: str = "127.0.0.1", port: int = 8765) -> asyncio.AbstractServer:
+        """
+        Starts listening on a TCP socket and returns the asyncio server (port 0 picks a free port, see .sockets)
+        """
+        server = await asyncio.start_server(self._serve_connection, host, port)
+        self._servers.append(server)
+        return server
+
+    async def start_unix(self, path: str) -> asyncio.AbstractServer:
+        """
+        Starts listening on a Unix domain socket and returns the asyncio server
+        """
+        server = await asyncio.start_unix_server(self._serve_connection, path)
+        self._servers.append(server)
+        return server
+
+    async def serve_stdio(self, stdin: IO = None, stdout: IO = None):
+        """
+        Serves requests read from stdin (one per line) until EOF, writing responses to stdout
+        """
+        await self._serve_connection(_LineReader(stdin or sys.stdin), _LineWriter(stdout or sys.stdout))
+
+    async def close(self):
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers = []
+        #closing a connection ends its reads, so each handler finishes and cleans up before the batcher stops
+        handlers = list(self._connections)
+        for writer in self._connections.values():
+            writer.close()
+        if handlers:
+            await asyncio.wait(handlers)
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+            self._batcher = None
+
+    def stats(self) -> Dict:
+        """
+        Returns request, batch and error counters, throughput (requests/sec) and latency percentiles (seconds)
+        """
+        seconds = time.perf_counter() - self._started
+        latencies = sorted(self._latencies)
+        def percentile(p: float) -> float:
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else 0.0
+        res = dict(self.counters)
+        res.update({
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "seconds": seconds,
+            "requests_per_second": self.counters["requests"] / seconds if seconds else 0.0,
+            "mean_batch_size": self.counters["batched_values"] / self.counters["batches"] if self.counters["batches"] else 0.0,
+            "latency_p50": percentile(0.5),
+            "latency_p99": percentile(0.99),
+        })
+        return res
+
+
+class _LineReader(object):
+    """
+    Minimal StreamReader over a blocking text file -- lines are read in a thread so the event loop keeps running
+    """
+    def __init__(self, f: IO):
+        self.f = f
+
+    async def readline(self) -> bytes:
+        line = await asyncio.get_running_loop().run_in_executor(None, self.f.readline)
+        return line.encode("utf-8") if isinstance(line, str) else line
+
+class _LineWriter(object):
+    """
+    Minimal StreamWriter over a blocking text file
+    """
+    def __init__(self, f: IO):
+        self.f = f
+
+    def write(self, data: bytes):
+        self.f.write(data.decode("utf-8"))
+
+    async def drain(self):
+        self.f.flush()
+
+
+async def serve(host: str = "127.0.0.1", port: int = None, path: str = None, stdio: bool = False, **kwargs):
+    """
+    Runs a server until cancelled (or, with stdio, until stdin is closed)
+    ------
+    PARAMS
+    ------
+        1. 'host' -> TCP host
+        2. 'port' -> TCP port. The TCP transport is started if a port is given
+        3. 'path' -> Unix socket path. The Unix transport is started if a path is given
+        4. 'stdio' -> If true, serve stdin / stdout
+        5. 'kwargs' -> passed to Server (max_batch, max_delay, max_pending)
+    """
+    server = Server(**kwargs)
+    try:
+        if port is not None:
+            await server.start_tcp(host, port)
+        if path is not None:
+            await server.start_unix(path)
+        if stdio:
+            await server.serve_stdio()
+        elif server._servers:
+            await asyncio.gather(*(s.serve_forever() for s in server._servers))
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="fincheck JSON-lines server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--unix", default=None, help="Unix socket path")
+    parser.add_argument("--stdio", action="store_true", help="serve stdin / stdout")
+    parser.add_argument("--max-batch", type=int, default=1024)
+    parser.add_argument("--max-delay", type=float, default=0.002)
+    parser.add_argument("--max-pending", type=int, default=10_000)
+    args = parser.parse_args()
+    if args.port is None and args.unix is None and not args.stdio:
+        args.port = 8765
+    try:
+        asyncio.run(serve(
+            args.host, args.port, args.unix, args.stdio,
+            max_batch=args.max_batch, max_delay=args.max_delay, max_pending=args.max_pending
+        ))
+    except KeyboardInterrupt:
+        pass
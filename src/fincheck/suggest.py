@@ -0,0 +1,219 @@
+"""
+Near-miss corrections for mistyped CUSIPs, SEDOLs and ABA numbers
+
+A mistyped identifier usually has one wrong character or two swapped neighbours. Rather than trying every edit
+against the reference data, the check digit algebra narrows the edits down first:
+
+    > each position contributes table_i[c] (mod 10) to the weighted checksum, and a valid identifier sums to 0
+    > for an input summing to r, a substitution at position i must use a character contributing table_i[c_i] - r,
+      so only ~1/10th of the alphabet is tried per position (via precomputed contribution -> characters maps)
+    > a swap of positions i and i + 1 is kept only if it cancels r
+    > a character that is not allowed at its position (e.g. "?", or a letter as check digit) must be the one replaced
+
+This leaves a few dozen checksum-valid candidates (instead of ~300 edits), which are resolved against the known
+identifiers with plain membership tests -- a set, IdentifierSet, BloomFilter, the refdata index or any callable.
+
+Example Usage:
+
+    >>> from fincheck.suggest import suggest_corrections, CorrectionIndex
+    >>> suggest_corrections("037833109") #CUSIP, resolved against the reference data
+    ['037833100']
+    >>> suggest_corrections("073833100") #swapped characters
+    ['037833100']
+    >>> index = CorrectionIndex("SEDOL", known={"0263494", "B7TL820"})
+    >>> index.suggest("0263449")
+    [Suggestion(value='0263494', edit='transposition', position=5)]
+"""
+from typing import *
+from .checksum import _column_table, _CUSIP_TABLES, _SEDOL_TABLES
+from .validate import _ABA_TABLES
+from .utils import ALPHANUMERIC
+
+_CHECK_TABLE = _column_table(lambda v: v) #the check digit counts at face value
+_DIGITS = "0123456789"
+_CONFUSABLE = {frozenset(x) for x in ["0O", "0D", "0Q", "1I", "1L", "2Z", "5S", "6G", "8B"]}
+
+#type -> (contribution table per position, characters allowed per position). Valid iff all allowed and sum % 10 == 0
+SCHEMES = {
+    "CUSIP": (_CUSIP_TABLES + [_CHECK_TABLE], [ALPHANUMERIC] * 8 + [_DIGITS]),
+    "SEDOL": (_SEDOL_TABLES + [_CHECK_TABLE], [ALPHANUMERIC] * 6 + [_DIGITS]),
+    "ABA": (_ABA_TABLES, [_DIGITS] * 9),
+}
+
+
+def _inverse_tables(tables: List[bytes], allowed: List[str]) -> List[List[str]]:
+    """
+    Per position: contribution (0-9) -> the allowed characters with that contribution
+    """
+    inverse = []
+    for table, chars in zip(tables, allowed):
+        by_value = [""] * 10
+        for c in chars:
+            by_value[table[ord(c)]] += c
+        inverse.append(by_value)
+    return inverse
+
+_INVERSE = {t: _inverse_tables(tables, allowed) for t, (tables, allowed) in SCHEMES.items()}
+_ALLOWED = {t: [frozenset(chars) for chars in allowed] for t, (_, allowed) in SCHEMES.items()}
+
+
+class Suggestion(NamedTuple):
+    value: str
+    edit: str #"substitution" or "transposition"
+    position: int #0-based position of the substituted character, or of the first swapped character
+
+
+def _normalize(s: str) -> str:
+    return s.replace(" ", "").upper()
+
+def _edits(type_: str, s: str) -> List[Tuple[str, int]]:
+    """
+    Returns (candidate, position) for each checksum-valid edit of a normalized string.
+    Substitutions come first; the edit of a candidate is told apart by comparing it with s.
+    """
+    tables = SCHEMES[type_][0]
+    n = len(tables)
+    if len(s) != n or not s.isascii():
+        return []
+    allowed = _ALLOWED[type_]
+    inverse = _INVERSE[type_]
+    b = s.encode("ascii")
+    contributions = [tables[i][c] for i, c in enumerate(b)]
+    r = sum(contributions) % 10
+    bad = [i for i, c in enumerate(s) if c not in allowed[i]]
+    if len(bad) > 2:
+        return []
+
+    res = []
+    if len(bad) <= 1:
+        for i in bad or range(n):
+            head, tail, old = s[:i], s[i + 1:], s[i]
+            res.extend((head + c + tail, i) for c in inverse[i][(contributions[i] - r) % 10] if c != old)
+    for i in range(n - 1):
+        x, y = s[i], s[i + 1]
+        if x == y or y not in allowed[i] or x not in allowed[i + 1] or any(j != i and j != i + 1 for j in bad):
+            continue
+        if (r + tables[i][b[i + 1]] + tables[i + 1][b[i]] - contributions[i] - contributions[i + 1]) % 10 == 0:
+            res.append((s[:i] + y + x + s[i + 2:], i))
+    return res
+
+def _rank(s: str, edits: Iterable[Tuple[str, int]]) -> List[Suggestion]:
+    """
+    Builds Suggestions, likely typos (confusable characters such as 0/O, 1/I, 5/S) first
+    """
+    res = []
+    for value, i in edits:
+        if value[i + 1:] == s[i + 1:]:
+            res.append(Suggestion(value, "substitution", i))
+        else:
+            res.append(Suggestion(value, "transposition", i))
+    res.sort(key=lambda x: x.edit == "substitution" and frozenset(s[x.position] + x.value[x.position]) not in _CONFUSABLE)
+    return res
+
+def candidates(type_: str, s: str) -> List[Suggestion]:
+    """
+    Returns every checksum-valid identifier one substitution or one adjacent transposition away from s.
+    Likely typos (confusable characters such as 0/O, 1/I, 5/S) come first.
+    ------
+    PARAMS
+    ------
+        1. 'type_' -> "CUSIP", "SEDOL" or "ABA"
+        2. 's' -> possibly mistyped identifier. Spaces are removed and letters upper-cased first
+    """
+    type_ = type_.upper()
+    assert type_ in SCHEMES, f"'type_' must be one of {', '.join(SCHEMES)}"
+    s = _normalize(s)
+    return _rank(s, _edits(type_, s))
+
+
+class CorrectionIndex(object):
+    """
+    ----------------------------
+    Suggests known identifiers for mistyped ones
+    ----------------------------
+    Candidates come from the check digit algebra (see candidates()), so only a few dozen membership tests
+    are made per lookup, whatever the size of the known identifiers.
+    ----------------------------
+    """
+    def __init__(self, type_: str, known: Union[Container, Callable[[str], bool]]):
+        """
+        ------
+        PARAMS
+        ------
+            1. 'type_' -> "CUSIP", "SEDOL" or "ABA"
+            2. 'known' -> set, IdentifierSet, BloomFilter, dict or other container of known identifiers,
+                          or a callable returning True for known identifiers
+        """
+        type_ = type_.upper()
+        assert type_ in SCHEMES, f"'type_' must be one of {', '.join(SCHEMES)}"
+        self.type_ = type_
+        self.known = known
+        self._contains = known if callable(known) and not hasattr(known, "__contains__") else known.__contains__
+        self.lookups = 0
+        self.candidates = 0
+
+    @classmethod
+    def from_refdata(cls) -> "CorrectionIndex":
+        """
+        CUSIP index over the process-wide reference data. Lookups follow set_refdata / snapshot swaps.
+        """
+        from .data import get_refdata
+        return cls("CUSIP", lambda x: get_refdata().lookup_cusip(x) is not None)
+
+    def suggest(self, s: str, limit: int = None) -> List[Suggestion]:
+        """
+        Returns the known identifiers one substitution or transposition away from s, most likely first.
+        Returns an empty list if s is itself known.
+        ------
+        PARAMS
+        ------
+            1. 's' -> possibly mistyped identifier
+            2. 'limit' -> maximum number of suggestions. Defaults to all
+        """
+        self.lookups += 1
+        contains = self._contains
+        s = _normalize(s)
+        if contains(s):
+            return []
+        edits = _edits(self.type_, s)
+        self.candidates += len(edits)
+        res = _rank(s, [x for x in edits if contains(x[0])]) #only the hits become Suggestions
+        return res[:limit] if limit is not None else res
+
+    def suggest_many(self, values: Iterable[str], limit: int = None) -> List[List[Suggestion]]:
+        """
+        Bulk variant of suggest. Returns one list of suggestions per value.
+        """
+        return [self.suggest(s, limit) for s in values]
+
+    def stats(self) -> Dict:
+        return {
+            "type": self.type_,
+            "lookups": self.lookups,
+            "candidates": self.candidates,
+            "candidates_per_lookup": self.candidates / self.lookups if self.lookups else 0,
+        }
+
+
+_REFDATA_INDEX = None
+
+def suggest_corrections(s: str, type_: str = "CUSIP", known: Union[Container, Callable[[str], bool]] = None, limit: int = None) -> List[str]:
+    """
+    Returns known identifiers one substitution or adjacent transposition away from a mistyped one, most likely first
+    ------
+    PARAMS
+    ------
+        1. 's' -> possibly mistyped identifier
+        2. 'type_' -> "CUSIP", "SEDOL" or "ABA"
+        3. 'known' -> known identifiers (container or callable). Defaults to the reference data (CUSIPs only)
+        4. 'limit' -> maximum number of suggestions. Defaults to all
+    """
+    global _REFDATA_INDEX
+    if known is None:
+        assert type_.upper() == "CUSIP", "'known' is required for types other than CUSIP, which has reference data."
+        if _REFDATA_INDEX is None:
+            _REFDATA_INDEX = CorrectionIndex.from_refdata()
+        index = _REFDATA_INDEX
+    else:
+        index = CorrectionIndex(type_, known)
+    return [x.value for x in index.suggest(s, limit)]
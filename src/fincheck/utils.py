@@ -1,6 +1,10 @@
 from typing import *
-import pkg_resources
+import os
 import re
+import time
+from . import metrics
+
+ALPHANUMERIC = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ" #index of each character is its numeric value
 
 def keep_numeric(s: str) -> str:
     """
@@ -12,6 +16,9 @@ def keep_numeric(s: str) -> str:
     """
     return "".join(c for c in list(s) if c.isnumeric())
 
+_CHAR_VALUES = {c: value for value, c in enumerate(ALPHANUMERIC)}
+_CHAR_DIGITS = {ord(c): str(value) for value, c in enumerate(ALPHANUMERIC)}
+
 def convert_to_n(s: str, return_str: bool = True) -> Union[str, list]:
     """
     Converts a string into a sequence of digits
@@ -21,10 +28,13 @@ def convert_to_n(s: str, return_str: bool = True) -> Union[str, list]:
         1. 's' -> input string
         2. 'return_str' -> If true, returns a string of sequential digits, else returns a list of digits
     """
-    char_idxs = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    try:
+        values = [_CHAR_VALUES[c] for c in s]
+    except KeyError as e:
+        raise ValueError(f"Invalid character {e}. Characters must be 0-9 or A-Z.")
     if return_str:
-        return "".join(str(char_idxs.index(c)) for c in list(s))
-    return [char_idxs.index(c) for c in list(s)]
+        return s.translate(_CHAR_DIGITS)
+    return values
 
 def ensure_format(s: str, n_chars: int = None) -> str:
     """
@@ -55,30 +65,47 @@ def split_payload(s: str) -> Tuple[str, int]:
     check_digit = int(s[-1])
     return payload, check_digit
 
-def find_and_validate(s: str, pattern: str, validation_fn: Callable = None) -> List:
+def find_and_validate(s: Union[str, bytes, bytearray, memoryview], pattern: Union[str, bytes, re.Pattern], validation_fn: Callable = None) -> List:
     """
     Searches a string and returns every match of a regex pattern. 
     If validation_fn is specified, the matches are kept only if the function's criteria are met.
+    Bytes-like input is searched in place with a bytes pattern; only the matches are decoded (as UTF-8).
     ------
     PARAMS
     ------
-        1. 's' -> input string
-        2. 'pattern' -> regex pattern to search for
+        1. 's' -> input string or bytes-like buffer
+        2. 'pattern' -> regex pattern to search for (a bytes pattern for bytes-like input)
         3. 'validation_fn' -> function to call to validate matches. Defaults to None
                               - Note this function should return a boolean
     """
-    matches = [m for m in re.finditer(pattern, s)]
+    measure = metrics.ENABLED
+    if measure:
+        start = time.perf_counter()
+    matches = [m.group(0) for m in re.finditer(pattern, s)]
+    n_candidates = len(matches)
     if matches:
-        matches = [m.group(0) for m in matches]
+        if not isinstance(matches[0], str):
+            matches = [m.decode("utf-8", errors="replace") for m in matches]
         if validation_fn:
             matches = [m for m in matches if validation_fn(m)]
+    if measure:
+        label = getattr(validation_fn, "__name__", "none").replace("is_", "").upper() #e.g. is_cusip -> CUSIP
+        metrics.record_call(f"find_and_validate[{label}]", time.perf_counter() - start, candidates=n_candidates, accepted=len(matches))
+        if validation_fn:
+            metrics.record_identifiers(label, n_candidates, len(matches))
     return matches
 
+def resource_path(path: str) -> str:
+    """
+    Resolves a path relative to the fincheck package (e.g. "refdata/cusip/cusip_list.csv")
+    """
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), *path.split("/"))
+
 def read_csv(path: str, keep_headers: bool = False) -> List:
     """
     Reads a csv file by splitting by "\n" and then "," -- creating a 2d list
     """
-    path = pkg_resources.resource_filename(__name__, path)
+    path = resource_path(path)
     with open(path, "r") as f:
         data = f.read()
     data = data.split("\n")
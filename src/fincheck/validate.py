@@ -1,65 +1,83 @@
 from typing import *
-from .utils import split_payload
+from operator import not_
+from .utils import split_payload, ALPHANUMERIC
 from .checksum import luhn_check_digit, isin_check_digit, cusip_check_digit, sedol_check_digit
+from .checksum import _column_table, _add_columns, _weighted_check_digits, _isin_check_digits, _luhn_check_digits
+from .checksum import _CUSIP_TABLES, _SEDOL_TABLES
+from .bloom import filter_universe
+from .metrics import timed
 
-def is_luhn(s: str) -> bool:
+def is_luhn(s: str, universe: Container = None) -> bool:
     """
     Asserts a sequence of characters follows the Luhn Algorithm
     ------
     PARAMS
     ------
         1. 's' -> input string
+        2. 'universe' -> optional BloomFilter, set or other container. If given, the identifier must also be in it.
     """
     payload, check_digit = split_payload(s)
-    return luhn_check_digit(payload) == check_digit
+    return luhn_check_digit(payload) == check_digit and (universe is None or s in universe)
 
-def is_isin(s: str) -> bool:
+def is_isin(s: str, universe: Container = None) -> bool:
     """
     Validates if a string follows the ISIN checksum algorithm and ISIN format
     ------
     PARAMS
     ------
         1. 's' -> input string
+        2. 'universe' -> optional BloomFilter, set or other container. If given, the identifier must also be in it.
     """
     s = s.replace(" ", "")
     #ISINs are 12 characters long. First two chars are alpha (country code). Last is numerical (check digit)
     if len(s) == 12 and s[:2].isalpha() and s[-1].isnumeric():   
-        payload, check_digit = split_payload(s)
-        return isin_check_digit(payload) == check_digit
+        try:
+            payload, check_digit = split_payload(s)
+            return isin_check_digit(payload) == check_digit and (universe is None or s in universe)
+        except ValueError: #characters outside of 0-9 and A-Z
+            return False
     return False
 
 
 
-def is_cusip(s: str) -> bool:
+def is_cusip(s: str, universe: Container = None) -> bool:
     """
     Validates if a string follows the CUSIP check digit algorithm and CUSIP format
     ------
     PARAMS
     ------
         1. 's' -> input string
+        2. 'universe' -> optional BloomFilter, set or other container. If given, the identifier must also be in it.
     """
     s = s.replace(" ", "")
     if len(s) == 9 and s[-1].isnumeric(): #cusips are 9 characters long and last digit is numerical (Check digit)
-        payload, check_digit = split_payload(s)
-        return cusip_check_digit(payload) == check_digit
+        try:
+            payload, check_digit = split_payload(s)
+            return cusip_check_digit(payload) == check_digit and (universe is None or s in universe)
+        except ValueError: #characters outside of 0-9 and A-Z
+            return False
     return False
 
-def is_sedol(s: str) -> bool:
+def is_sedol(s: str, universe: Container = None) -> bool:
     """
     Determines whether a string follows the SEDOL check digit algorithm and SEDOL format
     ------
     PARAMS
     ------
         1. 's' -> input string
+        2. 'universe' -> optional BloomFilter, set or other container. If given, the identifier must also be in it.
     """
     s = s.replace(" ", "")
     if len(s) == 7 and s[-1].isnumeric():
-        payload, check_digit = split_payload(s)
-        return sedol_check_digit(payload) == check_digit
+        try:
+            payload, check_digit = split_payload(s)
+            return sedol_check_digit(payload) == check_digit and (universe is None or s in universe)
+        except ValueError: #characters outside of 0-9 and A-Z
+            return False
     return False
 
 
-def is_aba(s: str) -> bool:
+def is_aba(s: str, universe: Container = None) -> bool:
     """
     Determines whether a sequence of characters is an ABA Number
 
@@ -75,11 +93,198 @@ def is_aba(s: str) -> bool:
     PARAMS
     ------
         1. 's' -> input string
+        2. 'universe' -> optional BloomFilter, set or other container. If given, the identifier must also be in it.
     """
     s = s.replace(" ", "")
     if len(s) == 9 and s.isnumeric(): #ABA Numbers are 9 digits long
-        s = [int(n) for n in list(s)]
-        if ((3 * (s[0] + s[3] + s[6])) + (7 * (s[1] + s[4] + s[7])) + (s[2] + s[5] + s[8])) % 10 == 0:
-            return True
+        digits = [int(n) for n in list(s)]
+        if ((3 * (digits[0] + digits[3] + digits[6])) + (7 * (digits[1] + digits[4] + digits[7])) + (digits[2] + digits[5] + digits[8])) % 10 == 0:
+            return universe is None or s in universe
     return False
 
+
+
+#---------------------------------------------
+# Bulk validation
+#---------------------------------------------
+# The *_many functions return a boolean mask with one entry per input string.
+# Rows of the right length are stacked into one contiguous bytes matrix and screened a column at a time with
+# 256-entry translation tables (0 = allowed character, 1 = not allowed), then checksummed column-wise as well.
+# Columns are combined with big integer arithmetic (see checksum._add_columns), so no Python code runs per row.
+# Rows containing non-ASCII characters are rare and fall back to the single-value validators.
+
+def _allowed_table(chars: str) -> bytes:
+    return bytes(0 if chr(i) in chars else 1 for i in range(256))
+
+_DIGITS = "0123456789"
+_LETTERS = ALPHANUMERIC[10:]
+_ANY_ALNUM = _allowed_table(ALPHANUMERIC)
+_ANY_DIGIT = _allowed_table(_DIGITS)
+_ANY_LETTER = _allowed_table(_LETTERS)
+_DIGIT_VALUES = bytes(ord(chr(i)) - 48 if chr(i) in _DIGITS else 255 for i in range(256))
+_ABA_TABLES = [_column_table(lambda v, w=w: v * w) for w in [3, 7, 1, 3, 7, 1, 3, 7, 1]]
+
+def _prepare(values: Iterable[str], clean: bool) -> List[str]:
+    values = list(values)
+    if clean and " " in "".join(values):
+        values = [v.replace(" ", "") for v in values]
+    return values
+
+def _screen(values: List[str], mask: List[bool], n_chars: int, allowed: List[bytes], fallback_fn: Callable) -> Tuple[List[int], List[str], List[bytes], bytes]:
+    """
+    Selects rows of n_chars characters and screens each column against its allowed characters
+    --------
+    Returns:
+        > indices of the screened rows, the rows, the columns of their matrix,
+          and a per-row flag that is non-zero if a character is not allowed
+    --------
+    """
+    if all(len(v) == n_chars for v in values):
+        idx, rows = range(len(values)), values #common case -- every row has the right length
+    else:
+        idx = [i for i, v in enumerate(values) if len(v) == n_chars]
+        rows = [values[i] for i in idx]
+    blob = "".join(rows)
+    if not blob.isascii():
+        ascii_idx = []
+        for i in idx:
+            if values[i].isascii():
+                ascii_idx.append(i)
+            else:
+                try:
+                    mask[i] = fallback_fn(values[i])
+                except ValueError:
+                    mask[i] = False
+        idx = ascii_idx
+        rows = [values[i] for i in idx]
+        blob = "".join(rows)
+    matrix = blob.encode("ascii")
+    columns = [matrix[i::n_chars] for i in range(n_chars)]
+    invalid = _add_columns([col.translate(table) for col, table in zip(columns, allowed)])
+    return idx, rows, columns, invalid
+
+def _fill_mask(mask: List[bool], idx: Sequence[int], invalid: bytes, check_digits: bytes, expected: bytes) -> List[bool]:
+    """
+    Sets mask[i] for each screened row: True if every character is allowed and the check digit matches
+    """
+    mismatch = int.from_bytes(invalid, "big") | (int.from_bytes(check_digits, "big") ^ int.from_bytes(expected, "big"))
+    ok = map(not_, mismatch.to_bytes(len(invalid), "big")) #a zero byte means the row is valid
+    if len(idx) == len(mask):
+        mask[:] = ok
+    else:
+        for i, x in zip(idx, ok):
+            mask[i] = x
+    return mask
+
+def _restrict(values: List[str], mask: List[bool], universe: Container) -> List[bool]:
+    return mask if universe is None else filter_universe(values, mask, universe)
+
+def _fixed_width_mask(values: Iterable[str], clean: bool, allowed: List[bytes], tables: List[bytes], fallback_fn: Callable, universe: Container) -> List[bool]:
+    values = _prepare(values, clean)
+    mask = [False] * len(values)
+    idx, _, columns, invalid = _screen(values, mask, len(allowed), allowed, fallback_fn)
+    check_digits = _weighted_check_digits(columns[:-1], tables)
+    return _restrict(values, _fill_mask(mask, idx, invalid, check_digits, columns[-1].translate(_DIGIT_VALUES)), universe)
+
+@timed()
+def is_cusip_many(values: Iterable[str], clean: bool = True, universe: Container = None) -> List[bool]:
+    """
+    Bulk variant of is_cusip. Returns a boolean mask with one entry per input string.
+    ------
+    PARAMS
+    ------
+        1. 'values' -> list, array or iterable of strings
+        2. 'clean' -> If true, spaces are removed first. Pass False for pre-cleaned input to skip this step.
+        3. 'universe' -> optional BloomFilter, set or other container. If given, valid identifiers must also be in it.
+    """
+    allowed = [_ANY_ALNUM] * 8 + [_ANY_DIGIT]
+    return _fixed_width_mask(values, clean, allowed, _CUSIP_TABLES, is_cusip, universe)
+
+@timed()
+def is_sedol_many(values: Iterable[str], clean: bool = True, universe: Container = None) -> List[bool]:
+    """
+    Bulk variant of is_sedol. Returns a boolean mask with one entry per input string.
+    ------
+    PARAMS
+    ------
+        1. 'values' -> list, array or iterable of strings
+        2. 'clean' -> If true, spaces are removed first. Pass False for pre-cleaned input to skip this step.
+        3. 'universe' -> optional BloomFilter, set or other container. If given, valid identifiers must also be in it.
+    """
+    allowed = [_ANY_ALNUM] * 6 + [_ANY_DIGIT]
+    return _fixed_width_mask(values, clean, allowed, _SEDOL_TABLES, is_sedol, universe)
+
+@timed()
+def is_isin_many(values: Iterable[str], clean: bool = True, universe: Container = None) -> List[bool]:
+    """
+    Bulk variant of is_isin. Returns a boolean mask with one entry per input string.
+    ------
+    PARAMS
+    ------
+        1. 'values' -> list, array or iterable of strings
+        2. 'clean' -> If true, spaces are removed first. Pass False for pre-cleaned input to skip this step.
+        3. 'universe' -> optional BloomFilter, set or other container. If given, valid identifiers must also be in it.
+    """
+    values = _prepare(values, clean)
+    mask = [False] * len(values)
+    allowed = [_ANY_LETTER] * 2 + [_ANY_ALNUM] * 9 + [_ANY_DIGIT]
+    idx, rows, columns, invalid = _screen(values, mask, 12, allowed, is_isin)
+    if invalid.count(0) < len(invalid): #replace rows with disallowed characters so they can be checksummed safely
+        rows = [r if not bad else "AA0000000000" for r, bad in zip(rows, invalid)]
+    check_digits = _isin_check_digits(r[:-1] for r in rows)
+    return _restrict(values, _fill_mask(mask, idx, invalid, check_digits, columns[-1].translate(_DIGIT_VALUES)), universe)
+
+@timed()
+def is_aba_many(values: Iterable[str], clean: bool = True, universe: Container = None) -> List[bool]:
+    """
+    Bulk variant of is_aba. Returns a boolean mask with one entry per input string.
+    ------
+    PARAMS
+    ------
+        1. 'values' -> list, array or iterable of strings
+        2. 'clean' -> If true, spaces are removed first. Pass False for pre-cleaned input to skip this step.
+        3. 'universe' -> optional BloomFilter, set or other container. If given, valid identifiers must also be in it.
+    """
+    values = _prepare(values, clean)
+    mask = [False] * len(values)
+    idx, _, columns, invalid = _screen(values, mask, 9, [_ANY_DIGIT] * 9, is_aba)
+    #weighted sum mod 10 must be 0, i.e. the "check digit" of all 9 weighted columns is 0
+    check_digits = _weighted_check_digits(columns, _ABA_TABLES)
+    return _restrict(values, _fill_mask(mask, idx, invalid, check_digits, bytes(len(check_digits))), universe)
+
+@timed()
+def is_luhn_many(values: Iterable[str], clean: bool = True, universe: Container = None) -> List[bool]:
+    """
+    Bulk variant of is_luhn. Returns a boolean mask with one entry per input string.
+    ------
+    PARAMS
+    ------
+        1. 'values' -> list, array or iterable of strings
+        2. 'clean' -> If true, spaces are removed first. Pass False for pre-cleaned input to skip this step.
+        3. 'universe' -> optional BloomFilter, set or other container. If given, valid identifiers must also be in it.
+    """
+    values = _prepare(values, clean)
+    mask = [False] * len(values)
+    idx = []
+    for i, v in enumerate(values):
+        if v.isascii() and v.isdigit():
+            idx.append(i)
+        else:
+            try:
+                mask[i] = is_luhn(v)
+            except (ValueError, IndexError):
+                mask[i] = False
+    payloads = [values[i][:-1].encode("ascii") for i in idx]
+    for i, c in zip(idx, _luhn_check_digits(payloads)):
+        mask[i] = c == ord(values[i][-1]) - 48
+    return _restrict(values, mask, universe)
+
+
+#type -> bulk validator, for callers that dispatch on an identifier type (cli, server, columns)
+BULK_VALIDATORS = {
+    "CUSIP": is_cusip_many,
+    "ISIN": is_isin_many,
+    "SEDOL": is_sedol_many,
+    "ABA": is_aba_many,
+    "LUHN": is_luhn_many,
+}
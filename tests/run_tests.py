@@ -16,6 +16,10 @@ def run_validation_test(data: List, answers: List, validation_fn: Callable):
     for x, y in list(zip(data, answers)):
         assert str(validation_fn(x)) == y
 
+def run_bulk_validation_test(data: List, answers: List, validation_fn: Callable):
+    assert [str(x) for x in validation_fn(data)] == answers[:len(data)]
+    assert validation_fn(data, clean=False) == validation_fn([x.replace(" ", "") for x in data])
+
 def run_extraction_test(s: str, answers: str):
     parsing_dict = {
         "ABA": fincheck.extract.get_abas,
@@ -46,6 +50,67 @@ def test_abas():
     answers = txt2list("Data/abas_answers.txt")
     run_validation_test(data, answers, fincheck.validate.is_aba)
 
+def test_bulk_validation():
+    tests = [
+        ("Data/cusips.txt", fincheck.validate.is_cusip_many),
+        ("Data/sedols.txt", fincheck.validate.is_sedol_many),
+        ("Data/isins.txt", fincheck.validate.is_isin_many),
+        ("Data/abas.txt", fincheck.validate.is_aba_many)
+        ]
+    for fi, fn in tests:
+        run_bulk_validation_test(txt2list(fi), txt2list(fi.replace(".txt", "_answers.txt")), fn)
+    assert fincheck.validate.is_cusip_many(["30303m102", "30303M102", "30303M10", "3030éM102"]) == [False, True, False, False]
+    assert fincheck.validate.is_luhn_many(["79927398713", "7992 7398 713", "79927398710", ""]) == [True, True, False, False]
+
+def test_bulk_matches_single():
+    import random
+    from fincheck.utils import ALPHANUMERIC
+    rng = random.Random(7)
+    v, c = fincheck.validate, fincheck.checksum
+    def noisy(n):
+        s = "".join(rng.choice(ALPHANUMERIC) for _ in range(n))
+        r = rng.random()
+        if r < 0.1:
+            s = s[:rng.randrange(n)] + " " + s[rng.randrange(n):] #inner space, possibly wrong length
+        elif r < 0.2:
+            s = s[:-1] #wrong length
+        elif r < 0.25:
+            s = s.lower()
+        elif r < 0.3:
+            s = s[:-1] + "é"
+        return s
+    isins = []
+    for _ in range(2000): #valid ISINs with letters in the NSIN, and mutations of them
+        payload = "".join(rng.choice(ALPHANUMERIC[10:]) for _ in range(2)) + "".join(rng.choice(ALPHANUMERIC) for _ in range(9))
+        isin = payload + str(c.isin_check_digit(payload))
+        isins.append(isin if rng.random() < 0.5 else isin[:4] + " " + isin[4:] if rng.random() < 0.3 else noisy(12))
+    cases = [
+        (v.is_isin_many, v.is_isin, isins),
+        (v.is_cusip_many, v.is_cusip, [noisy(9) for _ in range(2000)]),
+        (v.is_sedol_many, v.is_sedol, [noisy(7) for _ in range(2000)]),
+        (v.is_aba_many, v.is_aba, ["".join(rng.choice("0123456789") for _ in range(rng.choice([8, 9, 9, 10]))) for _ in range(2000)]),
+        (v.is_luhn_many, v.is_luhn, [rng.choice("123456789") + "".join(rng.choice("0123456789 ") for _ in range(rng.randrange(0, 15))) + rng.choice("0123456789") for _ in range(2000)]),
+    ]
+    for many_fn, fn, values in cases:
+        assert many_fn(values) == [fn(x) for x in values], many_fn.__name__
+    for many_fn, fn, n in [(c.isin_check_digits, c.isin_check_digit, 11), (c.cusip_check_digits, c.cusip_check_digit, 8), (c.sedol_check_digits, c.sedol_check_digit, 6)]:
+        payloads = [x[:n] for x in isins if x[:n].isalnum() and x[:n].isascii() and x[:n].isupper()] if n == 11 else \
+            ["".join(rng.choice(ALPHANUMERIC) for _ in range(n)) for _ in range(2000)]
+        payloads += [payloads[0][:3] + " " + payloads[0][3:]] #spaces are cleaned
+        assert many_fn(payloads) == [fn(x) for x in payloads], many_fn.__name__
+        for bad in [payloads[0][:-1], payloads[0][:-1] + "a"]: #wrong length / bad character fail like the single function
+            try:
+                many_fn(payloads + [bad])
+                assert False, "Expected an error"
+            except (ValueError, AssertionError) as e:
+                try:
+                    fn(bad)
+                    assert False, "Expected an error"
+                except type(e):
+                    pass
+    payloads = ["1234", "\u0661\u0662\u0663\u0664", "12\u0663\u0664", "7992739871"] #non-ASCII digits are normalized by both
+    assert c.luhn_check_digits(payloads) == [c.luhn_check_digit(x) for x in payloads] == [4, 4, 4, 3]
+
 def test_extraction():
     template = "extract{}.txt"
     answers_template = "extract{}_answers.txt"
@@ -59,6 +124,400 @@ def test_extraction():
                 y = literal_eval(f.read())
             run_extraction_test(x, y)
 
+def test_single_pass_extraction():
+    include = ["ABA", "CUSIP", "ISIN", "SEDOL"]
+    for fi in sorted(listdir("Data/extraction")):
+        m = re.search(r"extract(\d)\.txt", fi)
+        if m:
+            with open(f"Data/extraction/{fi}") as f:
+                x = f.read()
+            with open(f"Data/extraction/extract{m.group(1)}_answers.txt") as f:
+                y = literal_eval(f.read())
+            assert fincheck.extract.find_securities(x, include=include) == {k: y[k] for k in include}
+            spans = fincheck.extract.Extractor(include=include).scan(x)
+            assert all(x[start:end] == value for _, value, start, end in spans)
+
+def test_stream_extraction():
+    from io import StringIO
+    include = ["ABA", "CUSIP", "ISIN", "SEDOL"]
+    for fi in sorted(listdir("Data/extraction")):
+        if re.search(r"extract(\d)\.txt", fi):
+            with open(f"Data/extraction/{fi}") as f:
+                x = f.read()
+            expected = fincheck.extract.Extractor(include).scan(x)
+            for chunk_size in [1, 7, 64, 1 << 20]:
+                assert list(fincheck.extract.iter_securities(StringIO(x), include, chunk_size=chunk_size)) == expected
+    chunks = ["id: 0231", "35106 and 02313510", "6", "X" * 50, "023135106"]
+    assert [x[2:] for x in fincheck.extract.iter_securities(chunks)] == [(4, 13)]
+
+def test_bytes_extraction():
+    from fincheck.extract import Extractor, scan_file
+    include = ["ABA", "CUSIP", "ISIN", "SEDOL"]
+    extractor = Extractor(include)
+    for fi in sorted(listdir("Data/extraction")):
+        if re.search(r"extract(\d)\.txt", fi):
+            with open(f"Data/extraction/{fi}", "rb") as f:
+                b = f.read()
+            res = scan_file(f"Data/extraction/{fi}", include)
+            assert res == extractor.scan(b) == extractor.scan(memoryview(bytearray(b)))
+            assert [x[:2] for x in res] == [x[:2] for x in extractor.scan(b.decode("utf-8"))]
+            assert all(b[start:end].decode() == value for _, value, start, end in res)
+    text = "é M0392N101 éM0392N101 — US9129091081 2007849é"
+    b = text.encode("utf-8")
+    assert fincheck.extract.find_securities(b) == fincheck.extract.find_securities(text) == {"CUSIP": ["M0392N101"], "ISIN": ["US9129091081"], "SEDOL": []}
+    assert [x[2:] for x in extractor.scan(b)] == [(3, 12), (29, 41)]
+    assert fincheck.extract.get_cusips(bytearray(b)) == ["M0392N101"] and fincheck.extract.get_isins(memoryview(b)) == ["US9129091081"]
+    assert fincheck.utils.find_and_validate(b, re.compile(rb"\d{7}"), fincheck.validate.is_sedol) == ["2007849"]
+    #non-ASCII digits are not identifier characters, in text as in bytes
+    text = "routing \u0660\u0661\u0661\u0661\u0660\u0663\u0660\u0669\u0663 and 011103093, \u0661011103093 \u0661\u0662 011103093\u0661"
+    b = text.encode("utf-8")
+    res = extractor.scan(text)
+    assert [x[:2] for x in res] == [x[:2] for x in extractor.scan(b)] == [("ABA", "011103093")]
+    text = "routing \u0660\u0661\u0661\u0660\u0660\u0660\u0660\u0661\u0665 and 011000015"
+    assert fincheck.extract.get_abas(text) == fincheck.extract.find_securities(text, include=["ABA"])["ABA"] == ["011000015"]
+    assert [(start, end) for _, _, start, end in res] == [(len(b[:start].decode()), len(b[:end].decode())) for _, _, start, end in extractor.scan(b)]
+
+def test_match_records():
+    from fincheck.extract import Match, find_matches, collapse_matches
+    s = "Wire to routing number 021000021. CUSIP 991000258 and M0392N101, again M0392N101"
+    matches = find_matches(s)
+    assert [(m.type, m.value, m.start, m.end, m.ambiguous) for m in matches] == [
+        ("CUSIP", "021000021", 23, 32, True), ("ABA", "021000021", 23, 32, True),
+        ("CUSIP", "991000258", 40, 49, True), ("ABA", "991000258", 40, 49, True),
+        ("CUSIP", "M0392N101", 54, 63, False), ("CUSIP", "M0392N101", 71, 80, False)
+    ]
+    assert matches[1].confidence > matches[0].confidence and matches[2].confidence > matches[3].confidence #context and routing symbol
+    assert all(abs(matches[i].confidence + matches[i + 1].confidence - 1) < 0.01 for i in [0, 2]) and matches[4].confidence == 1.0
+    best = find_matches(s, resolve="best")
+    assert [(m.type, m.value) for m in best] == [("ABA", "021000021"), ("CUSIP", "991000258"), ("CUSIP", "M0392N101"), ("CUSIP", "M0392N101")]
+    assert find_matches(s.encode("utf-8"), resolve="best") == best
+    groups = find_matches(s, resolve="best", collapse=True)
+    assert [(g.type, g.value, g.count, g.spans) for g in groups][-1] == ("CUSIP", "M0392N101", 2, [(54, 63), (71, 80)])
+    assert collapse_matches(best) == groups
+    assert [m[:4] for m in fincheck.extract.Extractor(["CUSIP", "ABA"]).matches(s)] == [m[:4] for m in matches]
+
+def test_corpus_extraction():
+    from fincheck.corpus import extract_corpus
+    docs = {}
+    for fi in sorted(listdir("Data/extraction")):
+        if re.search(r"extract(\d)\.txt", fi):
+            with open(f"Data/extraction/{fi}") as f:
+                docs[fi] = f.read()
+    expected = {k: fincheck.extract.find_securities(v) for k, v in docs.items()}
+    stats = {}
+    assert list(extract_corpus(docs, workers=2, batch_size=1, stats=stats)) == list(expected.items())
+    assert stats["docs"] == len(docs) and stats["chars"] == sum(map(len, docs.values()))
+    paths = [f"Data/extraction/{k}" for k in docs]
+    res = dict(extract_corpus(paths, workers=1, paths=True, ordered=False))
+    assert res == {f"Data/extraction/{k}": v for k, v in expected.items()}
+    #bad arguments raise when extract_corpus is called, not when the results are first iterated
+    for kwargs in [{"include": ["FOO"]}, {"workers": -1}, {"batch_size": 0}, {"docs": "M0392N101"}]:
+        try:
+            extract_corpus(**dict({"docs": list(docs.values())}, **kwargs))
+            raised = False
+        except AssertionError:
+            raised = True
+        assert raised, kwargs
+
+def test_known_extraction():
+    from fincheck.known import KnownMatcher, find_known_securities
+    s = "Bought 98986X109, 98986x109 and 023135106X; sold AAPL (037833100)"
+    assert find_known_securities(s) == [("98986X109", ("CUSIP", "98986X109"), 7, 16), ("037833100", ("CUSIP", "037833100"), 55, 64)]
+    matcher = KnownMatcher({"he": 1, "she": 2, "hers": 3, "AAPL": 4}, whole_words=False)
+    assert [x[0] for x in matcher.finditer("ushers AAPL")] == ["she", "he", "hers", "AAPL"]
+    matcher = KnownMatcher(["AAPL", "MSFT"], ignore_case=True)
+    assert [x[2:] for x in matcher.finditer("aapl, Msft and AAPLX")] == [(0, 4), (6, 10)]
+    assert "msft" in matcher and len(matcher) == 2
+    matcher = KnownMatcher.from_refdata(cusips=False, isins=True, tickers=True)
+    assert matcher.findall("US0378331005 ZYNE") == ["US0378331005", "ZYNE"]
+
+def test_bloom_universe():
+    from tempfile import TemporaryDirectory
+    from os.path import join
+    from fincheck.bloom import BloomFilter
+    ids = ["98986X109", "037833100", "US0378331005", "2007849"]
+    bloom = BloomFilter.from_iterable(ids, fp_rate=0.001)
+    assert all(x in bloom for x in ids) and len(bloom) == 4
+    assert fincheck.validate.is_cusip_many(["98986X109", "023135106", "98986X108"], universe=bloom) == [True, False, False]
+    assert fincheck.validate.is_isin("US0378331005", universe=bloom) and not fincheck.validate.is_cusip("023135106", universe=set(ids))
+    s = "98986X109 023135106 US0378331005 US9129091081 2007849"
+    assert fincheck.extract.find_securities(s, universe=bloom) == {"CUSIP": ["98986X109"], "ISIN": ["US0378331005"], "SEDOL": ["2007849"]}
+    assert [x[1] for x in fincheck.extract.iter_securities(s, chunk_size=5, universe=set(ids))] == ["98986X109", "US0378331005", "2007849"]
+    with TemporaryDirectory() as tmp:
+        bloom = BloomFilter.from_refdata(fp_rate=0.01, countries=["US"], confirm=True)
+        loaded = BloomFilter.load(bloom.save(join(tmp, "refdata.bloom")), exact=bloom.exact)
+        try:
+            assert loaded.stats() == bloom.stats()
+            assert "98986X109" in loaded and "US0378331005" in loaded and "CA0378331005" not in loaded
+            assert not bloom.exact("US0378331004") #known cusip, wrong isin check digit
+            #with exact confirmation there are no false positives
+            probe = [f"{i:06d}10{i % 10}" for i in range(0, 10 ** 6, 97)]
+            known = fincheck.data.RefData().cusips
+            assert loaded.contains_many(probe) == [x in known for x in probe]
+        finally:
+            loaded.close()
+
+def test_packed_identifiers():
+    from fincheck.packed import encode, decode, IdentifierSet, IdentifierMap
+    ids = txt2list("Data/cusips.txt") + txt2list("Data/isins.txt") + txt2list("Data/sedols.txt")
+    ids = [x for x in ids if len(x) <= 12 and x.isascii() and x.isalnum() and x.upper() == x]
+    assert [decode(encode(x)) for x in ids] == ids
+    assert encode("001") != encode("0001") and encode("ZZZZZZZZZZZZ") < 2 ** 63
+    for bad in ["abc", "ABC-1", "1234567890123", "ÉCU"]:
+        try:
+            encode(bad)
+            assert False, bad
+        except ValueError:
+            pass
+    today = IdentifierSet(["037833100", "98986X109", "594918104", "037833100"])
+    yesterday = IdentifierSet(["037833100", "931142103"])
+    assert len(today) == 3 and "98986X109" in today and "98986x109" not in today
+    assert list(today - yesterday) == ["594918104", "98986X109"] and list(today & yesterday) == ["037833100"]
+    assert list(today | yesterday) == sorted(set(today) | set(yesterday), key=encode)
+    assert list(today ^ yesterday) == sorted(set(today) ^ set(yesterday), key=encode)
+    a, b = IdentifierSet(ids[::2]), IdentifierSet(ids[::3])
+    for x in [a | b, a ^ b, b ^ a, a | IdentifierSet(), IdentifierSet() ^ b]:
+        assert list(x.packed) == sorted(set(x.packed)) #sorted and duplicate-free
+    assert set(a | b) == set(ids[::2]) | set(ids[::3]) and set(a ^ b) == set(ids[::2]) ^ set(ids[::3])
+    assert IdentifierSet(["037833100"]) <= today and IdentifierSet.from_bytes(today.to_bytes()) == today
+    assert fincheck.validate.is_cusip_many(["98986X109", "023135106"], universe=today) == [True, False]
+    names = IdentifierMap({"037833100": "APPLE INC", "98986X109": "ZYNERBA PHARMACEUTICALS INC"})
+    tickers = IdentifierMap([("037833100", "AAPL"), ("594918104", "MSFT")])
+    assert names["037833100"] == "APPLE INC" and names.get("594918104") is None
+    assert list(names.join(tickers)) == [("037833100", "APPLE INC", "AAPL")]
+    assert list(names.join(tickers, how="left"))[1] == ("98986X109", "ZYNERBA PHARMACEUTICALS INC", None)
+    assert len(list(names.join(tickers, how="outer"))) == 3
+
+def test_server():
+    import asyncio
+    import json
+    import time
+    from io import StringIO
+    from fincheck.server import Server
+    cusips = txt2list("Data/cusips.txt")
+    expected = fincheck.validate.is_cusip_many(cusips)
+    async def client(port: int) -> List[Dict]:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        for i, x in enumerate(cusips):
+            writer.write((json.dumps({"id": i, "op": "validate", "type": "CUSIP", "value": x}) + "\n").encode())
+        writer.write(b'{"op": "check_digit", "type": "SEDOL", "values": ["B7TL82", "200784"]}\n')
+        writer.write(b'{"op": "extract", "text": "M0392N101 and 011103093", "include": ["CUSIP", "ABA"]}\n')
+        writer.write(b'{"op": "check_digit", "type": "CUSIP", "value": "ab-"}\nnot json\n')
+        await writer.drain()
+        res = [json.loads(await reader.readline()) for _ in range(len(cusips) + 4)]
+        writer.close()
+        return res
+    async def main() -> Tuple[List, Dict]:
+        server = Server(max_pending=16)
+        try:
+            port = (await server.start_tcp("127.0.0.1", 0)).sockets[0].getsockname()[1]
+            res = await asyncio.gather(*(client(port) for _ in range(4)))
+            return res, server.stats()
+        finally:
+            await server.close()
+    res, stats = asyncio.run(main())
+    for r in res:
+        assert [x["result"] for x in r[:len(cusips)]] == expected and [x["id"] for x in r[:len(cusips)]] == list(range(len(cusips)))
+        assert r[-4]["result"] == [0, 9] and r[-3]["result"] == {"CUSIP": ["M0392N101"], "ABA": ["011103093"]}
+        assert "error" in r[-2] and "error" in r[-1]
+    assert stats["requests"] == 4 * (len(cusips) + 4) and stats["errors"] == 8
+    assert stats["batches"] < stats["requests"] #requests were coalesced
+    stdout = StringIO()
+    asyncio.run(Server().serve_stdio(StringIO('{"id": "a", "op": "validate", "type": "ISIN", "values": ["US0378331005", "x"]}\n'), stdout))
+    assert json.loads(stdout.getvalue()) == {"id": "a", "result": [True, False]}
+    #batches run off the event loop, and a failing batch fails its requests without stopping the batcher
+    import fincheck.server as server_module
+    batch_fn = server_module._batch_fn
+    def slow_or_broken(key: Tuple) -> Callable[[List], List]:
+        if key[1] == "SEDOL":
+            raise RuntimeError("broken batch")
+        fn = batch_fn(key)
+        def slow(values: List) -> List:
+            time.sleep(0.2)
+            return fn(values)
+        return slow
+    async def concurrent() -> Tuple[List, int]:
+        server = Server()
+        ticks = 0
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+        ticker = asyncio.ensure_future(tick())
+        try:
+            res = await asyncio.gather(
+                server.handle({"op": "validate", "type": "CUSIP", "value": "037833100"}),
+                server.handle({"op": "validate", "type": "SEDOL", "value": "2007849"}),
+                return_exceptions=True,
+            )
+            res.append(await server.handle({"op": "check_digit", "type": "CUSIP", "value": "03783310"}))
+            return res, ticks
+        finally:
+            ticker.cancel()
+            await server.close()
+    server_module._batch_fn = slow_or_broken
+    try:
+        res, ticks = asyncio.run(concurrent())
+    finally:
+        server_module._batch_fn = batch_fn
+    assert res[0] is True and isinstance(res[1], RuntimeError) and res[2] == 0
+    #a client that stops reading and disconnects mid-stream does not leave its connection handler waiting
+    import socket
+    async def disconnecting_client() -> Dict:
+        server = Server(max_pending=4)
+        finished = asyncio.Event()
+        async def handler(reader, writer):
+            writer.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+            writer.transport.set_write_buffer_limits(high=1024)
+            try:
+                await server._serve_connection(reader, writer)
+            finally:
+                finished.set()
+        tcp = await asyncio.start_server(handler, "127.0.0.1", 0)
+        try:
+            sock = socket.socket()
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+            sock.connect(tcp.sockets[0].getsockname())
+            reader, writer = await asyncio.open_connection(sock=sock)
+            request = json.dumps({"op": "extract", "text": "037833100 " * 500, "include": ["CUSIP"]}) + "\n"
+            for _ in range(200):
+                writer.write(request.encode())
+            await asyncio.sleep(0.5) #the server is now blocked writing responses nobody reads
+            writer.transport.abort()
+            await asyncio.wait_for(finished.wait(), 5)
+            return server.stats()
+        finally:
+            tcp.close()
+            await server.close()
+    assert asyncio.run(disconnecting_client())["requests"] > 4
+    assert ticks >= 10, ticks #the loop kept running during the 0.4s of batches
+
+def test_cli():
+    import csv
+    import json
+    import os
+    import subprocess
+    import sys
+    from os.path import dirname, join
+    from tempfile import TemporaryDirectory
+    from fincheck.cli import main
+    cusips = txt2list("Data/cusips.txt")
+    with TemporaryDirectory() as tmp:
+        out = join(tmp, "out.csv")
+        assert main(["validate", "-t", "cusip", "Data/cusips.txt", "-o", out, "-q", "--chunk-size", "5"]) == 0
+        with open(out) as f:
+            rows = list(csv.reader(f))
+        assert rows[0] == ["value", "is_valid"] and rows[1:] == [[x, str(y)] for x, y in zip(cusips, fincheck.validate.is_cusip_many(cusips))]
+        out = join(tmp, "out.jsonl")
+        files = ["Data/extraction/extract1.txt", "Data/extraction/extract2.txt"]
+        assert main(["extract", "-i", "CUSIP", "ABA", "-f", "jsonl", "-w", "2", "-o", out, "-q"] + files) == 0
+        with open(out) as f:
+            rows = [json.loads(line) for line in f]
+        expected = []
+        for fi in files:
+            with open(fi) as f:
+                expected.extend((fi, x[1]) for x in fincheck.extract.Extractor(["CUSIP", "ABA"]).scan(f.read()))
+        assert [(r["source"], r["value"]) for r in rows] == expected
+        #files cut into tiny segments over workers, and streamed in tiny chunks by one worker, give the same rows
+        import fincheck.cli as cli
+        buffer_size, cli.BUFFER_SIZE = cli.BUFFER_SIZE, 16
+        try:
+            for args in (["-w", "2"], ["--chunk-size", "2"]):
+                assert main(["extract", "-i", "CUSIP", "ABA", "-f", "jsonl", "-o", out, "-q"] + args + files) == 0
+                with open(out) as f:
+                    assert [json.loads(line) for line in f] == rows
+        finally:
+            cli.BUFFER_SIZE = buffer_size
+        env = dict(os.environ, PYTHONPATH=dirname(dirname(fincheck.__file__)))
+        res = subprocess.run(
+            [sys.executable, "-m", "fincheck", "check-digit", "-t", "SEDOL", "-f", "jsonl"],
+            input="B7TL82\nab!\n", capture_output=True, text=True, env=env
+        )
+        assert [json.loads(x)["id"] for x in res.stdout.splitlines()] == ["B7TL820", None]
+        assert "2 rows" in res.stderr and "rows/sec" in res.stderr
+        with open(files[0]) as f:
+            res = subprocess.run(
+                [sys.executable, "-m", "fincheck", "extract", "-i", "CUSIP", "ABA", "--chunk-size", "3"],
+                stdin=f, capture_output=True, text=True, env=env
+            )
+        assert [x[2] for x in csv.reader(res.stdout.splitlines()[1:])] == [x[1] for x in expected if x[0] == files[0]]
+
+def test_metrics():
+    import json
+    from fincheck import metrics
+    from fincheck.extract import get_cusips, get_extractor
+    s = "sedol M0392N101 M0392N100 US9129091081 122235821 2007849"
+    metrics.reset()
+    get_cusips(s)
+    assert metrics.snapshot()["calls"] == {} and metrics.snapshot()["identifiers"] == {} #off by default
+    events = []
+    callback = lambda kind, name, seconds, data: events.append((kind, name, data))
+    metrics.add_callback(callback)
+    try:
+        with metrics.enabled():
+            assert get_cusips(s) == ["M0392N101"]
+            get_extractor(["CUSIP", "ISIN"]).scan(s)
+            get_extractor(["CUSIP"]).scan(s.encode())
+        assert not metrics.is_enabled()
+        snapshot = json.loads(metrics.to_json())
+        assert snapshot["calls"]["find_and_validate[CUSIP]"]["count"] == 1
+        assert snapshot["calls"]["Extractor.scan"]["count"] == 1
+        assert snapshot["calls"]["Extractor.scan_bytes"]["count"] == 1
+        assert snapshot["calls"]["is_cusip_many"]["count"] == 2
+        #M0392N101, M0392N100 and 122235821 are CUSIP candidates three times over, one valid each time
+        assert snapshot["identifiers"]["CUSIP"] == {"candidates": 9, "accepted": 3, "rejected": 6}
+        assert snapshot["identifiers"]["ISIN"] == {"candidates": 1, "accepted": 1, "rejected": 0}
+        assert ("call", "find_and_validate[CUSIP]", {"candidates": 3, "accepted": 1}) in events
+        fincheck.data.RefData().load()
+        assert metrics.snapshot()["loads"]["refdata.cusips"]["count"] >= 1
+    finally:
+        metrics.remove_callback(callback)
+        metrics.reset()
+
+def test_suggestions():
+    from fincheck.suggest import candidates, suggest_corrections, CorrectionIndex, Suggestion
+    from fincheck.validate import is_cusip
+    assert suggest_corrections("037833109") == ["037833100"] #wrong check digit
+    assert suggest_corrections("073833100") == ["037833100"] #swapped characters
+    assert suggest_corrections("O37833100") == ["037833100"] #letter O for zero
+    assert suggest_corrections("03783310?") == ["037833100"] #unreadable character
+    assert suggest_corrections("037833100") == [] #already known
+    #candidates are exactly the checksum-valid single edits
+    s = "931142108"
+    edits = {s[:i] + c + s[i + 1:] for i in range(9) for c in fincheck.utils.ALPHANUMERIC}
+    edits |= {s[:i] + s[i + 1] + s[i] + s[i + 2:] for i in range(8)}
+    assert {x.value for x in candidates("CUSIP", s)} == {x for x in edits if x != s and is_cusip(x)}
+    index = CorrectionIndex("SEDOL", known={"0263494", "B7TL820"})
+    assert index.suggest("0263449") == [Suggestion("0263494", "transposition", 5)]
+    assert index.suggest("B7TL821") == [Suggestion("B7TL820", "substitution", 6)]
+    assert index.suggest_many(["B7TL820", "1234567"]) == [[], []]
+    assert CorrectionIndex("ABA", known={"122235821"}).suggest("122235812") == [Suggestion("122235821", "transposition", 7)]
+    assert index.stats()["lookups"] == 4
+
+def test_columns():
+    from fincheck.columns import validate_column, check_digit_column, extract_column, find_column
+    docs = ["buy 037833100", "no ids", None, "US0378331005 and 594918104"]
+    assert validate_column(["037833100", "037833101", None]) == [True, False, False]
+    assert validate_column(["US0378331005", "2007849"], "ISIN") == [True, False]
+    assert check_digit_column(["03783310", "93114210", None, "0378331?", "037833100"]) == [0, 3, None, None, None]
+    assert check_digit_column(["7992739871", None], "LUHN") == [3, None]
+    assert fincheck.checksum.check_digits_or_none("CUSIP", ["03783310", "0378331"]) == [0, None]
+    assert extract_column(docs, ["CUSIP", "ISIN"]) == {
+        "row": [0, 3, 3], "type": ["CUSIP", "ISIN", "CUSIP"], "value": ["037833100", "US0378331005", "594918104"],
+        "start": [4, 0, 17], "end": [13, 12, 26]
+    }
+    assert find_column(docs) == [["037833100"], [], [], ["594918104"]]
+    try:
+        import pandas as pd
+    except ImportError: #optional dependency
+        return
+    series = pd.Series(docs, index=list("abcd"), name="text")
+    assert series.fincheck.find().tolist() == [["037833100"], [], [], ["594918104"]]
+    assert series.fincheck.extract(["CUSIP"])["row"].tolist() == ["a", "d"]
+    assert pd.Series(["037833100", None]).fincheck.is_cusip().tolist() == [True, False]
+    assert str(pd.Series(["03783310"]).fincheck.check_digit().dtype) == "Int64"
+
 def test_check_digits():
     files = ["Data/cusips.txt", "Data/isins.txt", "Data/sedols.txt"]
     answer_files = [x.replace(".txt", "_answers.txt") for x in files]
@@ -74,16 +533,306 @@ def test_check_digits():
             if a == "True":
                 assert fn(d[:-1]) == int(d[-1])
 
+def test_batch_check_digits():
+    files = ["Data/cusips.txt", "Data/isins.txt", "Data/sedols.txt"]
+    test_fns = [
+        (fincheck.checksum.cusip_check_digit, fincheck.checksum.cusip_check_digits),
+        (fincheck.checksum.isin_check_digit, fincheck.checksum.isin_check_digits),
+        (fincheck.checksum.sedol_check_digit, fincheck.checksum.sedol_check_digits)
+        ]
+    for fi, (fn, batch_fn) in list(zip(files, test_fns)):
+        payloads = [d.replace(" ", "")[:-1] for d in txt2list(fi)]
+        payloads = [p for p in payloads if p.isalnum() and p.isascii() and p.upper() == p]
+        payloads = [p for p in payloads if len(p) == len(payloads[0])]
+        assert batch_fn(payloads) == [fn(p) for p in payloads]
+    payloads = ["7992739871", "4992 7398 71", "1"]
+    assert fincheck.checksum.luhn_check_digits(payloads) == [fincheck.checksum.luhn_check_digit(p) for p in payloads]
+
+def test_convert_to_n():
+    assert fincheck.utils.convert_to_n("US0378") == "30280378"
+    assert fincheck.utils.convert_to_n("AZ9", return_str=False) == [10, 35, 9]
+    for fn, payload in [(fincheck.utils.convert_to_n, "us"), (fincheck.checksum.cusip_check_digit, "0378331a")]:
+        try:
+            fn(payload)
+            assert False, "Expected a ValueError"
+        except ValueError:
+            pass
+
+def test_refdata():
+    refdata = fincheck.data.reload_refdata()
+    x = fincheck.data.Cusip("98986X109")
+    assert (x.name_, x.type_, x.ticker_) == ("ZYNERBA PHARMACEUTICALS INC", "COM", "ZYNE")
+    assert fincheck.data.Cusip("00162Q906").name_ == "ALPS ETF TR" #duplicate rows -- first wins
+    assert fincheck.data.Cusip("000000000").name_ == "unk"
+    x = fincheck.data.Isin("US0378331005")
+    assert (x.country_name_, x.ticker_) == ("UNITED STATES", "AAPL")
+    stats = refdata.stats()
+    for name in ["cusips", "tickers", "countries"]:
+        assert stats["indexes"][name]["loaded"]
+        assert stats["indexes"][name]["rows"] > 0
+    assert fincheck.data.get_refdata() is refdata
+
+def test_data_objects():
+    x = fincheck.data.Cusip("98986X109")
+    assert not hasattr(x, "__dict__")
+    assert x._metadata is None and x._ticker is None #enriched lazily
+    assert (x.issuer_, x.issue_, x.issue_type_, x.check_digit_) == ("98986X", "10", "equity", "9")
+    assert x.to_isin(country="US") == "US98986X1090" and x._metadata is None
+    assert (x.is_valid, x.name_, x.type_, x.ticker_) == (True, "ZYNERBA PHARMACEUTICALS INC", "COM", "ZYNE")
+    x = fincheck.data.Isin("gb0002634946")
+    assert (x.country_code_, x.nsin_, x.check_digit_, x.to_sedol()) == ("GB", "000263494", "6", "0263494")
+    previous_cache, fincheck.data.Cusip.intern_cache = fincheck.data.Cusip.intern_cache, fincheck.cache.LRUCache(maxsize=2)
+    a = fincheck.data.Cusip.interned("98986X109")
+    assert fincheck.data.Cusip.interned("98986X109") is a
+    fincheck.data.Cusip.interned("037833100")
+    fincheck.data.Cusip.interned("931142103") #evicts 98986X109
+    assert fincheck.data.Cusip.interned("98986X109") is not a
+    assert fincheck.data.Cusip.intern_cache.stats()["evictions"] == 2
+    fincheck.data.Cusip.intern_cache = previous_cache
+    assert fincheck.data.Isin.interned("US0378331005") is fincheck.data.Isin.interned("US0378331005")
+    #reloading a registry in place drops interned objects too
+    previous = fincheck.data.set_refdata(fincheck.data.RefData())
+    try:
+        a, b = fincheck.data.Cusip.interned("98986X109"), fincheck.data.Isin.interned("US0378331005")
+        assert fincheck.data.reload_refdata() is fincheck.data.get_refdata()
+        assert fincheck.data.Cusip.interned("98986X109") is not a and fincheck.data.Isin.interned("US0378331005") is not b
+    finally:
+        fincheck.data.set_refdata(previous)
+
+def test_validation_cache():
+    from fincheck.cache import ValidationCache
+    cusips = txt2list("Data/cusips.txt")
+    cache = ValidationCache(maxsize=8)
+    assert [cache.is_cusip(x) for x in cusips] == [fincheck.validate.is_cusip(x) for x in cusips]
+    assert cache.is_cusip_many(cusips * 3) == fincheck.validate.is_cusip_many(cusips * 3)
+    stats = cache.stats()["validation"]
+    assert stats["size"] == 8 and stats["evictions"] > 0 and stats["hits"] + stats["misses"] == 2 * len(cusips)
+    assert cache.is_sedol("2007849") and cache.is_sedol("2007849") and cache.stats()["validation"]["hits"] == stats["hits"] + 1
+    assert not cache.is_luhn("") and cache.is_luhn_many(["79927398713", "79927398710"]) == [True, False]
+    assert cache.check_digit("ISIN", "US023135106") == cache.check_digit("ISIN", "US023135106") == 7
+    assert cache.stats()["check_digits"]["hits"] == 1
+    ids = ["98986X109", "US0378331005", "abc", "98986X109"]
+    assert cache.enrich(ids) == cache.enrich(ids) == fincheck.data.enrich(ids)
+    assert cache.stats()["enrichment"]["hits"] == 3
+    cache.clear()
+    assert all(x["size"] == 0 for x in cache.stats().values())
+
+def test_enrich():
+    ids = ["98986X109", "US0378331005", "GB0002634946", "98986X108", "abc"]
+    res = fincheck.data.enrich(ids)
+    assert list(res) == list(fincheck.data.enrich([])) == fincheck.data.ENRICH_COLUMNS
+    assert all(len(v) == len(ids) for v in res.values())
+    for i, x in enumerate(ids[:4]):
+        obj = fincheck.data.Cusip(x) if len(x) == 9 else fincheck.data.Isin(x)
+        assert (res["is_valid"][i], res["ticker"][i]) == (obj.is_valid, obj.ticker_)
+    assert res["id_type"] == ["CUSIP", "ISIN", "ISIN", "CUSIP", None]
+    assert res["isin"][0] == fincheck.data.Cusip("98986X109").to_isin(country="US")
+    assert res["cusip"][1] == "037833100" and res["sedol"][2] == "0263494"
+    assert res["name"][:2] == ["ZYNERBA PHARMACEUTICALS INC", "APPLE INC"]
+    assert res["found"] == [True, True, False, False, False]
+    assert res["country_name"][:3] == ["UNITED STATES", "UNITED STATES", "UNITED KINGDOM"]
+
+def test_refdata_snapshots():
+    from tempfile import TemporaryDirectory
+    from os.path import join
+    from threading import Thread
+    from fincheck.data import RefDataSnapshot, RefDataDelta, load_refdata_snapshot, apply_refdata_delta
+    previous = fincheck.data.get_refdata()
+    try:
+        with TemporaryDirectory() as tmp:
+            with open(join(tmp, "cusips.csv"), "w") as f:
+                f.write('cusip,name,type\n98986X109,"ZYNERBA PHARMACEUTICALS, INC",COM\n037833100,APPLE INC,COM\n')
+            with open(join(tmp, "tickers.csv"), "w") as f:
+                f.write("CUSIP,SYMBOL\n98986X109,ZYNE\n")
+            with open(join(tmp, "delta.csv"), "w") as f:
+                f.write("op,cusip,name,type,ticker\nadd,594918104,MICROSOFT CORP,COM,MSFT\nmodify,037833100,APPLE INC,COM,AAPL\nremove,98986X109,,,\n")
+            v1 = load_refdata_snapshot(join(tmp, "cusips.csv"), join(tmp, "tickers.csv"))
+            assert fincheck.data.get_refdata() is v1 and v1.version >= 1
+            assert fincheck.data.Cusip("98986X109").name_ == "ZYNERBA PHARMACEUTICALS, INC"
+            assert fincheck.data.Cusip("594918104").name_ == "unk"
+            assert v1.lookup_country("GB") == "UNITED KINGDOM" #bundled file when no path is given
+
+            v2 = apply_refdata_delta(join(tmp, "delta.csv"))
+            assert v2.version == v1.version + 1 and fincheck.data.get_refdata() is v2
+            x = fincheck.data.Cusip("594918104")
+            assert (x.name_, x.ticker_) == ("MICROSOFT CORP", "MSFT")
+            assert fincheck.data.Cusip("037833100").ticker_ == "AAPL"
+            assert v2.lookup_cusip("98986X109") is None and v2.lookup_ticker("98986X109") is None
+            #the previous version is untouched, and unchanged indexes are shared
+            assert v1.lookup_cusip("98986X109") is not None and v1.lookup_cusip("594918104") is None
+            assert v1.countries is v2.countries
+            #the default known matcher follows the current registry
+            from fincheck.known import KnownMatcher, find_known_securities
+            assert [x[0] for x in find_known_securities("98986X109 594918104 037833100")] == ["594918104", "037833100"]
+            assert KnownMatcher.from_refdata(v1, tickers=True).findall("ZYNE 98986X109 594918104") == ["ZYNE", "98986X109"]
+            from fincheck.bloom import BloomFilter
+            bloom = BloomFilter.from_refdata(confirm=True)
+            assert bloom.contains_many(["594918104", "037833100", "98986X109"]) == [True, True, False]
+
+        #invalid deltas raise without swapping anything
+        try:
+            apply_refdata_delta(RefDataDelta().add_cusip("594918104", "MICROSOFT CORP", "COM").remove_cusip("98986X109"))
+            assert False, "adding an existing cusip should fail"
+        except AssertionError as e:
+            assert "already in cusips" in str(e)
+        assert fincheck.data.get_refdata() is v2
+
+        #readers see one consistent version while writers swap new ones in
+        base = RefDataSnapshot.from_refdata(fincheck.data.RefData())
+        fincheck.data.set_refdata(base)
+        errors = []
+        def read():
+            for _ in range(20_000):
+                refdata = fincheck.data.get_refdata()
+                name, type_ = refdata.lookup_cusip("037833100")
+                if name != f"APPLE INC V{refdata.version}" and refdata.version != base.version:
+                    errors.append((refdata.version, name))
+        readers = [Thread(target=read) for _ in range(4)]
+        for t in readers:
+            t.start()
+        for i in range(50):
+            version = fincheck.data.get_refdata().version + 1
+            apply_refdata_delta(RefDataDelta().modify("cusips", "037833100", (f"APPLE INC V{version}", "COM")))
+        for t in readers:
+            t.join()
+        assert not errors, errors[:5]
+        assert fincheck.data.get_refdata().version == base.version + 50
+        assert fincheck.data.get_refdata().stats()["version"] == base.version + 50
+        #set_refdata drops interned objects of the previous registry
+        assert fincheck.data.Cusip.interned("037833100").name_ == f"APPLE INC V{base.version + 50}"
+        fincheck.data.set_refdata(base.apply(RefDataDelta().modify("cusips", "037833100", ("ZZZ NEW NAME", "COM"))))
+        assert fincheck.data.Cusip.interned("037833100").name_ == "ZZZ NEW NAME"
+    finally:
+        fincheck.data.set_refdata(previous)
+
+def test_compiled_refdata():
+    from tempfile import TemporaryDirectory
+    from os.path import join
+    from fincheck.compiled import build_compiled_refdata, CompiledRefData
+    with TemporaryDirectory() as tmp:
+        refdata = CompiledRefData(build_compiled_refdata(join(tmp, "refdata.bin")))
+        previous = fincheck.data.set_refdata(refdata)
+        try:
+            x = fincheck.data.Cusip("98986X109")
+            assert (x.name_, x.type_, x.ticker_) == ("ZYNERBA PHARMACEUTICALS INC", "COM", "ZYNE")
+            assert fincheck.data.Isin("GB0002634946").country_name_ == "UNITED KINGDOM"
+            assert refdata.lookup_cusip("98986X10") is None
+            assert refdata.stats()["indexes"]["cusips"]["rows"] == len(fincheck.data.RefData().cusips)
+            assert list(refdata.iter_cusips()) == sorted(fincheck.data.RefData().cusips)
+            assert ("98986X109", "ZYNE") in set(refdata.iter_tickers())
+        finally:
+            fincheck.data.set_refdata(previous)
+            refdata.close()
+
+def _shared_refdata_lookup(cusip):
+    x = fincheck.data.Cusip(cusip)
+    return x.name_, x.ticker_
+
+def _shared_refdata_lookup_with(refdata, cusip):
+    return refdata.lookup_cusip(cusip)[0]
+
+def test_shared_refdata():
+    import os
+    import subprocess
+    import sys
+    from os.path import dirname
+    from concurrent.futures import ProcessPoolExecutor
+    from fincheck.compiled import SharedRefData, attach_refdata
+    with SharedRefData.create() as shared:
+        assert shared.stats()["owner"]
+        with ProcessPoolExecutor(2, initializer=attach_refdata, initargs=(shared.name,)) as pool:
+            res = list(pool.map(_shared_refdata_lookup, ["98986X109", "037833100"]))
+            assert res == [("ZYNERBA PHARMACEUTICALS INC", "ZYNE"), ("APPLE INC", "AAPL")]
+            #pickles by name, so workers attach to the same segment
+            assert pool.submit(_shared_refdata_lookup_with, shared, "98986X109").result() == "ZYNERBA PHARMACEUTICALS INC"
+        attached = SharedRefData.attach(shared.name)
+        assert not attached.stats()["owner"]
+        assert attached.lookup_cusip("98986X109") == shared.lookup_cusip("98986X109")
+        attached.close()
+        for fn in [attached.stats, lambda: attached.lookup_cusip("98986X109")]:
+            try:
+                fn()
+                raised = False
+            except AssertionError as e:
+                raised = "is closed" in str(e)
+            assert raised
+        name = shared.name
+    try:
+        SharedRefData.attach(name)
+        assert False, "segment should be unlinked"
+    except FileNotFoundError:
+        pass
+    #forked and spawned workers attach without unlinking the segment or upsetting the resource tracker
+    code = "\n".join([
+        "import multiprocessing as mp",
+        "from concurrent.futures import ProcessPoolExecutor",
+        "from fincheck.compiled import SharedRefData",
+        "if __name__ == '__main__':",
+        "    with SharedRefData.create() as shared:",
+        "        for method in ['fork', 'spawn']:",
+        "            with ProcessPoolExecutor(2, mp_context=mp.get_context(method)) as pool:",
+        "                print(pool.submit(SharedRefData.lookup_cusip, shared, '98986X109').result()[0])",
+        "            print(shared.lookup_cusip('037833100')[0])",
+    ])
+    env = dict(os.environ, PYTHONPATH=dirname(dirname(fincheck.__file__)))
+    res = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env)
+    assert res.stdout.splitlines() == ["ZYNERBA PHARMACEUTICALS INC", "APPLE INC"] * 2, res.stdout
+    assert res.returncode == 0 and res.stderr == "", res.stderr
+
+def test_import_time():
+    import os
+    import subprocess
+    import sys
+    from os.path import dirname
+    code = "\n".join([
+        "import sys, time",
+        "start = time.perf_counter()",
+        "import fincheck",
+        "elapsed = time.perf_counter() - start",
+        "assert not [m for m in sys.modules if m.startswith('fincheck.') or m == 'pkg_resources']",
+        "print(elapsed)"
+    ])
+    env = dict(os.environ, PYTHONPATH=dirname(dirname(fincheck.__file__)))
+    timings = [float(subprocess.check_output([sys.executable, "-c", code], env=env)) for _ in range(3)]
+    assert min(timings) < fincheck.IMPORT_TIME_BUDGET, f"import fincheck took {min(timings):.3f}s"
+
 if __name__ == "__main__":
     print("Running tests...")
     test_cusips()
     test_sedols()
     test_isins()
     test_abas()
+    test_bulk_validation()
+    test_bulk_matches_single()
     print("Validation: PASSED")
     test_extraction()
+    test_single_pass_extraction()
+    test_stream_extraction()
+    test_bytes_extraction()
+    test_match_records()
+    test_corpus_extraction()
+    test_known_extraction()
+    test_bloom_universe()
+    test_packed_identifiers()
+    test_server()
+    test_cli()
+    test_metrics()
+    test_suggestions()
+    test_columns()
     print("Extraction: PASSED")
     test_check_digits()
+    test_batch_check_digits()
+    test_convert_to_n()
     print("Check Digits: PASSED")
+    test_refdata()
+    test_data_objects()
+    test_enrich()
+    test_validation_cache()
+    test_refdata_snapshots()
+    test_compiled_refdata()
+    test_shared_refdata()
+    print("Reference Data: PASSED")
+    test_import_time()
+    print("Import Time: PASSED")
     print("PASSED ALL TESTS.")
     